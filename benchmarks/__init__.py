@@ -0,0 +1,11 @@
+"""
+Benchmarks of the hot paths of the service.
+
+Run them from the root of the repository, eg `python -m benchmarks.extraction`.
+"""
+
+import sys
+from pathlib import Path
+
+# the service modules are imported as top level ones, as the app does
+sys.path.insert(0, str(Path(__file__).parents[1] / "src"))
@@ -0,0 +1,69 @@
+"""Helpers shared by the benchmarks: latency summaries and machine readable results."""
+
+import json
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+
+def summarize(latencies: list[float]) -> dict[str, float]:
+    """Summarize latencies in milliseconds.
+
+    Args:
+        latencies (list[float]): the latencies, in seconds.
+
+    Returns:
+        dict[str, float]: the mean, p50, p90, p99 and max, in milliseconds.
+    """
+    if len(latencies) < 2:
+        value = latencies[0] * 1000 if latencies else 0.0
+        return {x: value for x in ("mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms")}
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": cuts[49] * 1000,
+        "p90_ms": cuts[89] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+def _commit() -> str | None:
+    """Get the commit of the working tree, if in a git repository."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(
+    path: Path, benchmark: str, parameters: dict[str, Any], results: Any
+) -> None:
+    """Write the results of a run as JSON, with what is needed to compare runs across commits.
+
+    Args:
+        path (Path): the file to write.
+        benchmark (str): the benchmark name.
+        parameters (dict[str, Any]): the parameters of the run.
+        results (Any): the results.
+    """
+    document = {
+        "benchmark": benchmark,
+        "commit": _commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "parameters": parameters,
+        "results": results,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, indent=2) + "\n")
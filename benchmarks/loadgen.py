@@ -0,0 +1,337 @@
+"""
+Load generator replaying an isbn trace against the service, at increasing concurrency.
+
+The trace is either a file, one isbn per line, or synthetic: each lookup repeats an isbn
+already seen with the given probability, picked by popularity along a Zipf law, or asks
+for a new one otherwise.
+
+Each concurrency level runs closed-loop clients for a fixed duration, replaying the trace
+from its start, and reports the throughput, the latency percentiles and the error rate.
+The saturation knee is the lowest level within `--min-gain` of the peak throughput:
+past it, more clients only buy latency.
+
+Without `--url`, every level runs against a fresh instance of the application,
+served by uvicorn in a child process and calling in-process stub upstreams.
+Against `--url`, the caches of the instance stay warm from one level to the next.
+"""
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import multiprocessing
+import os
+import random
+import socket
+import ssl
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+import httpx
+import uvicorn
+
+from app import app
+
+from ._results import summarize, write_results
+from .stubs import (
+    StubProfile,
+    add_profile_arguments,
+    isbn13,
+    lift_rate_limits,
+    profile_from_arguments,
+    stub_pools,
+)
+
+
+def synthetic_trace(
+    length: int, repeat_rate: float, skew: float, seed: int
+) -> list[str]:
+    """Build a trace with repeated, skewed lookups.
+
+    Args:
+        length (int): the number of lookups.
+        repeat_rate (float): the probability for a lookup to repeat an isbn already seen.
+        skew (float): the exponent of the Zipf law picking the repeated isbn, the first seen the hottest.
+        seed (int): the seed of the random generator.
+
+    Returns:
+        list[str]: the isbns, in lookup order.
+    """
+    rng = random.Random(seed)
+    # cumulative weights of the ranks, for the largest catalogue the trace can reach
+    cumulative = list(itertools.accumulate(1 / (x + 1) ** skew for x in range(length)))
+    seen: list[str] = list()
+    trace: list[str] = list()
+    for _ in range(length):
+        if seen and rng.random() < repeat_rate:
+            rank = bisect.bisect_left(
+                cumulative, rng.random() * cumulative[len(seen) - 1], hi=len(seen)
+            )
+            trace.append(seen[rank])
+        else:
+            seen.append(isbn13(seed * 10**6 + len(seen)))
+            trace.append(seen[-1])
+    return trace
+
+
+def read_trace(path: Path) -> list[str]:
+    """Read a trace, one isbn per line, skipping the blank lines and `#` comments.
+
+    Args:
+        path (Path): the trace file.
+
+    Returns:
+        list[str]: the isbns, in lookup order.
+    """
+    lines = (x.strip() for x in path.read_text().splitlines())
+    return [x for x in lines if x and not x.startswith("#")]
+
+
+def describe_trace(trace: list[str]) -> dict[str, float]:
+    """Describe the repetitions of a trace.
+
+    Args:
+        trace (list[str]): the isbns, in lookup order.
+
+    Returns:
+        dict[str, float]: the length, the distinct isbns, the repeat rate and the share of
+        the lookups going to the hottest 1% of the isbns.
+    """
+    counts = Counter(trace)
+    hottest = sorted(counts.values(), reverse=True)[: max(1, len(counts) // 100)]
+    return {
+        "length": len(trace),
+        "distinct": len(counts),
+        "repeat_rate": 1 - len(counts) / len(trace),
+        "hottest_1pc_share": sum(hottest) / len(trace),
+    }
+
+
+def saturation_knee(levels: list[dict[str, Any]], min_gain: float) -> int | None:
+    """Find the lowest concurrency reaching the peak throughput, within a tolerance.
+
+    Args:
+        levels (list[dict[str, Any]]): the results of each level, by increasing concurrency.
+        min_gain (float): the relative throughput gain deemed worth more clients.
+
+    Returns:
+        int | None: the concurrency of the knee, None if the throughput still grows at the last level.
+    """
+    throughputs = [x["throughput_rps"] for x in levels]
+    if len(levels) > 1 and throughputs[-1] > throughputs[-2] * (1 + min_gain):
+        return None
+    peak = max(throughputs)
+    return next(
+        x["concurrency"]
+        for x, y in zip(levels, throughputs)
+        if y >= peak * (1 - min_gain)
+    )
+
+
+async def run_level(
+    url: str, trace: list[str], concurrency: int, duration: float, timeout: float
+) -> dict[str, Any]:
+    """Replay the trace with closed-loop clients for a fixed duration.
+
+    A lookup answered with a 5xx or not answered at all is an error; a 404 is a valid answer.
+
+    Args:
+        url (str): the base url of the service.
+        trace (list[str]): the isbns, in lookup order, replayed from the start and cycled.
+        concurrency (int): the number of clients.
+        duration (float): how long to run, in seconds.
+        timeout (float): the timeout of each lookup, in seconds.
+
+    Returns:
+        dict[str, Any]: the throughput, the latencies and the error rate of the level.
+    """
+    isbns = itertools.cycle(trace)
+    latencies: list[float] = list()
+    statuses: Counter[str] = Counter()
+
+    # a client of its own for each loop: the pool of a shared client is scanned on every
+    # request, which makes the load generator the bottleneck at high concurrency
+    tls = ssl.create_default_context()
+
+    async def client_loop(deadline: float) -> None:
+        async with httpx.AsyncClient(
+            base_url=url, timeout=timeout, verify=tls
+        ) as client:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(f"/api/v1/books/{next(isbns)}")
+                    status = str(response.status_code)
+                except httpx.HTTPError:
+                    status = "error"
+                latencies.append(time.perf_counter() - start)
+                statuses[status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client_loop(start + duration) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    errors = sum(y for x, y in statuses.items() if x == "error" or x.startswith("5"))
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / elapsed,
+        "error_rate": errors / max(1, len(latencies)),
+        "statuses": dict(sorted(statuses.items())),
+        **summarize(latencies),
+    }
+
+
+def _serve(port: int, profile: StubProfile, quiet: bool) -> None:
+    """Serve the application against stub upstreams, in a child process."""
+    if quiet:
+        # every log line would be paid by the server under load, and drown the report
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+    lift_rate_limits()
+    uvicorn.run(
+        app(stub_pools(profile)),
+        host="127.0.0.1",
+        port=port,
+        access_log=False,
+        log_level="warning",
+    )
+
+
+def _free_port() -> int:
+    """Get a free local port."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class StubbedServer:
+    """The application served by a child process against stub upstreams."""
+
+    def __init__(self, profile: StubProfile, quiet: bool = True) -> None:
+        """Prepare the server.
+
+        Args:
+            profile (StubProfile): how the stub upstreams behave.
+            quiet (bool, optional): whether to silence the output of the server. Defaults to True.
+        """
+        self.profile = profile
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._process = multiprocessing.get_context("spawn").Process(
+            target=_serve, args=(self.port, profile, quiet), daemon=True
+        )
+
+    def __enter__(self) -> "StubbedServer":
+        """Start the server and wait for it to answer its readiness probe."""
+        self._process.start()
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"{self.url}/_/ready").is_success:
+                    return self
+            except httpx.HTTPError:
+                pass
+            if not self._process.is_alive():
+                break
+            time.sleep(0.1)
+        self._stop()
+        raise RuntimeError(f"The stubbed server did not start on {self.url}")
+
+    def __exit__(self, *_: object) -> None:
+        """Stop the server."""
+        self._stop()
+
+    def _stop(self) -> None:
+        """Stop the child process, letting the application shut down."""
+        self._process.terminate()
+        self._process.join(10)
+        if self._process.is_alive():
+            self._process.kill()
+
+
+def main() -> None:
+    """Run the sweep, print and write its results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="a running instance, instead of a stubbed one")
+    parser.add_argument("--trace", type=Path, help="a file of isbns, one per line")
+    parser.add_argument("--length", type=int, default=20_000, help="synthetic lookups")
+    parser.add_argument("--repeat-rate", type=float, default=0.6)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8, 16, 32, 64, 128],
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="seconds per level"
+    )
+    parser.add_argument("--timeout", type=float, default=10.0, help="lookup seconds")
+    parser.add_argument(
+        "--min-gain",
+        type=float,
+        default=0.1,
+        help="relative throughput gain deemed worth more clients",
+    )
+    parser.add_argument(
+        "--server-logs", action="store_true", help="show the stubbed server output"
+    )
+    add_profile_arguments(parser)
+    parser.add_argument(
+        "--output", type=Path, default=Path("benchmark-results/loadgen.json")
+    )
+    args = parser.parse_args()
+
+    if args.trace is not None:
+        trace = read_trace(args.trace)
+    else:
+        trace = synthetic_trace(args.length, args.repeat_rate, args.skew, args.seed)
+    if not trace:
+        parser.error("the trace is empty")
+    profile = profile_from_arguments(args)
+
+    print(f"trace: {describe_trace(trace)}")
+    print(
+        f"{'clients':>8} {'rps':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'errors':>8}"
+    )
+    levels: list[dict[str, Any]] = list()
+    for concurrency in sorted(args.concurrency):
+        if args.url is not None:
+            level = asyncio.run(
+                run_level(args.url, trace, concurrency, args.duration, args.timeout)
+            )
+        else:
+            # a fresh instance for each level, so that each starts with cold caches
+            with StubbedServer(profile, not args.server_logs) as server:
+                level = asyncio.run(
+                    run_level(
+                        server.url, trace, concurrency, args.duration, args.timeout
+                    )
+                )
+        levels.append(level)
+        print(
+            f"{concurrency:>8} {level['throughput_rps']:>8.0f} {level['p50_ms']:>8.1f} "
+            f"{level['p90_ms']:>8.1f} {level['p99_ms']:>8.1f} {level['error_rate']:>8.2%}"
+        )
+
+    knee = saturation_knee(levels, args.min_gain)
+    if knee is None:
+        print("no saturation knee: raise the concurrency")
+    else:
+        print(f"saturation knee at {knee} clients")
+
+    write_results(
+        args.output,
+        "loadgen",
+        vars(args) | {"trace": args.trace and str(args.trace), "output": None},
+        {"trace": describe_trace(trace), "levels": levels, "knee": knee},
+    )
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
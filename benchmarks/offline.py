@@ -0,0 +1,187 @@
+"""
+Offline benchmark suite of the lookups, against in-process stub upstreams.
+
+Three levels are measured:
+- adapter: a single datasource lookup, through the full client stack, sequentially;
+- fan-out: `fetch_data` over every datasource, sequentially;
+- route: the book search endpoint, driven concurrently through ASGI, every wrapper included.
+
+The results are written as JSON, to compare runs across commits.
+"""
+
+import argparse
+import asyncio
+import functools
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+import httpx
+from ferrea.core.context import Context
+
+from adapters._http import build_client
+from adapters.googlebooks import GoogleBooksRepository
+from adapters.openlibrary import OpenLibraryRepository
+from app import app
+from configs import settings
+from models.api_service import ApiService
+from operations.data_search import fetch_data
+
+from ._results import summarize, write_results
+from .stubs import (
+    StubProfile,
+    add_profile_arguments,
+    isbn13,
+    lift_rate_limits,
+    profile_from_arguments,
+    stub_pools,
+)
+
+CONTEXT = Context("benchmark", "benchmark")
+
+
+async def _timed_lookups(lookup: Any, isbns: list[str]) -> tuple[list[float], float]:
+    """Run the lookups one after the other.
+
+    Returns:
+        tuple[list[float], float]: the wall latency of each lookup, and the CPU time per lookup in microseconds.
+    """
+    latencies: list[float] = list()
+    cpu = time.process_time()
+    for isbn in isbns:
+        start = time.perf_counter()
+        await lookup(isbn)
+        latencies.append(time.perf_counter() - start)
+    return latencies, (time.process_time() - cpu) / len(isbns) * 1e6
+
+
+async def _adapters(
+    profile: StubProfile, isbns: list[str]
+) -> dict[str, dict[str, float]]:
+    """Measure the cost of a lookup on each datasource."""
+    pools = stub_pools(profile)
+    results: dict[str, dict[str, float]] = dict()
+    async with (
+        build_client(settings.google, pool=pools[settings.google.name]) as google,
+        build_client(
+            settings.openlibrary, pool=pools[settings.openlibrary.name]
+        ) as openlibrary,
+    ):
+        repositories: list[ApiService] = [
+            GoogleBooksRepository(settings.google.name, google),
+            OpenLibraryRepository(settings.openlibrary.name, openlibrary),
+        ]
+        for repository in repositories:
+            latencies, cpu_us = await _timed_lookups(
+                functools.partial(
+                    repository.search_for_book_info_async, context=CONTEXT
+                ),
+                isbns,
+            )
+            results[repository.name] = {"cpu_us": cpu_us, **summarize(latencies)}
+    return results
+
+
+async def _fan_out(profile: StubProfile, isbns: list[str]) -> dict[str, float]:
+    """Measure the cost of a search over every datasource."""
+    pools = stub_pools(profile)
+    async with (
+        build_client(settings.google, pool=pools[settings.google.name]) as google,
+        build_client(
+            settings.openlibrary, pool=pools[settings.openlibrary.name]
+        ) as openlibrary,
+    ):
+        datasources: list[ApiService] = [
+            GoogleBooksRepository(settings.google.name, google),
+            OpenLibraryRepository(settings.openlibrary.name, openlibrary),
+        ]
+        latencies, cpu_us = await _timed_lookups(
+            lambda x: fetch_data(x, datasources, CONTEXT), isbns
+        )
+    return {"cpu_us": cpu_us, **summarize(latencies)}
+
+
+async def _route(
+    profile: StubProfile, isbns: list[str], concurrency: int
+) -> dict[str, Any]:
+    """Measure the throughput and latency of the book search endpoint."""
+    application = app(stub_pools(profile))
+    latencies: list[float] = list()
+    statuses: Counter[int] = Counter()
+    queue = iter(isbns)
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        for isbn in queue:
+            start = time.perf_counter()
+            response = await client.get(f"/api/v1/books/{isbn}")
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    async with application.router.lifespan_context(application):
+        transport = httpx.ASGITransport(app=application)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*[worker(client) for _ in range(concurrency)])
+            elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / elapsed,
+        "statuses": {str(x): y for x, y in sorted(statuses.items())},
+        **summarize(latencies),
+    }
+
+
+async def _run(args: argparse.Namespace) -> dict[str, Any]:
+    """Run every level of the suite."""
+    profile = profile_from_arguments(args)
+    # distinct isbns for each level, so that no cache is warm
+    isbns = [isbn13(args.seed * 10**6 + x) for x in range(3 * args.number)]
+    levels = [isbns[i::3] for i in range(3)]
+
+    return {
+        "adapter_cpu": await _adapters(StubProfile(authors=args.authors), levels[0]),
+        "adapter": await _adapters(profile, levels[0]),
+        "fan_out": await _fan_out(profile, levels[1]),
+        "route": await _route(profile, levels[2], args.concurrency),
+    }
+
+
+def main() -> None:
+    """Run the suite, print and write its results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=500, help="lookups per level")
+    parser.add_argument("--concurrency", type=int, default=32)
+    add_profile_arguments(parser)
+    parser.add_argument(
+        "--output", type=Path, default=Path("benchmark-results/offline.json")
+    )
+    args = parser.parse_args()
+
+    lift_rate_limits()
+    results = asyncio.run(_run(args))
+
+    print(f"{'level':<24} {'cpu us':>8} {'p50 ms':>8} {'p99 ms':>8} {'rps':>8}")
+    for level in ("adapter_cpu", "adapter"):
+        for name, x in results[level].items():
+            print(
+                f"{level + ' ' + name:<24} {x['cpu_us']:>8.0f} {x['p50_ms']:>8.2f} {x['p99_ms']:>8.2f} {'':>8}"
+            )
+    fan_out, route = results["fan_out"], results["route"]
+    print(
+        f"{'fan_out':<24} {fan_out['cpu_us']:>8.0f} {fan_out['p50_ms']:>8.2f} {fan_out['p99_ms']:>8.2f} {'':>8}"
+    )
+    print(
+        f"{'route':<24} {'':>8} {route['p50_ms']:>8.2f} {route['p99_ms']:>8.2f} {route['throughput_rps']:>8.0f}"
+    )
+
+    write_results(args.output, "offline", vars(args) | {"output": None}, results)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Micro-benchmark of the per-response serialisation cost of the book search.
+
+The direct path, writing the pydantic JSON bytes into the envelope, is compared with
+serialising each book, parsing it back and letting JSONResponse encode the whole envelope,
+which is what the routes did before.
+"""
+
+import argparse
+import functools
+import json
+import time
+import timeit
+import tracemalloc
+from typing import Any
+
+from ferrea.models.datasource import BookDatasource
+from pydantic import HttpUrl
+from starlette.responses import JSONResponse
+
+from routers._responses import JSONBytesResponse, books_envelope
+
+
+def _book(x: int) -> BookDatasource:
+    """Build a book with every field filled."""
+    return BookDatasource(
+        title=f"Identity {x}",
+        authors=["Milan Kundera"],
+        publishing="Harper Perennial",
+        published_on=1999,
+        cover=HttpUrl("https://covers.openlibrary.org/b/id/40647-M.jpg"),
+        plot="A hotel in a small town on the Normandy coast, which they found in a guidebook. "
+        * 4,
+        languages=["eng"],
+        book_formats=["edition"],
+        authors_portrait=[
+            HttpUrl("https://covers.openlibrary.org/a/olid/OL4326321A-M.jpg")
+        ],
+    )
+
+
+def _reparse(books: list[BookDatasource]) -> JSONResponse:
+    """Serialise, parse back and serialise again."""
+    results = [json.loads(x.model_dump_json()) for x in books]
+    return JSONResponse(content={"items": len(results), "result": results})
+
+
+def _direct(books: list[BookDatasource]) -> JSONBytesResponse:
+    """Serialise once, straight into the response body."""
+    return JSONBytesResponse(books_envelope(books))
+
+
+def _cpu_us(call: Any, number: int) -> float:
+    """Best of 5 runs of the call, in CPU microseconds per call."""
+    timer = timeit.Timer(call, timer=time.process_time)
+    return min(timer.repeat(number=number, repeat=5)) / number * 1e6
+
+
+def _allocations(call: Any, number: int) -> tuple[float, float]:
+    """Count the memory blocks held by the result of the call, and the peak of traced memory.
+
+    Returns:
+        tuple[float, float]: the blocks held per call and the peak per call, in KiB.
+    """
+    call()
+    tracemalloc.start()
+    before = sum(x.count for x in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.reset_peak()
+    kept = [call() for _ in range(number)]
+    after = sum(x.count for x in tracemalloc.take_snapshot().statistics("filename"))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return (after - before) / number, peak / number / 1024
+
+
+def main() -> None:
+    """Run the benchmark and print the per-response cost of each path."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=5_000)
+    args = parser.parse_args()
+
+    print(
+        f"{'books':>5} {'path':<8} {'cpu us/resp':>12} {'held blocks':>12} {'peak KiB/resp':>14}"
+    )
+    for size in (1, 2, 10):
+        books = [_book(x) for x in range(size)]
+        if _reparse(books).body != _direct(books).body:
+            raise AssertionError("the two paths do not produce the same body")
+
+        for path, call in {
+            "reparse": functools.partial(_reparse, books),
+            "direct": functools.partial(_direct, books),
+        }.items():
+            blocks, peak = _allocations(call, args.number // 10)
+            print(
+                f"{size:>5} {path:<8} {_cpu_us(call, args.number):>12.2f} {blocks:>12.1f} {peak:>14.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Stand-in upstreams for Google Books and OpenLibrary, served in-process.
+
+Each stub is an httpx transport answering the calls of an adapter with realistic payloads,
+after a latency drawn from a log-normal distribution. A fraction of the calls fail with a 503,
+and a fraction of the isbns are unknown: whether an isbn is known depends on the isbn only,
+so that repeated lookups agree.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+from configs import settings
+
+
+def isbn13(n: int) -> str:
+    """Build a valid ISBN-13 from a number.
+
+    Args:
+        n (int): the number, below 10**9.
+
+    Returns:
+        str: the ISBN-13.
+    """
+    body = f"978{n:09d}"
+    total = sum(int(x) * (1 if i % 2 == 0 else 3) for i, x in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+@dataclass
+class Latency:
+    """Log-normal latency, given by its median and 99th percentile, in seconds."""
+
+    median: float = 0.0
+    p99: float = 0.0
+
+    def draw(self, rng: random.Random) -> float:
+        """Draw a latency.
+
+        Args:
+            rng (random.Random): the random generator.
+
+        Returns:
+            float: the latency, in seconds.
+        """
+        if self.median <= 0:
+            return 0.0
+        # the 99th percentile of a standard normal is 2.326 sigmas
+        sigma = math.log(max(self.p99, self.median) / self.median) / 2.326
+        return rng.lognormvariate(math.log(self.median), sigma)
+
+
+@dataclass
+class StubProfile:
+    """How a stub upstream behaves."""
+
+    latency: Latency = field(default_factory=Latency)
+    error_rate: float = 0.0
+    miss_rate: float = 0.1
+    authors: int = 2
+    seed: int = 0
+
+
+class StubUpstream(httpx.AsyncBaseTransport):
+    """Base of the stub upstreams: latency, errors and known isbns."""
+
+    def __init__(self, profile: StubProfile) -> None:
+        """Build the stub.
+
+        Args:
+            profile (StubProfile): how the stub behaves.
+        """
+        self.profile = profile
+        self.rng = random.Random(profile.seed)
+        self.calls = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Answer a call after the drawn latency.
+
+        Args:
+            request (httpx.Request): the request.
+
+        Returns:
+            httpx.Response: the response.
+        """
+        self.calls += 1
+        delay = self.profile.latency.draw(self.rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.rng.random() < self.profile.error_rate:
+            return httpx.Response(503, request=request)
+        return self.answer(request)
+
+    def answer(self, request: httpx.Request) -> httpx.Response:
+        """Build the response of a call.
+
+        Args:
+            request (httpx.Request): the request.
+
+        Returns:
+            httpx.Response: the response.
+        """
+        raise NotImplementedError
+
+    def known(self, key: str) -> bool:
+        """Whether the upstream knows a book or an author.
+
+        Args:
+            key (str): the isbn or the id.
+
+        Returns:
+            bool: whether it is known.
+        """
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest) / 2**64 >= self.profile.miss_rate
+
+
+class GoogleBooksStub(StubUpstream):
+    """Stand-in for the Google Books volumes API."""
+
+    def answer(self, request: httpx.Request) -> httpx.Response:
+        """Answer the volumes search, the volume fetch and the health check.
+
+        Args:
+            request (httpx.Request): the request.
+
+        Returns:
+            httpx.Response: the response.
+        """
+        path = request.url.path.removeprefix(httpx.URL(settings.google.api_url).path)
+        if path == "/volumes":
+            query = request.url.params.get("q", "")
+            if not query:
+                # as upstream: the health check relies on it
+                return httpx.Response(
+                    400, json={"error": {"message": "Missing query."}}, request=request
+                )
+            isbn = query.removeprefix("isbn:")
+            if not self.known(isbn):
+                return httpx.Response(200, json={"totalItems": 0}, request=request)
+            return httpx.Response(
+                200,
+                json={"totalItems": 1, "items": [self._volume(isbn)]},
+                request=request,
+            )
+        if path.startswith("/volumes/"):
+            return httpx.Response(
+                200, json=self._volume(path.rsplit("/", 1)[-1]), request=request
+            )
+        return httpx.Response(200, json={"kind": "books#volumes"}, request=request)
+
+    def _volume(self, volume_id: str) -> dict[str, Any]:
+        """Build a volume with every mapped field."""
+        return {
+            "id": volume_id,
+            "volumeInfo": {
+                "title": f"Book {volume_id}",
+                "authors": [f"Author {x}" for x in range(self.profile.authors)],
+                "publisher": "Harper Collins",
+                "publishedDate": "1999-04-21",
+                "imageLinks": {
+                    "thumbnail": f"https://books.google.com/books/content?id={volume_id}&img=1"
+                },
+                "description": "There are situations in which we fail for a moment "
+                "to recognize the person we are with. " * 4,
+                "language": "en",
+                "printType": "BOOK",
+            },
+        }
+
+
+class OpenLibraryStub(StubUpstream):
+    """Stand-in for the OpenLibrary isbn, books, authors and covers APIs."""
+
+    def answer(self, request: httpx.Request) -> httpx.Response:
+        """Answer the edition, authors and portraits lookups and the health check.
+
+        Args:
+            request (httpx.Request): the request.
+
+        Returns:
+            httpx.Response: the response.
+        """
+        path = request.url.path
+        if path.startswith("/isbn/"):
+            isbn = path.removeprefix("/isbn/")
+            if not self.known(isbn):
+                return httpx.Response(404, json={"error": "notfound"}, request=request)
+            return httpx.Response(200, json=self._edition(isbn), request=request)
+        if path == "/api/books":
+            isbns = request.url.params.get("bibkeys", "").split(",")
+            found = {
+                x: {"details": self._edition(x.removeprefix("ISBN:"))}
+                for x in isbns
+                if self.known(x.removeprefix("ISBN:"))
+            }
+            return httpx.Response(200, json=found, request=request)
+        if path.startswith("/authors/"):
+            author_id = path.removeprefix("/authors/").removesuffix(".json")
+            return httpx.Response(
+                200,
+                json={"key": f"/authors/{author_id}", "name": f"Author {author_id}"},
+                request=request,
+            )
+        if path.startswith("/a/olid/"):
+            author_id = path.removeprefix("/a/olid/").removesuffix("-M.jpg")
+            return httpx.Response(
+                200 if self.known(author_id) else 404, request=request
+            )
+        return httpx.Response(200, json={"status": "ok"}, request=request)
+
+    def _edition(self, isbn: str) -> dict[str, Any]:
+        """Build an edition with its authors."""
+        return {
+            "title": f"Book {isbn}",
+            "publishers": ["Harper Perennial"],
+            "publish_date": "April 1999",
+            "covers": [40647],
+            "first_sentence": {
+                "value": "A hotel in a small town on the Normandy coast."
+            },
+            "languages": [{"key": "/languages/eng"}],
+            "type": {"key": "/type/edition"},
+            "authors": [
+                {"key": f"/authors/OL{isbn[-6:]}{x}A"}
+                for x in range(self.profile.authors)
+            ],
+        }
+
+
+def stub_pools(
+    profile: StubProfile,
+) -> dict[str, httpx.AsyncBaseTransport]:
+    """Build a stub for each datasource, in place of its connection pool.
+
+    Args:
+        profile (StubProfile): how the stubs behave.
+
+    Returns:
+        dict[str, httpx.AsyncBaseTransport]: the stub of each datasource, by name.
+    """
+    return {
+        settings.google.name: GoogleBooksStub(profile),
+        settings.openlibrary.name: OpenLibraryStub(profile),
+    }
+
+
+def lift_rate_limits() -> None:
+    """Disable the rate limits of the real upstreams, which the stubs do not need."""
+    settings.google.rate_limit.enabled = False
+    settings.openlibrary.rate_limit.enabled = False
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options describing the stub upstreams to a command line.
+
+    Args:
+        parser (argparse.ArgumentParser): the command line parser.
+    """
+    parser.add_argument("--median", type=float, default=20.0, help="upstream ms")
+    parser.add_argument("--p99", type=float, default=120.0, help="upstream ms")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--miss-rate", type=float, default=0.1)
+    parser.add_argument("--authors", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def profile_from_arguments(args: argparse.Namespace) -> StubProfile:
+    """Build the profile of the stub upstreams from the parsed command line.
+
+    Args:
+        args (argparse.Namespace): the parsed options.
+
+    Returns:
+        StubProfile: the profile.
+    """
+    return StubProfile(
+        latency=Latency(args.median / 1000, args.p99 / 1000),
+        error_rate=args.error_rate,
+        miss_rate=args.miss_rate,
+        authors=args.authors,
+        seed=args.seed,
+    )
@@ -0,0 +1,228 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import replace
+from typing import Any, Protocol, TypeVar
+
+import httpx
+
+from configs.config import Google, Openlibrary
+
+from .deadline import set_deadline
+from .hedging import HedgeBudget, HedgingTransport
+from .metrics import MetricsTransport
+from .ratelimit import RateLimitTransport, TokenBucket
+from .retrying import RetryTransport
+
+T = TypeVar("T")
+
+
+class _HttpRepository(Protocol):
+    """A repository that talks to its upstream through an optional shared client."""
+
+    name: str
+    client: httpx.AsyncClient | None
+
+
+R = TypeVar("R", bound=_HttpRepository)
+
+
+class UpstreamError(Exception):
+    """The upstream failed to answer: unlike a not found, the outcome of the lookup is unknown."""
+
+
+def check_upstream(response: httpx.Response) -> httpx.Response:
+    """Make sure the upstream answered, whether it found the resource or not.
+
+    Args:
+        response (httpx.Response): the response of the upstream.
+
+    Raises:
+        UpstreamError: if the upstream failed with a server error, or kept refusing the call
+            because of its rate limit.
+
+    Returns:
+        httpx.Response: the response itself.
+    """
+    if (
+        response.is_server_error
+        or response.status_code == httpx.codes.TOO_MANY_REQUESTS
+    ):
+        raise UpstreamError(
+            f"{response.request.method} {response.request.url} answered {response.status_code}"
+        )
+    return response
+
+
+class DeadlineTransport(httpx.AsyncBaseTransport):
+    """
+    Transport bounding the whole duration of a call, response body included.
+
+    The timeouts of httpx apply to each network operation: a slow upstream trickling
+    the response could still take much longer than the budget of the call.
+    The deadline is recorded on the request, so that the rate limit and the retries do not
+    wait past it.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, total: float) -> None:
+        """Wrap a transport.
+
+        Args:
+            transport (httpx.AsyncBaseTransport): the transport actually sending the requests.
+            total (float): the budget of each call, in seconds.
+        """
+        self.transport = transport
+        self.total = total
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send the request and read the response within the budget.
+
+        Args:
+            request (httpx.Request): the request.
+
+        Raises:
+            httpx.TimeoutException: if the budget is exhausted.
+
+        Returns:
+            httpx.Response: the response, already read.
+        """
+        set_deadline(request, self.total)
+        try:
+            async with asyncio.timeout(self.total):
+                response = await self.transport.handle_async_request(request)
+                try:
+                    await response.aread()
+                finally:
+                    await response.aclose()
+        except TimeoutError as e:
+            raise httpx.TimeoutException(
+                f"{request.method} {request.url} exceeded its {self.total}s budget",
+                request=request,
+            ) from e
+        return response
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport."""
+        await self.transport.aclose()
+
+
+def build_client(
+    datasource_settings: Google | Openlibrary,
+    budget: HedgeBudget | None = None,
+    pool: httpx.AsyncBaseTransport | None = None,
+) -> httpx.AsyncClient:
+    """Build a long-lived, pooled async client towards a single upstream.
+
+    The client keeps connections alive between calls, so that the TCP and TLS handshakes
+    are paid once per connection instead of once per call.
+    From the outermost, every call is bounded by the total budget of the datasource, retried
+    while the upstream is overloaded, hedged if slow (when a hedging budget is given), held
+    by the rate limit of the upstream and timed: the limit and the metrics apply to each
+    attempt and hedge.
+
+    Args:
+        datasource_settings (Google | Openlibrary): the settings of the datasource.
+        budget (HedgeBudget | None, optional): the global hedging budget. Defaults to None.
+        pool (httpx.AsyncBaseTransport | None, optional): the transport sending the requests
+            in place of the connection pool, eg a stub upstream. Defaults to None.
+
+    Returns:
+        httpx.AsyncClient: the client. The caller is in charge of closing it.
+    """
+    http_settings = datasource_settings.http
+    transport = pool or httpx.AsyncHTTPTransport(
+        http2=http_settings.http2,
+        limits=httpx.Limits(
+            max_connections=http_settings.max_connections,
+            max_keepalive_connections=http_settings.max_keepalive_connections,
+            keepalive_expiry=http_settings.keepalive_expiry,
+        ),
+    )
+    transport = MetricsTransport(transport, datasource_settings.name)
+    if datasource_settings.rate_limit.enabled:
+        transport = RateLimitTransport(
+            transport, TokenBucket.from_settings(datasource_settings.rate_limit)
+        )
+    if datasource_settings.hedge.enabled and budget is not None:
+        transport = HedgingTransport.from_settings(
+            transport, datasource_settings.hedge, budget
+        )
+    if datasource_settings.retry.enabled:
+        transport = RetryTransport.from_settings(transport, datasource_settings.retry)
+
+    return httpx.AsyncClient(
+        transport=DeadlineTransport(transport, http_settings.total_timeout),
+        timeout=httpx.Timeout(
+            connect=http_settings.connect_timeout,
+            read=http_settings.read_timeout,
+            write=http_settings.write_timeout,
+            pool=http_settings.pool_timeout,
+        ),
+        headers={
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        },
+        follow_redirects=True,
+    )
+
+
+def transport_layers(client: httpx.AsyncClient) -> list[httpx.AsyncBaseTransport]:
+    """Get the transport layers of a client built by build_client, to read their stats.
+
+    Args:
+        client (httpx.AsyncClient): the client.
+
+    Returns:
+        list[httpx.AsyncBaseTransport]: the layers, from the outermost to the connection pool.
+    """
+    layers: list[httpx.AsyncBaseTransport] = list()
+    transport: httpx.AsyncBaseTransport | None = client._transport
+    while transport is not None:
+        layers.append(transport)
+        transport = getattr(transport, "transport", None)
+    return layers
+
+
+def bound_client(repository: _HttpRepository) -> httpx.AsyncClient:
+    """Get the shared client of a repository.
+
+    Args:
+        repository (_HttpRepository): the repository.
+
+    Raises:
+        RuntimeError: if the repository was built without a client.
+
+    Returns:
+        httpx.AsyncClient: the client.
+    """
+    if repository.client is None:
+        raise RuntimeError(
+            f"{repository.name} has no HTTP client: pass one or use the blocking variants."
+        )
+    return repository.client
+
+
+def run_blocking(
+    repository: R,
+    datasource_settings: Google | Openlibrary,
+    method: Callable[..., Awaitable[T]],
+    *args: Any,
+) -> T:
+    """Run an async method of a repository from synchronous code.
+
+    A short-lived client is opened for the call, since the shared one is bound
+    to the event loop of the application.
+
+    Args:
+        repository (R): the repository.
+        datasource_settings (Google | Openlibrary): the settings of the datasource.
+        method (Callable[..., Awaitable[T]]): the unbound async method to run.
+
+    Returns:
+        T: the result of the method.
+    """
+
+    async def _run() -> T:
+        async with build_client(datasource_settings) as client:
+            return await method(replace(repository, client=client), *args)  # type: ignore[type-var]
+
+    return asyncio.run(_run())
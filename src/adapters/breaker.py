@@ -0,0 +1,248 @@
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from ferrea.core.context import Context
+from ferrea.models.datasource import BookDatasource
+from ferrea.observability.logs import ferrea_logger
+
+from configs.config import Breaker
+from models.breaker import BreakerState
+
+from .ratelimit import ThrottledError
+from .wrapping import RepositoryWrapper
+
+
+class CircuitOpenError(Exception):
+    """The datasource is skipped, since its circuit breaker is open."""
+
+
+@dataclass
+class BreakerStats:
+    """Counters of a circuit breaker."""
+
+    successes: int = 0
+    failures: int = 0
+    slow_calls: int = 0
+    rejected: int = 0
+    opened: int = 0
+
+
+@dataclass
+class CircuitBreaker:
+    """
+    Circuit breaker with closed, open and half-open states.
+
+    While closed, the outcomes of the calls are kept over a sliding time window: once enough calls
+    were made, the breaker opens if either the error rate or the rate of slow calls is too high.
+    While open, every call is rejected. After `open_for` seconds the breaker is half-open, and lets
+    a few trial calls through: it closes if all of them succeed, it opens again otherwise.
+    """
+
+    name: str
+    window: float
+    min_calls: int
+    error_rate: float
+    slow_call: float
+    slow_rate: float
+    open_for: float
+    half_open_calls: int
+    clock: Callable[[], float] = time.monotonic
+    stats: BreakerStats = field(default_factory=BreakerStats)
+    _state: BreakerState = field(default=BreakerState.CLOSED, init=False)
+    _opened_at: float = field(default=0.0, init=False)
+    _trials: int = field(default=0, init=False)
+    _trial_successes: int = field(default=0, init=False)
+    _outcomes: deque[tuple[float, bool, bool]] = field(
+        default_factory=deque, init=False, repr=False
+    )
+
+    @classmethod
+    def from_settings(cls, name: str, breaker_settings: Breaker) -> "CircuitBreaker":
+        """Build the breaker from the datasource settings.
+
+        Args:
+            name (str): the datasource name.
+            breaker_settings (Breaker): the breaker settings of the datasource.
+
+        Returns:
+            CircuitBreaker: the breaker.
+        """
+        return cls(
+            name=name,
+            window=breaker_settings.window,
+            min_calls=breaker_settings.min_calls,
+            error_rate=breaker_settings.error_rate,
+            slow_call=breaker_settings.slow_call,
+            slow_rate=breaker_settings.slow_rate,
+            open_for=breaker_settings.open_for,
+            half_open_calls=breaker_settings.half_open_calls,
+        )
+
+    @property
+    def state(self) -> BreakerState:
+        """Get the current state, moving from open to half-open once the cool down is over."""
+        if (
+            self._state == BreakerState.OPEN
+            and self.clock() - self._opened_at >= self.open_for
+        ):
+            self._transition(BreakerState.HALF_OPEN)
+        return self._state
+
+    def allow(self) -> bool:
+        """Check whether a call can go through, booking a trial call if half-open.
+
+        Returns:
+            bool: whether the call can be performed.
+        """
+        match self.state:
+            case BreakerState.CLOSED:
+                return True
+            case BreakerState.HALF_OPEN if self._trials < self.half_open_calls:
+                self._trials += 1
+                return True
+            case _:
+                self.stats.rejected += 1
+                return False
+
+    def record(self, success: bool, latency: float) -> None:
+        """Record the outcome of an allowed call.
+
+        Args:
+            success (bool): whether the datasource answered.
+            latency (float): the duration of the call, in seconds.
+        """
+        slow = latency >= self.slow_call
+        self.stats.successes += success
+        self.stats.failures += not success
+        self.stats.slow_calls += slow
+
+        if self._state == BreakerState.HALF_OPEN:
+            if not success or slow:
+                self._open()
+                return
+            self._trial_successes += 1
+            if self._trial_successes >= self.half_open_calls:
+                self._transition(BreakerState.CLOSED)
+            return
+
+        if self._state == BreakerState.OPEN:
+            return
+
+        now = self.clock()
+        self._outcomes.append((now, not success, slow))
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return
+        failures = sum(x[1] for x in self._outcomes)
+        slow_calls = sum(x[2] for x in self._outcomes)
+        if failures / calls >= self.error_rate or slow_calls / calls >= self.slow_rate:
+            self._open()
+
+    def release(self) -> None:
+        """Give back a call that was cancelled before its outcome was known."""
+        if self._state == BreakerState.HALF_OPEN and self._trials > 0:
+            self._trials -= 1
+
+    def _open(self) -> None:
+        """Open the breaker, rejecting the calls for the cool down."""
+        self._opened_at = self.clock()
+        self.stats.opened += 1
+        self._transition(BreakerState.OPEN)
+
+    def _transition(self, state: BreakerState) -> None:
+        """Move to a new state, resetting what is tracked by the previous one.
+
+        Args:
+            state (BreakerState): the new state.
+        """
+        ferrea_logger.warning(
+            f"Circuit breaker of {self.name} moves from {self._state} to {state}."
+        )
+        self._state = state
+        self._trials = 0
+        self._trial_successes = 0
+        self._outcomes.clear()
+
+
+@dataclass
+class BreakerRepository(RepositoryWrapper):
+    """
+    Decorator for any ApiService, skipping the datasource while its circuit breaker is open.
+    Not found results are successes: only errors count as failures, except the calls refused
+    by the client-side rate limit, which count as neither.
+    """
+
+    breaker: CircuitBreaker
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Search for a book on the datasource, unless the breaker is open.
+
+        Args:
+            isbn (str): the isbn of the book.
+            context (Context): the api request context.
+
+        Raises:
+            CircuitOpenError: if the breaker is open.
+
+        Returns:
+            BookDatasource | None: the instance with the fetched information or None if not found.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} is skipped, its breaker is open.")
+
+        start = time.perf_counter()
+        try:
+            book = await super().search_for_book_info_async(isbn, context)
+        except ThrottledError:
+            # refused by our own rate limit: it says nothing about the upstream
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record(False, time.perf_counter() - start)
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record(True, time.perf_counter() - start)
+        return book
+
+    async def search_for_books_info_async(
+        self, isbns: list[str], context: Context
+    ) -> dict[str, BookDatasource | None]:
+        """Search for many books at once on the datasource, unless the breaker is open.
+
+        Args:
+            isbns (list[str]): the isbns of the books.
+            context (Context): the api request context.
+
+        Raises:
+            CircuitOpenError: if the breaker is open.
+
+        Returns:
+            dict[str, BookDatasource | None]: the instance found for each isbn, None if not found.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} is skipped, its breaker is open.")
+
+        # bulk searches are slow by design: only their errors are taken into account
+        try:
+            books = await super().search_for_books_info_async(isbns, context)
+        except ThrottledError:
+            # refused by our own rate limit: it says nothing about the upstream
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record(False, 0.0)
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record(True, 0.0)
+        return books
@@ -0,0 +1,286 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from ferrea.core.context import Context
+from ferrea.models.datasource import BookDatasource
+
+from configs.config import Cache, Portraits
+
+from .wrapping import RepositoryWrapper
+
+NEGATIVE_ENTRY_SIZE = 64
+
+
+@dataclass(slots=True)
+class _Entry:
+    """A cached lookup result. A None value records that the book was not found."""
+
+    value: BookDatasource | None
+    expires_at: float
+    size: int
+
+
+@dataclass
+class CacheStats:
+    """Counters of a result cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+@dataclass
+class ResultCache:
+    """
+    In-process LRU cache of lookup results, bounded both in entries and in bytes.
+
+    Found books and not found ones have separate TTLs, so that a book added
+    later to the datasource is picked up sooner.
+    The size of an entry is estimated from its JSON serialization.
+    """
+
+    max_entries: int
+    max_bytes: int
+    ttl: float
+    negative_ttl: float
+    clock: Callable[[], float] = time.monotonic
+    stats: CacheStats = field(default_factory=CacheStats)
+    _entries: OrderedDict[str, _Entry] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+    _bytes: int = field(default=0, init=False)
+
+    @classmethod
+    def from_settings(cls, cache_settings: Cache) -> "ResultCache":
+        """Build the cache from the datasource settings.
+
+        Args:
+            cache_settings (Cache): the cache settings of the datasource.
+
+        Returns:
+            ResultCache: the cache.
+        """
+        return cls(
+            max_entries=cache_settings.max_entries,
+            max_bytes=cache_settings.max_bytes,
+            ttl=cache_settings.ttl,
+            negative_ttl=cache_settings.negative_ttl,
+        )
+
+    def __len__(self) -> int:
+        """Get the number of entries, including the expired ones not evicted yet."""
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Get the estimated size of the cached entries."""
+        return self._bytes
+
+    def lookup(self, key: str) -> tuple[bool, BookDatasource | None]:
+        """Search the cache.
+
+        Args:
+            key (str): the key of the lookup.
+
+        Returns:
+            tuple[bool, BookDatasource | None]: whether the key was cached and its value.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return False, None
+
+        if entry.expires_at <= self.clock():
+            self._remove(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return True, entry.value
+
+    def store(
+        self, key: str, value: BookDatasource | None, ttl: float | None = None
+    ) -> None:
+        """Store a lookup result, evicting the least recently used entries if needed.
+
+        Args:
+            key (str): the key of the lookup.
+            value (BookDatasource | None): the result, None if the book was not found.
+            ttl (float | None, optional): at most how long to keep it, in seconds. Defaults to the TTL of the cache.
+        """
+        if value is None:
+            max_ttl = self.negative_ttl
+            size = NEGATIVE_ENTRY_SIZE + len(key)
+        else:
+            max_ttl = self.ttl
+            size = len(value.model_dump_json()) + len(key)
+        ttl = max_ttl if ttl is None else min(ttl, max_ttl)
+
+        if ttl <= 0 or size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, self.clock() + ttl, size)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        """Drop an entry, keeping track of the cached bytes.
+
+        Args:
+            key (str): the key of the entry.
+        """
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+
+@dataclass
+class FlagCache:
+    """
+    In-process LRU cache of yes/no answers, eg whether a resource exists upstream.
+
+    Yes and no answers have separate TTLs, so that a resource added later
+    to the datasource is picked up sooner.
+    """
+
+    max_entries: int
+    ttl: float
+    negative_ttl: float
+    clock: Callable[[], float] = time.monotonic
+    stats: CacheStats = field(default_factory=CacheStats)
+    _entries: OrderedDict[str, tuple[bool, float]] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+
+    @classmethod
+    def from_settings(cls, portraits_settings: Portraits) -> "FlagCache":
+        """Build the cache from the settings.
+
+        Args:
+            portraits_settings (Portraits): the portraits cache settings.
+
+        Returns:
+            FlagCache: the cache.
+        """
+        return cls(
+            max_entries=portraits_settings.max_entries,
+            ttl=portraits_settings.ttl,
+            negative_ttl=portraits_settings.negative_ttl,
+        )
+
+    def __len__(self) -> int:
+        """Get the number of entries, including the expired ones not evicted yet."""
+        return len(self._entries)
+
+    def lookup(self, key: str) -> tuple[bool, bool]:
+        """Search the cache.
+
+        Args:
+            key (str): the key of the answer.
+
+        Returns:
+            tuple[bool, bool]: whether the key was cached and its answer.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return False, False
+
+        value, expires_at = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return False, False
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return True, value
+
+    def store(self, key: str, value: bool) -> None:
+        """Store an answer, evicting the least recently used entries if needed.
+
+        Args:
+            key (str): the key of the answer.
+            value (bool): the answer.
+        """
+        ttl = self.ttl if value else self.negative_ttl
+        if ttl <= 0:
+            return
+
+        self._entries.pop(key, None)
+        self._entries[key] = (value, self.clock() + ttl)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+
+@dataclass
+class CachedRepository(RepositoryWrapper):
+    """
+    Decorator for any ApiService, answering from a ResultCache before querying the datasource.
+
+    Failures are not cached: only found and not found results are.
+    The blocking methods are not cached, and go straight to the datasource.
+    """
+
+    cache: ResultCache
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Search for a book in the cache first, then on the datasource.
+
+        Args:
+            isbn (str): the isbn of the book.
+            context (Context): the api request context.
+
+        Returns:
+            BookDatasource | None: the instance with the fetched information or None if not found.
+        """
+        found, book = self.cache.lookup(isbn)
+        if found:
+            return book
+
+        book = await self.repository.search_for_book_info_async(isbn, context)
+        self.cache.store(isbn, book)
+        return book
+
+    async def search_for_books_info_async(
+        self, isbns: list[str], context: Context
+    ) -> dict[str, BookDatasource | None]:
+        """Search for many books in the cache first, then the missing ones on the datasource.
+
+        Args:
+            isbns (list[str]): the isbns of the books.
+            context (Context): the api request context.
+
+        Returns:
+            dict[str, BookDatasource | None]: the instance found for each isbn, None if not found.
+        """
+        books: dict[str, BookDatasource | None] = dict()
+        misses: list[str] = list()
+        for isbn in isbns:
+            found, book = self.cache.lookup(isbn)
+            if found:
+                books[isbn] = book
+            else:
+                misses.append(isbn)
+
+        if misses:
+            fetched = await super().search_for_books_info_async(misses, context)
+            for isbn, book in fetched.items():
+                self.cache.store(isbn, book)
+            books.update(fetched)
+
+        return books
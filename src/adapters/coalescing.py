@@ -0,0 +1,115 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from ferrea.core.context import Context
+from ferrea.models.datasource import BookDatasource
+
+from .wrapping import RepositoryWrapper
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Flight:
+    """A call in flight and the number of callers awaiting it."""
+
+    task: asyncio.Task[Any]
+    waiters: int = 0
+
+
+@dataclass
+class SingleFlight:
+    """
+    Coalesce concurrent calls sharing the same key into a single execution.
+
+    The first caller starts the call, the concurrent ones await the same result or error.
+    The call runs in its own task: a caller being cancelled does not cancel it for the others,
+    but the call is cancelled once every caller has left, so that no upstream capacity is
+    spent on a result nobody awaits.
+
+    The call runs in the context of the first caller: its contextvars, eg the Server-Timing
+    stages, and the request context it was given. The other callers only get its result.
+    """
+
+    coalesced: int = 0
+    _inflight: dict[Hashable, _Flight] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    def __len__(self) -> int:
+        """Get the number of calls in flight."""
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """Run the call, unless one with the same key is already in flight.
+
+        Args:
+            key (Hashable): the key identifying identical calls.
+            call (Callable[[], Awaitable[T]]): the call to perform.
+
+        Returns:
+            T: the result of the call.
+        """
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda x: self._forget(key, x))
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # the last caller left: a new one must not join the call being cancelled
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                flight.task.cancel()
+
+    def _forget(self, key: Hashable, task: asyncio.Task[Any]) -> None:
+        """Drop a completed call, so that the next caller starts a new one.
+
+        Args:
+            key (Hashable): the key of the call.
+            task (asyncio.Task[Any]): the completed call.
+        """
+        flight = self._inflight.get(key)
+        if flight is not None and flight.task is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # mark the error as retrieved, in case every caller was cancelled meanwhile
+            task.exception()
+
+
+@dataclass
+class CoalescedRepository(RepositoryWrapper):
+    """
+    Decorator for any ApiService, coalescing the concurrent lookups of the same isbn
+    into a single one towards the datasource.
+
+    The lookup is logged and timed under the request of the first caller.
+    """
+
+    flight: SingleFlight
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Search for a book, joining the identical lookup in flight if any.
+
+        Args:
+            isbn (str): the isbn of the book.
+            context (Context): the api request context.
+
+        Returns:
+            BookDatasource | None: the instance with the fetched information or None if not found.
+        """
+        return await self.flight.do(
+            (self.name, isbn),
+            lambda: self.repository.search_for_book_info_async(isbn, context),
+        )
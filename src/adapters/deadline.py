@@ -0,0 +1,31 @@
+import time
+
+import httpx
+
+# request extension holding the moment the call must be over by, on the monotonic clock
+DEADLINE_EXTENSION = "ferrea.deadline"
+
+
+def set_deadline(request: httpx.Request, total: float) -> None:
+    """Record the budget of a call on its request, for the inner transports to fit in it.
+
+    Args:
+        request (httpx.Request): the request.
+        total (float): the budget of the call, in seconds.
+    """
+    request.extensions[DEADLINE_EXTENSION] = time.monotonic() + total
+
+
+def remaining(request: httpx.Request) -> float | None:
+    """Get the time left to the call of a request.
+
+    Args:
+        request (httpx.Request): the request.
+
+    Returns:
+        float | None: the time left, in seconds, or None if the call is not bounded.
+    """
+    deadline = request.extensions.get(DEADLINE_EXTENSION)
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
@@ -3,7 +3,6 @@ from dataclasses import dataclass
 from typing import Any
 
 import httpx
-import jmespath
 from ferrea.core.context import Context
 from ferrea.models.datasource import BookDatasource
 from ferrea.observability.logs import ferrea_logger
@@ -11,12 +10,94 @@ from pydantic import HttpUrl
 
 from configs import settings
 
+from ._http import bound_client, check_upstream, run_blocking
+from .hedging import hedged
+from .mapping import Field, FieldMapping
+from .metrics import endpoint
+from .timing import timed
+
 GOOGLE_API_BASE_URL = settings.google.api_url
 
 BOOK_DATA = "book"
 AUTHOR_DATA = "author"
 PORTRAIT_DATA = "cover"
 
+ISODATE_PATTERN = re.compile(r"^(?P<year>\d{4})-\d{2}-\d{2}$")
+YEAR_PATTERN = re.compile(r"^\d{4}$")
+
+
+def _parse_published_on(date: str | None) -> int | None:
+    """Try to parse the published date.
+    If it fails, return None.
+
+    Args:
+        date (str | None): the published date of the volume.
+
+    Returns:
+        int | None: the year or None if not desumed.
+    """
+    if date is None:
+        return None
+
+    is_isodate = ISODATE_PATTERN.match(date)
+    if is_isodate:
+        return int(is_isodate.group("year"))
+
+    is_year = YEAR_PATTERN.match(date)
+    if is_year:
+        return int(date)
+
+    return None
+
+
+VOLUME_MAPPING = FieldMapping(
+    {
+        "title": Field("volumeInfo.title"),
+        "authors": Field("volumeInfo.authors"),
+        "publishing": Field("volumeInfo.publisher"),
+        "published_on": Field("volumeInfo.publishedDate", _parse_published_on),
+        "cover": Field("volumeInfo.imageLinks.thumbnail", HttpUrl),
+        "plot": Field("volumeInfo.description"),
+        "languages": Field("volumeInfo.language", lambda x: [x]),
+        "book_formats": Field("volumeInfo.printType", lambda x: [x]),
+    }
+)
+
+
+def _fields_mask(paths: list[str]) -> str:
+    """Build a Google partial-response mask from json paths.
+    Eg `["a.b", "a.c.d", "e"]` becomes `a(b,c(d)),e`.
+
+    Refer to https://developers.google.com/books/docs/v1/performance#partial-response.
+
+    Args:
+        paths (list[str]): the dotted json paths to keep in the response.
+
+    Returns:
+        str: the value for the `fields` query parameter.
+    """
+    children: dict[str, list[str]] = dict()
+    for path in paths:
+        head, _, tail = path.partition(".")
+        children.setdefault(head, list())
+        if tail:
+            children[head].append(tail)
+
+    return ",".join(
+        f"{head}({_fields_mask(tails)})" if tails else head
+        for head, tails in children.items()
+    )
+
+
+# the fields a volume cannot be mapped without, the others being optional upstream
+REQUIRED_FIELDS = frozenset(
+    x for x, y in BookDatasource.model_fields.items() if y.is_required()
+)
+VOLUME_FIELDS_MASK = _fields_mask(VOLUME_MAPPING.expressions)
+SEARCH_FIELDS_MASK = _fields_mask(
+    ["totalItems", "items.id", *[f"items.{x}" for x in VOLUME_MAPPING.expressions]]
+)
+
 
 @dataclass
 class GoogleBooksRepository:
@@ -30,86 +111,120 @@ class GoogleBooksRepository:
     Refer to https://developers.google.com/books/docs/overview for documentation.
     """
 
-    context: Context
     name: str
+    client: httpx.AsyncClient | None = None
+
+    def search_for_book_info(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Blocking variant of search_for_book_info_async, for scripts and tests.
+
+        Args:
+            isbn (str): the isbn of the book.
+            context (Context): the api request context.
 
-    def search_for_book_info(self, isbn: str) -> BookDatasource | None:
+        Returns:
+            BookDatasource | None: the instance with the fetched information or None if not found.
+        """
+        return run_blocking(
+            self,
+            settings.google,
+            GoogleBooksRepository.search_for_book_info_async,
+            isbn,
+            context,
+        )
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
         """Search on Google Books the required isbn for book information.
 
+        With the single request mode, the search itself returns every field needed,
+        trimmed by a partial-response mask. The volume is fetched with a second request only
+        if the search result is missing a required one, or if the mode is disabled.
+
         Args:
             isbn (str): the isbn of the book.
+            context (Context): the api request context.
 
         Returns:
             BookDatasource | None: the instance with the fetched information or None if not found.
         """
-        book_summary = self._perform_isbn_search(isbn)
+        book_summary = await self._perform_isbn_search(isbn, context)
         if book_summary is None:
             return None
 
-        book_id = book_summary["items"][0]["id"]
-        self._datasource = self._perform_book_fetch(book_id)
+        volume = book_summary["items"][0]
+        if not settings.google.single_request or _is_incomplete(volume):
+            volume = await self._perform_book_fetch(volume["id"], context)
+            if volume is None:
+                return None
 
-        return self._deserialize_data()
+        with timed(f"{self.name}.mapping"):
+            return VOLUME_MAPPING.build(volume)
 
-    def _perform_isbn_search(self, isbn: str) -> dict[str, Any] | None:
+    async def _perform_isbn_search(
+        self, isbn: str, context: Context
+    ) -> dict[str, Any] | None:
         """Perform a search on Google Books to see if the isbn is known.
 
         Args:
             isbn (str): the isbn of the book.
+            context (Context): the api request context.
 
         Returns:
             dict[str, Any] | None: the response from the service or None if book not found.
         """
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
-        qp = {
-            "q": f"isbn:{isbn}",
-            "projection": "lite",
-        }
+        if settings.google.single_request:
+            qp = {
+                "q": f"isbn:{isbn}",
+                "maxResults": 1,
+                "fields": SEARCH_FIELDS_MASK,
+            }
+        else:
+            qp = {
+                "q": f"isbn:{isbn}",
+                "projection": "lite",
+            }
         uri = f"{GOOGLE_API_BASE_URL}/volumes"
 
-        with httpx.Client() as client:
-            response = client.get(
-                uri,
-                headers=headers,
-                params=qp,
-                follow_redirects=True,
-            )
+        response = check_upstream(
+            await bound_client(self).get(uri, params=qp, extensions=hedged("volumes"))
+        )
 
-        if response.json()["totalItems"] == 0:
+        with timed(f"{self.name}.parse"):
+            found = response.json()
+        if not found.get("items"):
             ferrea_logger.info(
                 (
                     f"Unable to find {isbn} on Google Books."
                     f" Response is {response.status_code} {response}"
                 ),
-                **self.context.log,
+                **context.log,
             )
             return None
-        return response.json()
+        return found
 
-    def _perform_book_fetch(self, book_id: str) -> dict[str, Any] | None:
+    async def _perform_book_fetch(
+        self, book_id: str, context: Context
+    ) -> dict[str, Any] | None:
         """Given a book id, fetch the single resource.
 
         Args:
             book_id (str): the Google Books ID.
+            context (Context): the api request context.
 
         Returns:
             dict[str, Any] | None: the response from the service or None if book not found.
         """
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
+        qp = {
+            "fields": f"id,{VOLUME_FIELDS_MASK}",
         }
         uri = f"{GOOGLE_API_BASE_URL}/volumes/{book_id}"
 
-        with httpx.Client() as client:
-            response = client.get(
-                uri,
-                headers=headers,
-                follow_redirects=True,
-            )
+        response = check_upstream(
+            await bound_client(self).get(uri, params=qp, extensions=hedged("volume"))
+        )
 
         if not response.status_code == httpx.codes.OK:
             ferrea_logger.info(
@@ -117,93 +232,49 @@ class GoogleBooksRepository:
                     f"Unable to find {book_id} on Google Books."
                     f" Response is {response.status_code} {response}"
                 ),
-                **self.context.log,
+                **context.log,
             )
             return None
-        return response.json()
+        with timed(f"{self.name}.parse"):
+            return response.json()
 
-    def _deserialize_data(self) -> BookDatasource:
-        """From the raw data build the final object instance.
+    async def healthy_async(self, context: Context) -> bool:
+        """Health check towards the datasource.
 
         Args:
-            book_data (dict[str, Any]): data of the book.
-            authors_portraits (list[str]): the list with the authors's portraits.
+            context (Context): the api request context.
 
         Returns:
-            BookDatasource: the final instance of the object.
+            bool: whether the datasource answered as expected.
         """
-        return BookDatasource(
-            title=self._extract_value_from_key("volumeInfo.title"),
-            authors=self._extract_value_from_key("volumeInfo.authors"),
-            publishing=self._extract_value_from_key("volumeInfo.publisher"),
-            published_on=self._parse_published_on(),
-            cover=HttpUrl(
-                self._extract_value_from_key("volumeInfo.imageLinks.thumbnail")
-            ),
-            plot=self._extract_value_from_key("volumeInfo.description"),
-            languages=[self._extract_value_from_key("volumeInfo.language")],
-            book_formats=[self._extract_value_from_key("volumeInfo.printType")],
-        )
-
-    def _parse_published_on(self) -> int | None:
-        """Try to parse the published date.
-        If it fails, return None.
-
-        Returns:
-            int | None: the year or None if not desumed.
-        """
-        date = self._extract_value_from_key("volumeInfo.publishedDate")
-        if date is None:
-            return None
-
-        isodate_pattern = re.compile(r"^(?P<year>\d{4})-\d{2}-\d{2}$")
-        is_isodate = isodate_pattern.match(date)
-        if is_isodate:
-            return int(is_isodate.group("year"))
-
-        year_pattern = re.compile(r"^\d{4}$")
-        is_year = year_pattern.match(date)
-        if is_year:
-            return int(date)
-
-        return None
-
-    def _extract_value_from_key(
-        self,
-        jsonpath: str,
-    ) -> Any:
-        """Given the json path, extract the value from the path from the data fetched from the APIs.
-
-        Args:
-            jsonpath (str): the path of intereset.
-
-        Returns:
-            str | None: the value, if the path is found.
-        """
-        expression = jmespath.compile(jsonpath)
-        return expression.search(self._datasource)
-
-    @property
-    def healthy(self) -> bool:
-        """Health check towards the datasource."""
         headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
             "User-Agent": "FastAPI HealthCheck",
         }
         uri = f"{GOOGLE_API_BASE_URL}/volumes"
 
-        with httpx.Client() as client:
-            response = client.get(
-                uri,
-                headers=headers,
-                follow_redirects=True,
-            )
+        response = await bound_client(self).get(
+            uri, headers=headers, extensions=endpoint("health")
+        )
 
         if not response.status_code == httpx.codes.BAD_REQUEST:
             ferrea_logger.info(
                 (f"GoogleBooks probe failed with {response.status_code}"),
-                **self.context.log,
+                **context.log,
             )
             return False
         return True
+
+
+def _is_incomplete(volume: dict[str, Any]) -> bool:
+    """Check whether a volume from the search results misses a field required by the model.
+
+    The optional fields, eg the description or the thumbnail, are often absent upstream:
+    fetching the volume again would only return the same gaps.
+
+    Args:
+        volume (dict[str, Any]): the volume.
+
+    Returns:
+        bool: whether the full volume has to be fetched.
+    """
+    return not REQUIRED_FIELDS.isdisjoint(VOLUME_MAPPING.missing(volume))
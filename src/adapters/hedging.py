@@ -0,0 +1,306 @@
+import asyncio
+import bisect
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import httpx
+
+from configs.config import Hedge, Hedging
+
+# request extension marking the calls that may be hedged, with the route they belong to
+HEDGE_EXTENSION = "ferrea.hedge"
+
+HEDGEABLE_METHODS = frozenset(("GET", "HEAD"))
+
+
+def hedged(route: str) -> dict[str, str]:
+    """Get the request extensions that mark a call as hedgeable.
+
+    Args:
+        route (str): the route of the call: latencies are tracked per route.
+
+    Returns:
+        dict[str, str]: the extensions to pass to the client.
+    """
+    return {HEDGE_EXTENSION: route}
+
+
+@dataclass
+class HedgeStats:
+    """Counters of the hedged requests."""
+
+    requests: int = 0
+    hedges: int = 0
+    wins: int = 0
+    denied: int = 0
+
+
+@dataclass
+class HedgeBudget:
+    """
+    Global cap on the rate of hedges, shared by every upstream.
+
+    Each hedgeable request earns `max_rate` tokens, and each hedge spends a whole one:
+    in the long run at most `max_rate` of the requests are duplicated. Up to `burst` tokens
+    are kept, so that a short latency spike can still be hedged.
+    """
+
+    max_rate: float
+    burst: float
+    stats: HedgeStats = field(default_factory=HedgeStats)
+    _tokens: float = field(default=0.0, init=False)
+
+    @classmethod
+    def from_settings(cls, hedging_settings: Hedging) -> "HedgeBudget":
+        """Build the budget from the settings.
+
+        Args:
+            hedging_settings (Hedging): the global hedging settings.
+
+        Returns:
+            HedgeBudget: the budget.
+        """
+        return cls(max_rate=hedging_settings.max_rate, burst=hedging_settings.burst)
+
+    def deposit(self) -> None:
+        """Earn the tokens of a new hedgeable request."""
+        self.stats.requests += 1
+        self._tokens = min(self.burst, self._tokens + self.max_rate)
+
+    def withdraw(self) -> bool:
+        """Spend a token for a hedge, if any is left.
+
+        Returns:
+            bool: whether the hedge can be sent.
+        """
+        if self._tokens < 1:
+            self.stats.denied += 1
+            return False
+        self._tokens -= 1
+        self.stats.hedges += 1
+        return True
+
+
+@dataclass
+class LatencyTracker:
+    """
+    Percentile of the latencies of a route, over its most recent calls.
+
+    The window is also kept sorted, updated on each call, so that reading the percentile
+    is a lookup.
+    """
+
+    percentile: float
+    min_samples: int
+    window: int
+    _samples: deque[float] = field(init=False, repr=False)
+    _sorted: list[float] = field(default_factory=list, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._samples = deque()
+
+    def observe(self, latency: float) -> None:
+        """Record the latency of a call.
+
+        Args:
+            latency (float): the duration of the call, in seconds.
+        """
+        if len(self._samples) == self.window:
+            oldest = self._samples.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+        self._samples.append(latency)
+        bisect.insort(self._sorted, latency)
+
+    def value(self) -> float | None:
+        """Get the percentile of the recent latencies.
+
+        Returns:
+            float | None: the latency, in seconds, or None if too few calls were observed.
+        """
+        if len(self._sorted) < self.min_samples:
+            return None
+        rank = math.ceil(self.percentile * len(self._sorted)) - 1
+        return self._sorted[max(rank, 0)]
+
+
+class HedgingTransport(httpx.AsyncBaseTransport):
+    """
+    Transport sending a duplicate of the hedgeable requests that are slower than usual.
+
+    If a request marked with `hedged` has not answered by the observed percentile of its route,
+    the same request is sent again, as long as the global budget allows it: the first successful
+    response is returned, the other request is cancelled.
+    The responses are read in full by the transport, so that the body counts in the race.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        budget: HedgeBudget,
+        percentile: float,
+        min_samples: int,
+        window: int,
+        min_delay: float,
+    ) -> None:
+        """Wrap a transport.
+
+        Args:
+            transport (httpx.AsyncBaseTransport): the transport actually sending the requests.
+            budget (HedgeBudget): the budget shared by every upstream.
+            percentile (float): the percentile of the latencies after which a request is hedged.
+            min_samples (int): the number of calls to observe on a route before hedging it.
+            window (int): the number of most recent calls the percentile is computed over.
+            min_delay (float): the minimum wait before hedging, in seconds.
+        """
+        self.transport = transport
+        self.budget = budget
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        self.trackers: dict[str, LatencyTracker] = dict()
+
+    @classmethod
+    def from_settings(
+        cls,
+        transport: httpx.AsyncBaseTransport,
+        hedge_settings: Hedge,
+        budget: HedgeBudget,
+    ) -> "HedgingTransport":
+        """Wrap a transport, as configured for the datasource.
+
+        Args:
+            transport (httpx.AsyncBaseTransport): the transport actually sending the requests.
+            hedge_settings (Hedge): the hedging settings of the datasource.
+            budget (HedgeBudget): the budget shared by every upstream.
+
+        Returns:
+            HedgingTransport: the transport.
+        """
+        return cls(
+            transport,
+            budget,
+            percentile=hedge_settings.percentile,
+            min_samples=hedge_settings.min_samples,
+            window=hedge_settings.window,
+            min_delay=hedge_settings.min_delay,
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send the request, hedging it if it is slow.
+
+        Args:
+            request (httpx.Request): the request.
+
+        Returns:
+            httpx.Response: the first successful response.
+        """
+        route = request.extensions.get(HEDGE_EXTENSION)
+        if route is None or request.method not in HEDGEABLE_METHODS:
+            return await self.transport.handle_async_request(request)
+
+        tracker = self.trackers.get(route)
+        if tracker is None:
+            tracker = LatencyTracker(self.percentile, self.min_samples, self.window)
+            self.trackers[route] = tracker
+
+        self.budget.deposit()
+        delay = tracker.value()
+        primary = asyncio.create_task(self._attempt(request, tracker))
+        if delay is None:
+            return await primary
+
+        delay = max(delay, self.min_delay)
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done or not self.budget.withdraw():
+            return await primary
+
+        hedge = asyncio.create_task(self._attempt(request, tracker))
+        return await self._race(primary, hedge)
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport."""
+        await self.transport.aclose()
+
+    async def _attempt(
+        self,
+        request: httpx.Request,
+        tracker: LatencyTracker,
+    ) -> httpx.Response:
+        """Send the request and read the response body.
+
+        The latency is observed even if the attempt is cancelled, as a lower bound.
+
+        Args:
+            request (httpx.Request): the request.
+            tracker (LatencyTracker): the latencies of the route.
+
+        Returns:
+            httpx.Response: the response, already read.
+        """
+        start = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+        except asyncio.CancelledError:
+            # the attempt lost the race: it would have taken at least this long
+            tracker.observe(time.perf_counter() - start)
+            raise
+        tracker.observe(time.perf_counter() - start)
+        return response
+
+    async def _race(
+        self,
+        primary: asyncio.Task[httpx.Response],
+        hedge: asyncio.Task[httpx.Response],
+    ) -> httpx.Response:
+        """Wait for the first successful attempt, cancelling the other one.
+        An upstream overloaded or failing, with a 5xx or a 429, is not a success: the other
+        attempt is awaited.
+
+        Args:
+            primary (asyncio.Task[httpx.Response]): the original request.
+            hedge (asyncio.Task[httpx.Response]): the duplicate request.
+
+        Returns:
+            httpx.Response: the first successful response, or the error of the primary if both failed.
+        """
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None and not _retryable(task.result()):
+                        self.budget.stats.wins += task is hedge
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _retryable(response: httpx.Response) -> bool:
+    """Tell whether a response is a failure of the upstream, that the other attempt may not get.
+
+    Args:
+        response (httpx.Response): the response of an attempt.
+
+    Returns:
+        bool: whether it is a server error or a refusal because of load.
+    """
+    return (
+        response.is_server_error
+        or response.status_code == httpx.codes.TOO_MANY_REQUESTS
+    )
@@ -0,0 +1,367 @@
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from itertools import zip_longest
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+from ferrea.core.context import Context
+from ferrea.models.datasource import BookDatasource
+
+from .openlibrary import (
+    AUTHOR_DATA,
+    BOOK_DATA,
+    OPENLIBRARY_COVER_BASE_URL,
+    RECORD_MAPPING,
+    book_record,
+)
+from .timing import timed
+
+MAGIC = b"FOLX"
+VERSION = 1
+# magic, version, byte order (1 for little endian) and number of isbns
+HEADER = struct.Struct("<4sHHQ")
+# the author portraits are stored as olids, their url is built when read
+PORTRAIT_IDS = "portraits"
+# how many isbns are sorted at once when writing an index
+SORT_CHUNK = 1 << 20
+
+
+def _byte_order() -> int:
+    """Get the byte order of the machine, as stored in the header."""
+    return 1 if sys.byteorder == "little" else 0
+
+
+@dataclass
+class IndexStats:
+    """Counters of a local index."""
+
+    hits: int = 0
+    misses: int = 0
+
+
+@dataclass
+class LocalIndex:
+    """
+    Read-only isbn index of the OpenLibrary dumps, memory-mapped from a local file.
+
+    The file holds a header, the sorted isbns as 64 bits integers, the offset of the record
+    of each isbn, and the records: the trimmed edition with its authors, as compact JSON.
+    The isbns and offsets are read in place, through the page cache: a lookup is a binary
+    search and a slice, with nothing loaded in memory upfront, and the pages are shared by
+    every process mapping the file. The integers are in the byte order of the machine that
+    built the index.
+    """
+
+    path: Path
+    stats: IndexStats = field(default_factory=IndexStats)
+    _map: mmap.mmap | None = field(default=None, init=False, repr=False)
+    _isbns: memoryview | None = field(default=None, init=False, repr=False)
+    _offsets: memoryview | None = field(default=None, init=False, repr=False)
+    _heap: memoryview | None = field(default=None, init=False, repr=False)
+
+    @classmethod
+    @contextmanager
+    def open(cls, path: str | Path) -> Iterator["LocalIndex"]:
+        """Map an index file for the duration of the context.
+
+        Args:
+            path (str | Path): the index file.
+
+        Raises:
+            ValueError: if the file is not an index, or was built by an incompatible version or machine.
+
+        Yields:
+            LocalIndex: the index.
+        """
+        index = cls(Path(path))
+        index.connect()
+        try:
+            yield index
+        finally:
+            index.close()
+
+    def __len__(self) -> int:
+        """Get the number of isbns in the index."""
+        return 0 if self._isbns is None else len(self._isbns)
+
+    def connect(self) -> None:
+        """Map the file and check its header.
+
+        Raises:
+            ValueError: if the file is not an index, or was built by an incompatible version or machine.
+        """
+        with self.path.open("rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, byte_order, count = HEADER.unpack_from(self._map)
+        except struct.error:
+            magic, version, byte_order, count = b"", 0, 0, 0
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not an OpenLibrary index")
+        if version != VERSION or byte_order != _byte_order():
+            self.close()
+            raise ValueError(
+                f"{self.path} was built by an incompatible version or machine: rebuild it"
+            )
+
+        view = memoryview(self._map)
+        isbns_end = HEADER.size + 8 * count
+        offsets_end = isbns_end + 8 * (count + 1)
+        self._isbns = view[HEADER.size : isbns_end].cast("Q")
+        self._offsets = view[isbns_end:offsets_end].cast("Q")
+        self._heap = view[offsets_end:]
+        view.release()
+
+    def close(self) -> None:
+        """Unmap the file."""
+        for x in (self._isbns, self._offsets, self._heap):
+            if x is not None:
+                x.release()
+        self._isbns = self._offsets = self._heap = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _position(self, isbn: str) -> int | None:
+        """Find the position of an isbn in the index.
+
+        Args:
+            isbn (str): the isbn, as ISBN-13.
+
+        Returns:
+            int | None: its position, None if not in the index.
+        """
+        if self._isbns is None or not isbn.isdigit():
+            return None
+        key = int(isbn)
+        position = bisect_left(self._isbns, key)  # type: ignore[arg-type]
+        if position < len(self._isbns) and self._isbns[position] == key:
+            return position
+        return None
+
+    def __contains__(self, isbn: str) -> bool:
+        """Whether the index holds an isbn."""
+        return self._position(isbn) is not None
+
+    def get(self, isbn: str) -> dict[str, Any] | None:
+        """Read the record of an isbn.
+
+        Args:
+            isbn (str): the isbn, as ISBN-13.
+
+        Returns:
+            dict[str, Any] | None: the record, None if the isbn is not in the index.
+        """
+        position = self._position(isbn)
+        if position is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        assert self._offsets is not None and self._heap is not None
+        start, end = self._offsets[position], self._offsets[position + 1]
+        return json.loads(self._heap[start:end].tobytes())
+
+
+class IndexWriter:
+    """
+    Build an index file from records added in any order.
+
+    The records are spooled to a temporary file next to the index, then written in isbn
+    order once every record is known. The index replaces the file atomically, so that the
+    service can keep serving the previous one meanwhile. An isbn added twice keeps its
+    first record.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """Start building an index.
+
+        Args:
+            path (str | Path): the index file.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._spool = tempfile.TemporaryFile(dir=self.path.parent)
+        self._spooled = 0
+        self.count = 0
+        self._isbns = array("Q")
+        self._starts = array("Q")
+        self._lengths = array("I")
+
+    def __enter__(self) -> "IndexWriter":
+        """Start building the index."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Write the index, unless the context failed."""
+        try:
+            if exc_type is None:
+                self.commit()
+        finally:
+            self._spool.close()
+
+    def add(self, isbns: Iterable[str], record: dict[str, Any]) -> None:
+        """Add the record of a book.
+
+        Args:
+            isbns (Iterable[str]): the isbns of the book, as ISBN-13.
+            record (dict[str, Any]): the record.
+        """
+        isbns = list(isbns)
+        if not isbns:
+            return
+        data = json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode()
+        self._spool.write(data)
+        for isbn in isbns:
+            self._isbns.append(int(isbn))
+            self._starts.append(self._spooled)
+            self._lengths.append(len(data))
+        self._spooled += len(data)
+
+    def _sorted(self) -> Iterator[int]:
+        """Iterate the positions of the isbns added, by isbn then by insertion order.
+
+        The isbns are sorted by chunks, merged afterwards: only a chunk at a time is held
+        as a list, the whole dump stays in arrays.
+
+        Yields:
+            int: the position of each isbn.
+        """
+        key = self._isbns.__getitem__
+        chunks = [
+            array("Q", sorted(range(x, min(x + SORT_CHUNK, len(self._isbns))), key=key))
+            for x in range(0, len(self._isbns), SORT_CHUNK)
+        ]
+        # the sorts and the merge are stable: the first record of a duplicated isbn comes first
+        yield from heapq.merge(*chunks, key=key)
+
+    def commit(self) -> int:
+        """Write the index file.
+
+        Returns:
+            int: the number of isbns in the index.
+        """
+        self._spool.flush()
+        kept = array("Q")
+        isbns = array("Q")
+        offsets = array("Q", [0])
+        for x in self._sorted():
+            if isbns and isbns[-1] == self._isbns[x]:
+                continue
+            kept.append(x)
+            isbns.append(self._isbns[x])
+            offsets.append(offsets[-1] + self._lengths[x])
+
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        with temporary.open("wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, _byte_order(), len(kept)))
+            isbns.tofile(f)
+            offsets.tofile(f)
+            if self._spooled:
+                with mmap.mmap(
+                    self._spool.fileno(), 0, access=mmap.ACCESS_READ
+                ) as spool:
+                    for x in kept:
+                        start = self._starts[x]
+                        f.write(spool[start : start + self._lengths[x]])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        self.count = len(kept)
+        return self.count
+
+
+@dataclass
+class LocalIndexRepository:
+    """
+    Datasource answering from the local index of the OpenLibrary dumps, without any network call.
+
+    It is queried before the live datasources, which are only called on its misses.
+    The records are mapped exactly as the live OpenLibrary ones.
+    """
+
+    name: str
+    index: LocalIndex
+
+    local = True
+
+    def knows(self, isbn: str) -> bool:
+        """Whether the index holds a book, without reading it.
+
+        Args:
+            isbn (str): the isbn of the book.
+
+        Returns:
+            bool: whether it is in the index.
+        """
+        return isbn in self.index
+
+    def search_for_book_info(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Search the index for the required isbn.
+
+        Args:
+            isbn (str): the isbn of the book.
+            context (Context): the api request context.
+
+        Returns:
+            BookDatasource | None: the instance with the indexed information or None if not found.
+        """
+        with timed(f"{self.name}.lookup"):
+            record = self.index.get(isbn)
+            if record is None:
+                return None
+
+            portraits = [
+                f"{OPENLIBRARY_COVER_BASE_URL}/a/olid/{x}-M.jpg"
+                if x is not None
+                else None
+                for x in record.get(PORTRAIT_IDS, [])
+            ]
+            # a hand-built record may list fewer portraits than authors
+            authors = list(zip_longest(record.get(AUTHOR_DATA, []), portraits))
+            return RECORD_MAPPING.build(book_record(record[BOOK_DATA], authors))
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Search the index for the required isbn: the lookup never blocks, it runs inline.
+
+        Args:
+            isbn (str): the isbn of the book.
+            context (Context): the api request context.
+
+        Returns:
+            BookDatasource | None: the instance with the indexed information or None if not found.
+        """
+        return self.search_for_book_info(isbn, context)
+
+    async def healthy_async(self, context: Context) -> bool:
+        """Health check of the index: it is healthy as long as it is mapped.
+
+        Args:
+            context (Context): the api request context.
+
+        Returns:
+            bool: whether the index is mapped.
+        """
+        return len(self.index) > 0
@@ -0,0 +1,86 @@
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+import jmespath
+from ferrea.models.datasource import BookDatasource
+
+
+def _identity(value: Any) -> Any:
+    """Leave the extracted value untouched."""
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class Field:
+    """Where to read a field of the raw record from, and how to post-process the value read."""
+
+    expression: str
+    post: Callable[[Any], Any] = _identity
+
+
+class FieldMapping:
+    """
+    Declarative mapping from a raw datasource record to a BookDatasource.
+
+    The expressions are compiled once, when the mapping is built (usually at import).
+    Extraction holds no state, so a single mapping is safe to share among concurrent lookups.
+    """
+
+    def __init__(self, fields: Mapping[str, Field]) -> None:
+        """Compile the mapping.
+
+        Args:
+            fields (Mapping[str, Field]): for each BookDatasource field, how to extract it.
+        """
+        self.fields = dict(fields)
+        self._compiled = tuple(
+            (name, jmespath.compile(x.expression), x.post)
+            for name, x in self.fields.items()
+        )
+
+    @property
+    def expressions(self) -> list[str]:
+        """Get the expressions read by the mapping."""
+        return [x.expression for x in self.fields.values()]
+
+    def extract(self, record: Any) -> dict[str, Any]:
+        """Extract and post-process every field the raw record has a value for.
+
+        The missing fields are left out, so that the defaults of the model apply:
+        the post-processing only ever sees actual values.
+
+        Args:
+            record (Any): the raw record, as returned by the datasource.
+
+        Returns:
+            dict[str, Any]: the value of each field found.
+        """
+        values: dict[str, Any] = dict()
+        for name, x, post in self._compiled:
+            value = x.search(record)
+            if value is not None:
+                values[name] = post(value)
+        return values
+
+    def missing(self, record: Any) -> list[str]:
+        """Get the fields the raw record has no value for.
+
+        Args:
+            record (Any): the raw record, as returned by the datasource.
+
+        Returns:
+            list[str]: the names of the missing fields.
+        """
+        return [name for name, x, _ in self._compiled if x.search(record) is None]
+
+    def build(self, record: Any) -> BookDatasource:
+        """Build the final object instance from the raw record.
+
+        Args:
+            record (Any): the raw record, as returned by the datasource.
+
+        Returns:
+            BookDatasource: the final instance of the object.
+        """
+        return BookDatasource(**self.extract(record))
@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import httpx
+from prometheus_client import Gauge, Histogram
+
+from .hedging import HEDGE_EXTENSION
+from .timing import current_timings
+
+# request extension naming the endpoint of a call, for its metrics; hedged calls are named by their route
+ENDPOINT_EXTENSION = "ferrea.endpoint"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UPSTREAM_LATENCY = Histogram(
+    "ferrea_upstream_request_duration_seconds",
+    "Duration of the calls to the upstreams, body included.",
+    ("datasource", "endpoint", "status"),
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "ferrea_upstream_requests_in_flight",
+    "Calls to the upstreams waiting for their response.",
+    ("datasource",),
+)
+
+
+def endpoint(name: str) -> dict[str, str]:
+    """Get the request extensions naming the endpoint of a call.
+
+    Args:
+        name (str): the endpoint: it must not hold any id, to keep the label set bounded.
+
+    Returns:
+        dict[str, str]: the extensions to pass to the client.
+    """
+    return {ENDPOINT_EXTENSION: name}
+
+
+def status_class(status_code: int) -> str:
+    """Get the class of a status code, eg `2xx`.
+
+    Args:
+        status_code (int): the status code.
+
+    Returns:
+        str: the class.
+    """
+    return f"{status_code // 100}xx"
+
+
+class MetricsTransport(httpx.AsyncBaseTransport):
+    """
+    Transport timing each call actually sent to the upstream, by endpoint and status class.
+
+    It sits right above the connection pool: every retry and hedge is a call of its own,
+    while the wait for the rate limit is not counted. Calls that fail without a response
+    are recorded as `error`, the hedges given up as `cancelled`.
+    The labelled series are bound once per label set, not on every call.
+    The call is also timed as a stage of the request it belongs to, if any.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, datasource: str) -> None:
+        """Wrap a transport.
+
+        Args:
+            transport (httpx.AsyncBaseTransport): the transport actually sending the requests.
+            datasource (str): the datasource name.
+        """
+        self.transport = transport
+        self.datasource = datasource
+        self.in_flight = UPSTREAM_IN_FLIGHT.labels(datasource)
+        self._latencies: dict[tuple[str, str], Histogram] = dict()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send the request, timing it until its body is read.
+
+        Args:
+            request (httpx.Request): the request.
+
+        Returns:
+            httpx.Response: the response, with its body read.
+        """
+        name = request.extensions.get(ENDPOINT_EXTENSION) or request.extensions.get(
+            HEDGE_EXTENSION, "other"
+        )
+        status = "error"
+        start = time.perf_counter()
+        self.in_flight.inc()
+        try:
+            response = await self.transport.handle_async_request(request)
+            await response.aread()
+            status = status_class(response.status_code)
+            return response
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            self.in_flight.dec()
+            elapsed = time.perf_counter() - start
+            self._latency(name, status).observe(elapsed)
+            timings = current_timings()
+            if timings is not None:
+                timings.add(f"{self.datasource}.{name}", elapsed)
+
+    def _latency(self, name: str, status: str) -> Histogram:
+        """Get the latency series of an endpoint and status class, binding it on first use.
+
+        Args:
+            name (str): the endpoint.
+            status (str): the status class.
+
+        Returns:
+            Histogram: the series.
+        """
+        series = self._latencies.get((name, status))
+        if series is None:
+            series = UPSTREAM_LATENCY.labels(self.datasource, name, status)
+            self._latencies[(name, status)] = series
+        return series
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport."""
+        await self.transport.aclose()
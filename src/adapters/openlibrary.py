@@ -1,10 +1,11 @@
+import asyncio
 import os
 import re
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, TypeVar
 
 import httpx
-import jmespath
 from ferrea.core.context import Context
 from ferrea.models.datasource import BookDatasource
 from ferrea.observability.logs import ferrea_logger
@@ -12,6 +13,14 @@ from pydantic import HttpUrl
 
 from configs import settings
 
+from ._http import bound_client, check_upstream, run_blocking
+from .cache import FlagCache
+from .coalescing import SingleFlight
+from .hedging import hedged
+from .mapping import Field, FieldMapping
+from .metrics import endpoint
+from .timing import timed
+
 OPENLIBRARY_API_BASE_URL = settings.openlibrary.api_url
 OPENLIBRARY_COVER_BASE_URL = settings.openlibrary.cover_url
 
@@ -19,6 +28,65 @@ BOOK_DATA = "book"
 AUTHOR_DATA = "author"
 PORTRAIT_DATA = "cover"
 
+T = TypeVar("T")
+
+PORTRAIT_FOUND = frozenset((httpx.codes.OK, httpx.codes.PARTIAL_CONTENT))
+HEAD_UNSUPPORTED = frozenset(
+    (httpx.codes.METHOD_NOT_ALLOWED, httpx.codes.NOT_IMPLEMENTED)
+)
+
+ISODATE_PATTERN = re.compile(r"^(?P<year>\d{4})-\d{2}-\d{2}$")
+YEAR_PATTERN = re.compile(r".*[\s|\-](?P<year>\d{4}).*?")
+
+
+def _parse_published_on(date: str | None) -> int | None:
+    """Try to parse the published date.
+    If it fails, return None.
+
+    Args:
+        date (str | None): the publish date of the edition.
+
+    Returns:
+        int | None: the year or None if not desumed.
+    """
+    if date is None:
+        return None
+
+    is_isodate = ISODATE_PATTERN.match(date)
+    if is_isodate:
+        return int(is_isodate.group("year"))
+
+    is_year = YEAR_PATTERN.match(date)
+    if is_year:
+        return int(is_year.group("year"))
+
+    return None
+
+
+# the record is built by the repository: the edition, its authors and their portraits
+RECORD_MAPPING = FieldMapping(
+    {
+        "title": Field(f"{BOOK_DATA}.title"),
+        "authors": Field(f"{AUTHOR_DATA}[].name"),
+        "publishing": Field(f"{BOOK_DATA}.publishers[0]"),
+        "published_on": Field(f"{BOOK_DATA}.publish_date", _parse_published_on),
+        "cover": Field(
+            f"{BOOK_DATA}.covers[0]",
+            lambda x: HttpUrl(f"{OPENLIBRARY_COVER_BASE_URL}/b/id/{x}-M.jpg"),
+        ),
+        "plot": Field(f"{BOOK_DATA}.first_sentence.value"),
+        "languages": Field(
+            f"{BOOK_DATA}.languages[].key",
+            lambda x: [y.replace("/languages/", "") for y in x],
+        ),
+        "book_formats": Field(
+            f"{BOOK_DATA}.type.key",
+            lambda x: [x.replace("/type/", "")],
+        ),
+        "authors_portrait": Field(PORTRAIT_DATA),
+    }
+)
+
 
 @dataclass
 class OpenLibraryRepository:
@@ -28,224 +96,405 @@ class OpenLibraryRepository:
     Refer to https://openlibrary.org/ and https://openlibrary.org/developers/api for documentation.
     """
 
-    context: Context
     name: str
+    client: httpx.AsyncClient | None = None
+    flight: SingleFlight | None = None
+    portraits: FlagCache | None = None
 
-    def search_for_book_info(self, isbn: str) -> BookDatasource | None:
-        """Search on OpenLibrary the required isbn for book information as well as author portrait.
+    batch_capable = True
+
+    def search_for_book_info(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Blocking variant of search_for_book_info_async, for scripts and tests.
 
         Args:
             isbn (str): the isbn of the book.
+            context (Context): the api request context.
 
         Returns:
             BookDatasource | None: the instance with the fetched information or None if not found.
         """
-        self._datasource = dict()
-        self._datasource[AUTHOR_DATA] = list()
+        return run_blocking(
+            self,
+            settings.openlibrary,
+            OpenLibraryRepository.search_for_book_info_async,
+            isbn,
+            context,
+        )
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Search on OpenLibrary the required isbn for book information as well as author portrait.
 
-        book = self._perform_isbn_search(isbn)
+        Args:
+            isbn (str): the isbn of the book.
+            context (Context): the api request context.
+
+        Returns:
+            BookDatasource | None: the instance with the fetched information or None if not found.
+        """
+        book = await self._perform_isbn_search(isbn, context)
         if book is None:
             return None
 
-        self._datasource[BOOK_DATA] = book
-        authors = [x["key"] for x in book["authors"]]
-        authors_portraits = list()
+        authors = [os.path.basename(x["key"]) for x in book.get("authors", [])]
+        semaphore = asyncio.Semaphore(settings.openlibrary.author_concurrency)
+        with timed(f"{self.name}.authors"):
+            resolved = await asyncio.gather(
+                *[self._resolve_author(x, semaphore, context) for x in authors],
+                return_exceptions=True,
+            )
+        # a partial book would be cached as if complete: the lookup fails instead
+        for x in resolved:
+            if isinstance(x, BaseException):
+                raise x
 
-        for author in authors:
-            author_id = os.path.basename(author)
-            authors_portraits.append(self._perform_author_portrait_search(author_id))
-            author_data = self._perform_author_search(author_id)
-            self._datasource[AUTHOR_DATA].append(author_data)
+        with timed(f"{self.name}.mapping"):
+            return RECORD_MAPPING.build(book_record(book, resolved))
 
-        self._datasource[PORTRAIT_DATA] = authors_portraits
+    async def search_for_books_info_async(
+        self, isbns: list[str], context: Context
+    ) -> dict[str, BookDatasource | None]:
+        """Search on OpenLibrary many isbns at once, through the books API.
 
-        return self._deserialize_data()
+        The isbns are looked up in chunks of `bulk_size` bibkeys per request, then every distinct
+        author across the whole batch is resolved once. An edition that cannot be completed or
+        mapped is left out of the results, so that it fails on its own.
+        The `details` view is used, since it holds the same edition record as the isbn API.
 
-    def _perform_isbn_search(self, isbn: str) -> dict[str, Any] | None:
-        """Perform a search on OpenLibrary to see if the isbn is known.
+        Refer to https://openlibrary.org/dev/docs/api/books for documentation.
 
         Args:
-            isbn (str): the isbn of the book.
+            isbns (list[str]): the isbns of the books.
+            context (Context): the api request context.
 
         Returns:
-            dict[str, Any] | None: the response from the service or None if book not found.
+            dict[str, BookDatasource | None]: the instance found for each isbn, None if not found.
         """
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
+        bulk_size = settings.openlibrary.bulk_size
+        semaphore = asyncio.Semaphore(settings.openlibrary.author_concurrency)
+        chunks = await asyncio.gather(
+            *[
+                self._perform_bibkeys_search(
+                    isbns[i : i + bulk_size], semaphore, context
+                )
+                for i in range(0, len(isbns), bulk_size)
+            ]
+        )
+        editions = {isbn: book for chunk in chunks for isbn, book in chunk.items()}
+
+        authors = list(
+            dict.fromkeys(
+                os.path.basename(x["key"])
+                for book in editions.values()
+                for x in book.get("authors", [])
+            )
+        )
+        resolved = dict(
+            zip(
+                authors,
+                await asyncio.gather(
+                    *[self._resolve_author(x, semaphore, context) for x in authors],
+                    return_exceptions=True,
+                ),
+            )
+        )
+
+        books: dict[str, BookDatasource | None] = dict.fromkeys(isbns)
+        for isbn, book in editions.items():
+            book_authors = [
+                resolved[os.path.basename(x["key"])] for x in book.get("authors", [])
+            ]
+            # left out of the bulk results, the isbn is looked up on its own
+            if any(isinstance(x, BaseException) for x in book_authors):
+                del books[isbn]
+                continue
+            try:
+                books[isbn] = RECORD_MAPPING.build(book_record(book, book_authors))  # type: ignore[arg-type]
+            except (TypeError, ValueError) as e:
+                ferrea_logger.warning(
+                    f"Unable to map the edition of {isbn} on Openlibrary: {e!r}",
+                    **context.log,
+                )
+                del books[isbn]
+
+        return books
+
+    async def _perform_bibkeys_search(
+        self,
+        isbns: list[str],
+        semaphore: asyncio.Semaphore,
+        context: Context,
+    ) -> dict[str, dict[str, Any]]:
+        """Perform a search on OpenLibrary for many isbns in a single request.
+
+        Args:
+            isbns (list[str]): the isbns of the books.
+            semaphore (asyncio.Semaphore): the cap on the concurrent requests for the batch.
+            context (Context): the api request context.
+
+        Returns:
+            dict[str, dict[str, Any]]: the edition record of each isbn found.
+        """
+        qp = {
+            "bibkeys": ",".join(f"ISBN:{x}" for x in isbns),
+            "jscmd": "details",
+            "format": "json",
         }
-        uri = f"{OPENLIBRARY_API_BASE_URL}/isbn/{isbn}"
+        uri = f"{OPENLIBRARY_API_BASE_URL}/api/books"
 
-        with httpx.Client() as client:
-            response = client.get(
-                uri,
-                headers=headers,
-                follow_redirects=True,
+        async with semaphore:
+            response = check_upstream(
+                await bound_client(self).get(
+                    uri, params=qp, extensions=endpoint("books")
+                )
             )
 
         if not response.status_code == httpx.codes.OK:
             ferrea_logger.info(
-                f"Unable to find {isbn} on Openlibrary. Response is {response.status_code} {response}",
-                **self.context.log,
+                f"Unable to search {len(isbns)} isbns on Openlibrary. Response is {response.status_code} {response}",
+                **context.log,
             )
-            return None
-        return response.json()
+            return dict()
+
+        with timed(f"{self.name}.parse"):
+            found = response.json()
+        return {
+            isbn: found[f"ISBN:{isbn}"]["details"]
+            for isbn in isbns
+            if f"ISBN:{isbn}" in found
+        }
 
-    def _perform_author_portrait_search(self, author_id: str) -> str | None:
-        """Given an author olid (OpenLibrary ID), search the author portrait.
-        If it is not found, a 404 will be raised from the service (thanks to default: False).
-        In case it was found, just return the url of the image.
+    async def _resolve_author(
+        self,
+        author_id: str,
+        semaphore: asyncio.Semaphore,
+        context: Context,
+    ) -> tuple[dict[str, Any] | None, str | None]:
+        """Fetch the author information and portrait concurrently.
+        An author or portrait not found resolves as None, while a failure of either of them
+        is raised once both are done: the book is not complete without them.
 
         Args:
             author_id (str): the OpenLibrary ID of the author.
+            semaphore (asyncio.Semaphore): the cap on the authors resolved at once for the book.
+            context (Context): the api request context.
+
+        Raises:
+            Exception: the failure of the author or portrait fetch.
 
         Returns:
-            dict[str, Any] | None: the response from the service or None if portrait was not found.
+            tuple[dict[str, Any] | None, str | None]: the author information and portrait url.
         """
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
-        uri = f"{OPENLIBRARY_COVER_BASE_URL}/a/olid/{author_id}-M.jpg"
-        qp = {
-            "default": False,
-        }
-        with httpx.Client() as client:
-            response = client.get(
-                uri,
-                headers=headers,
-                params=qp,
-                follow_redirects=True,
+        async with semaphore:
+            author, portrait = await asyncio.gather(
+                self._coalesced(
+                    ("author", author_id),
+                    lambda: self._perform_author_search(author_id, context),
+                ),
+                self._coalesced(
+                    ("portrait", author_id),
+                    lambda: self._perform_author_portrait_search(author_id, context),
+                ),
+                return_exceptions=True,
             )
 
+        for kind, result in (("author", author), ("portrait", portrait)):
+            if isinstance(result, BaseException):
+                ferrea_logger.warning(
+                    f"Unable to fetch {kind} {author_id} on Openlibrary: {result!r}",
+                    **context.log,
+                )
+                raise result
+
+        return author, portrait  # type: ignore[return-value]
+
+    async def _coalesced(
+        self,
+        key: tuple[str, str],
+        call: Callable[[], Awaitable[T]],
+    ) -> T:
+        """Perform a sub-fetch, joining the identical one in flight for another book if any.
+
+        Args:
+            key (tuple[str, str]): the kind of sub-fetch and its id.
+            call (Callable[[], Awaitable[T]]): the sub-fetch.
+
+        Returns:
+            T: the result of the sub-fetch.
+        """
+        if self.flight is None:
+            return await call()
+        return await self.flight.do((self.name, *key), call)
+
+    async def _perform_isbn_search(
+        self, isbn: str, context: Context
+    ) -> dict[str, Any] | None:
+        """Perform a search on OpenLibrary to see if the isbn is known.
+
+        Args:
+            isbn (str): the isbn of the book.
+            context (Context): the api request context.
+
+        Returns:
+            dict[str, Any] | None: the response from the service or None if book not found.
+        """
+        uri = f"{OPENLIBRARY_API_BASE_URL}/isbn/{isbn}"
+
+        response = check_upstream(
+            await bound_client(self).get(uri, extensions=hedged("isbn"))
+        )
+
         if not response.status_code == httpx.codes.OK:
             ferrea_logger.info(
-                f"Unable to find {author_id} on Openlibrary. Response is {response.status_code} {response.json()}",
-                **self.context.log,
+                f"Unable to find {isbn} on Openlibrary. Response is {response.status_code} {response}",
+                **context.log,
             )
             return None
+        with timed(f"{self.name}.parse"):
+            return response.json()
 
-        return uri
-
-    def _perform_author_search(self, author_id: str) -> dict[str, Any] | None:
-        """Given an author olid (OpenLibrary ID), search the author information.
+    async def _perform_author_portrait_search(
+        self, author_id: str, context: Context
+    ) -> str | None:
+        """Given an author olid (OpenLibrary ID), check whether the author has a portrait.
+        If it is not found, a 404 will be raised from the service (thanks to default: False).
+        Only the headers are fetched, never the image, and the answer is cached by olid.
 
         Args:
             author_id (str): the OpenLibrary ID of the author.
+            context (Context): the api request context.
 
         Returns:
-            dict[str, Any] | None: the response from the service or None if portrait was not found.
+            str | None: the url of the portrait or None if portrait was not found.
         """
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
-        uri = f"{OPENLIBRARY_API_BASE_URL}/authors/{author_id}.json"
-        with httpx.Client() as client:
-            response = client.get(
-                uri,
-                headers=headers,
-                follow_redirects=True,
-            )
+        uri = f"{OPENLIBRARY_COVER_BASE_URL}/a/olid/{author_id}-M.jpg"
 
-        if not response.status_code == httpx.codes.OK:
+        if self.portraits is not None:
+            cached, exists = self.portraits.lookup(author_id)
+            if cached:
+                return uri if exists else None
+
+        response = await self._perform_portrait_check(uri)
+        exists = response.status_code in PORTRAIT_FOUND
+        if not exists:
             ferrea_logger.info(
-                f"Unable to find {author_id} on Openlibrary. Response is {response.status_code} {response.json()}",
-                **self.context.log,
+                f"Unable to find the portrait of {author_id} on Openlibrary. Response is {response.status_code} {response}",
+                **context.log,
             )
-            return None
 
-        return response.json()
+        if self.portraits is not None:
+            self.portraits.store(author_id, exists)
+        return uri if exists else None
 
-    def _deserialize_data(self) -> BookDatasource:
-        """From the raw data build the final object instance.
+    async def _perform_portrait_check(self, uri: str) -> httpx.Response:
+        """Check whether an image exists without downloading it: with a HEAD request,
+        or with a GET of its first byte if HEAD is not supported.
 
         Args:
-            book_data (dict[str, Any]): data of the book.
-            authors_portraits (list[str]): the list with the authors's portraits.
+            uri (str): the url of the image.
 
         Returns:
-            BookDatasource: the final instance of the object.
+            httpx.Response: the response from the service, without body.
         """
-        return BookDatasource(
-            title=self._extract_value_from_key(f"{BOOK_DATA}.title"),
-            authors=self._extract_value_from_key(f"{AUTHOR_DATA}[].name"),
-            publishing=self._extract_value_from_key(f"{BOOK_DATA}.publishers[0]"),
-            published_on=self._parse_published_on(),
-            cover=HttpUrl(
-                f"{OPENLIBRARY_COVER_BASE_URL}/b/id/{self._extract_value_from_key(f'{BOOK_DATA}.covers[0]')}-M.jpg"
-            ),
-            plot=self._extract_value_from_key(f"{BOOK_DATA}.first_sentence.value"),
-            languages=[
-                x.replace("/languages/", "")
-                for x in self._extract_value_from_key(f"{BOOK_DATA}.languages[].key")
-            ],
-            book_formats=[
-                x.replace("/type/", "")
-                for x in [self._extract_value_from_key(f"{BOOK_DATA}.type.key")]
-            ],
-            authors_portrait=self._datasource[PORTRAIT_DATA],
+        qp = {
+            "default": False,
+        }
+        response = check_upstream(
+            await bound_client(self).head(
+                uri, params=qp, extensions=endpoint("portrait")
+            )
+        )
+        if response.status_code not in HEAD_UNSUPPORTED:
+            return response
+
+        headers = {
+            "Range": "bytes=0-0",
+        }
+        return check_upstream(
+            await bound_client(self).get(
+                uri, params=qp, headers=headers, extensions=endpoint("portrait")
+            )
         )
 
-    def _parse_published_on(self) -> int | None:
-        """Try to parse the published date.
-        If it fails, return None.
+    async def _perform_author_search(
+        self, author_id: str, context: Context
+    ) -> dict[str, Any] | None:
+        """Given an author olid (OpenLibrary ID), search the author information.
+
+        Args:
+            author_id (str): the OpenLibrary ID of the author.
+            context (Context): the api request context.
 
         Returns:
-            int | None: the year or None if not desumed.
+            dict[str, Any] | None: the response from the service or None if portrait was not found.
         """
-        date = self._extract_value_from_key(f"{BOOK_DATA}.publish_date")
-        if date is None:
-            return None
-
-        isodate_pattern = re.compile(r"^(?P<year>\d{4})-\d{2}-\d{2}$")
-        is_isodate = isodate_pattern.match(date)
-        if is_isodate:
-            return int(is_isodate.group("year"))
+        uri = f"{OPENLIBRARY_API_BASE_URL}/authors/{author_id}.json"
+        response = check_upstream(
+            await bound_client(self).get(uri, extensions=endpoint("author"))
+        )
 
-        year_pattern = re.compile(r".*[\s|\-](?P<year>\d{4}).*?")
-        is_year = year_pattern.match(date)
-        if is_year:
-            return int(is_year.group("year"))
+        if not response.status_code == httpx.codes.OK:
+            ferrea_logger.info(
+                f"Unable to find {author_id} on Openlibrary. Response is {response.status_code} {response}",
+                **context.log,
+            )
+            return None
 
-        return None
+        return response.json()
 
-    def _extract_value_from_key(
-        self,
-        jsonpath: str,
-    ) -> Any:
-        """Given the json path, extract the value from the path from the data fetched from the APIs.
+    async def healthy_async(self, context: Context) -> bool:
+        """Health check towards the datasource.
 
         Args:
-            jsonpath (str): the path of intereset.
+            context (Context): the api request context.
 
         Returns:
-            str | None: the value, if the path is found.
+            bool: whether the datasource answered as expected.
         """
-        expression = jmespath.compile(jsonpath)
-        return expression.search(self._datasource)
-
-    @property
-    def healthy(self) -> bool:
-        """Health check towards the datasource."""
         headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
             "User-Agent": "FastAPI HealthCheck",
         }
         uri = f"{OPENLIBRARY_API_BASE_URL}/health"
 
-        with httpx.Client() as client:
-            response = client.get(
-                uri,
-                headers=headers,
-                follow_redirects=True,
-            )
+        response = await bound_client(self).get(
+            uri, headers=headers, extensions=endpoint("health")
+        )
 
         if not response.status_code == httpx.codes.OK:
             ferrea_logger.info(
                 (f"OpenLibrary probe failed with {response.status_code}"),
-                **self.context.log,
+                **context.log,
             )
             return False
         return True
+
+
+def book_record(
+    book: dict[str, Any],
+    authors: list[tuple[dict[str, Any] | None, str | None]],
+) -> dict[str, Any]:
+    """Assemble the record read by the mapping.
+
+    The authors without a name, eg not found, are left out along with their
+    portrait, so that the names and the portraits stay aligned.
+
+    Args:
+        book (dict[str, Any]): the edition.
+        authors (list[tuple[dict[str, Any] | None, str | None]]): the information and portrait of each author.
+
+    Returns:
+        dict[str, Any]: the record.
+    """
+    named = [
+        (author, portrait)
+        for author, portrait in authors
+        if author is not None and author.get("name") is not None
+    ]
+    return {
+        BOOK_DATA: book,
+        AUTHOR_DATA: [author for author, _ in named],
+        PORTRAIT_DATA: [portrait for _, portrait in named],
+    }
@@ -0,0 +1,148 @@
+import asyncio
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+import httpx
+
+from configs.config import RateLimit
+
+from .deadline import remaining
+
+
+class ThrottledError(Exception):
+    """The call would have waited too long for the rate limit of the upstream."""
+
+
+@dataclass
+class RateLimitStats:
+    """Counters of a rate limiter."""
+
+    acquired: int = 0
+    delayed: int = 0
+    rejected: int = 0
+
+
+@dataclass
+class TokenBucket:
+    """
+    Token bucket limiting the rate of the calls towards an upstream.
+
+    Tokens are refilled at `rate` per second, up to `burst`. A call takes a token, queueing
+    for the next one if none is left: the wait is booked upfront, so that the queued calls
+    are served in order without a lock. A call that would wait more than `max_wait` is refused.
+    """
+
+    rate: float
+    burst: float
+    max_wait: float
+    clock: Callable[[], float] = time.monotonic
+    stats: RateLimitStats = field(default_factory=RateLimitStats)
+    _tokens: float = field(default=0.0, init=False)
+    _updated_at: float | None = field(default=None, init=False)
+
+    @classmethod
+    def from_settings(cls, rate_limit_settings: RateLimit) -> "TokenBucket":
+        """Build the bucket from the datasource settings.
+
+        Args:
+            rate_limit_settings (RateLimit): the rate limit settings of the datasource.
+
+        Returns:
+            TokenBucket: the bucket.
+        """
+        return cls(
+            rate=rate_limit_settings.rate,
+            burst=rate_limit_settings.burst,
+            max_wait=rate_limit_settings.max_wait,
+        )
+
+    def reserve(self, max_wait: float | None = None) -> float:
+        """Take a token, possibly in advance.
+
+        Args:
+            max_wait (float | None, optional): a shorter wait allowed for this call, eg the time
+                left to its deadline. Defaults to None.
+
+        Raises:
+            ThrottledError: if the token would be available after `max_wait`.
+
+        Returns:
+            float: how long to wait before the call, in seconds.
+        """
+        now = self.clock()
+        if self._updated_at is None:
+            self._tokens = self.burst
+        else:
+            elapsed = now - self._updated_at
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+        wait = max(0.0, (1 - self._tokens) / self.rate)
+        limit = self.max_wait if max_wait is None else min(self.max_wait, max_wait)
+        if wait > limit:
+            self.stats.rejected += 1
+            raise ThrottledError(f"rate limit of {self.rate}/s exceeded")
+
+        self._tokens -= 1
+        self.stats.acquired += 1
+        self.stats.delayed += wait > 0
+        return wait
+
+    def cancel(self) -> None:
+        """Give back a token taken by a call that did not happen."""
+        self._tokens = min(self.burst, self._tokens + 1)
+
+    async def acquire(self, max_wait: float | None = None) -> None:
+        """Wait for a token.
+
+        Args:
+            max_wait (float | None, optional): a shorter wait allowed for this call, eg the time
+                left to its deadline. Defaults to None.
+
+        Raises:
+            ThrottledError: if the token would be available after `max_wait`.
+        """
+        wait = self.reserve(max_wait)
+        if wait <= 0:
+            return
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+
+
+class RateLimitTransport(httpx.AsyncBaseTransport):
+    """Transport holding each request until the rate limit of the upstream allows it."""
+
+    def __init__(
+        self, transport: httpx.AsyncBaseTransport, bucket: TokenBucket
+    ) -> None:
+        """Wrap a transport.
+
+        Args:
+            transport (httpx.AsyncBaseTransport): the transport actually sending the requests.
+            bucket (TokenBucket): the rate limit of the upstream, shared by every request.
+        """
+        self.transport = transport
+        self.bucket = bucket
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send the request once a token is available, without waiting past its deadline.
+
+        Args:
+            request (httpx.Request): the request.
+
+        Raises:
+            ThrottledError: if the request would wait too long.
+
+        Returns:
+            httpx.Response: the response.
+        """
+        await self.bucket.acquire(remaining(request))
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport."""
+        await self.transport.aclose()
@@ -0,0 +1,154 @@
+import asyncio
+import random
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from configs.config import Retry
+
+from .deadline import remaining
+
+RETRYABLE_METHODS = frozenset(("GET", "HEAD"))
+RETRYABLE_STATUSES = frozenset(
+    (httpx.codes.TOO_MANY_REQUESTS, httpx.codes.SERVICE_UNAVAILABLE)
+)
+
+
+def retry_after(response: httpx.Response) -> float | None:
+    """Read how long the upstream asks to wait before retrying.
+
+    Args:
+        response (httpx.Response): the response of the upstream.
+
+    Returns:
+        float | None: the wait in seconds, or None if the header is missing or invalid.
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+
+    if value.strip().isdigit():
+        return float(value)
+
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass
+class RetryStats:
+    """Counters of the retried requests."""
+
+    retries: int = 0
+    recovered: int = 0
+    exhausted: int = 0
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """
+    Transport retrying the requests the upstream refused because of load (429 and 503).
+
+    The wait before each retry is the `Retry-After` of the upstream if any, a jittered
+    exponential backoff otherwise. Each request has a budget: at most `max_retries` retries,
+    waiting at most `budget` seconds overall, and never past the deadline of the call.
+    Once the budget is spent, the last response is returned as is.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        max_retries: int,
+        backoff: float,
+        max_backoff: float,
+        budget: float,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        """Wrap a transport.
+
+        Args:
+            transport (httpx.AsyncBaseTransport): the transport actually sending the requests.
+            max_retries (int): the maximum number of retries of a request.
+            backoff (float): the base of the exponential backoff, in seconds.
+            max_backoff (float): the cap of the exponential backoff, in seconds.
+            budget (float): the maximum overall wait between the attempts of a request, in seconds.
+            sleep (Callable[[float], Awaitable[None]], optional): how to wait. Defaults to asyncio.sleep.
+        """
+        self.transport = transport
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.sleep = sleep
+        self.stats = RetryStats()
+
+    @classmethod
+    def from_settings(
+        cls,
+        transport: httpx.AsyncBaseTransport,
+        retry_settings: Retry,
+    ) -> "RetryTransport":
+        """Wrap a transport, as configured for the datasource.
+
+        Args:
+            transport (httpx.AsyncBaseTransport): the transport actually sending the requests.
+            retry_settings (Retry): the retry settings of the datasource.
+
+        Returns:
+            RetryTransport: the transport.
+        """
+        return cls(
+            transport,
+            max_retries=retry_settings.max_retries,
+            backoff=retry_settings.backoff,
+            max_backoff=retry_settings.max_backoff,
+            budget=retry_settings.budget,
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send the request, retrying it while the upstream is overloaded and the budget allows.
+
+        Args:
+            request (httpx.Request): the request.
+
+        Returns:
+            httpx.Response: the response of the last attempt.
+        """
+        if request.method not in RETRYABLE_METHODS:
+            return await self.transport.handle_async_request(request)
+
+        waited = 0.0
+        for attempt in range(self.max_retries + 1):
+            response = await self.transport.handle_async_request(request)
+            if response.status_code not in RETRYABLE_STATUSES:
+                self.stats.recovered += attempt > 0
+                return response
+
+            wait = retry_after(response)
+            if wait is None:
+                wait = random.uniform(
+                    0, min(self.max_backoff, self.backoff * 2**attempt)
+                )
+            left = remaining(request)
+            if (
+                attempt == self.max_retries
+                or waited + wait > self.budget
+                or (left is not None and wait >= left)
+            ):
+                break
+
+            await response.aclose()
+            self.stats.retries += 1
+            await self.sleep(wait)
+            waited += wait
+
+        self.stats.exhausted += 1
+        return response
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport."""
+        await self.transport.aclose()
@@ -0,0 +1,459 @@
+import asyncio
+import sqlite3
+import time
+from collections.abc import AsyncIterator, Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TypeVar
+
+from ferrea.core.context import Context
+from ferrea.models.datasource import BookDatasource
+from ferrea.observability.logs import ferrea_logger
+
+from configs.config import Store
+
+from .wrapping import RepositoryWrapper
+
+T = TypeVar("T")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    source TEXT NOT NULL,
+    isbn TEXT NOT NULL,
+    value BLOB,
+    expires_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, isbn)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at);
+CREATE INDEX IF NOT EXISTS results_hits ON results (hits);
+"""
+UPSERT = """
+INSERT INTO results (source, isbn, value, expires_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (source, isbn) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+"""
+# the positional parameters of a single statement are limited
+MAX_PARAMS = 500
+
+
+@dataclass
+class StoreStats:
+    """Counters of a persistent result store."""
+
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    flushes: int = 0
+    compacted: int = 0
+
+
+@dataclass
+class ResultStore:
+    """
+    Persistent store of the lookup results of every datasource, in a local SQLite file.
+
+    Results are keyed by datasource and canonical isbn; a not found result is stored as
+    a NULL value, with its own shorter TTL. Reads go to the file, writes are queued in
+    memory and flushed in batches in the background: a read sees the queued writes first.
+    The file is compacted periodically, dropping the expired results then the least
+    read ones, down to `max_entries`. The reads are counted by the CountedRepository, in
+    front of the result cache, so that the results kept hot in memory rank first.
+    SQLite is blocking: every call to the file runs on a single dedicated thread.
+    """
+
+    path: Path
+    ttl: float
+    negative_ttl: float
+    max_entries: int
+    flush_interval: float
+    flush_size: int
+    compact_interval: float
+    clock: Callable[[], float] = time.time
+    stats: StoreStats = field(default_factory=StoreStats)
+    _pending: dict[tuple[str, str], tuple[bytes | None, float]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _flushing: dict[tuple[str, str], tuple[bytes | None, float]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _hits: dict[tuple[str, str], int] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _executor: ThreadPoolExecutor = field(init=False, repr=False)
+    _connection: sqlite3.Connection = field(init=False, repr=False)
+    _flush_now: asyncio.Event = field(default_factory=asyncio.Event, init=False)
+
+    @classmethod
+    @asynccontextmanager
+    async def open(cls, store_settings: Store) -> AsyncIterator["ResultStore"]:
+        """Open the store from the settings, flushing the queued writes in the background
+        until it is closed.
+
+        Args:
+            store_settings (Store): the store settings.
+
+        Yields:
+            ResultStore: the store.
+        """
+        store = cls(
+            path=Path(store_settings.path),
+            ttl=store_settings.ttl,
+            negative_ttl=store_settings.negative_ttl,
+            max_entries=store_settings.max_entries,
+            flush_interval=store_settings.flush_interval,
+            flush_size=store_settings.flush_size,
+            compact_interval=store_settings.compact_interval,
+        )
+        await store.connect()
+        flusher = asyncio.create_task(store.run())
+        try:
+            yield store
+        finally:
+            flusher.cancel()
+            await asyncio.gather(flusher, return_exceptions=True)
+            await store.close()
+
+    def __len__(self) -> int:
+        """Get the number of writes not flushed yet."""
+        return len(self._pending)
+
+    async def connect(self) -> None:
+        """Open the file, creating it if needed."""
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store")
+        await self._call(self._connect)
+
+    async def close(self) -> None:
+        """Flush the queued writes, then close the file."""
+        await self.flush()
+        await self._call(self._connection.close)
+        self._executor.shutdown()
+
+    async def run(self) -> None:
+        """Flush the queued writes every `flush_interval` seconds, or as soon as
+        `flush_size` of them are queued, and compact the file every `compact_interval` seconds.
+        """
+        compacted_at = self.clock()
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            self._flush_now.clear()
+            try:
+                await self.flush()
+                if self.clock() - compacted_at >= self.compact_interval:
+                    await self.compact()
+                    compacted_at = self.clock()
+            except sqlite3.Error as e:
+                ferrea_logger.warning(f"Flush of the result store failed with {e!r}")
+
+    async def lookup(
+        self, source: str, isbns: list[str]
+    ) -> dict[str, BookDatasource | None]:
+        """Search the store.
+
+        Args:
+            source (str): the datasource name.
+            isbns (list[str]): the canonical isbns.
+
+        Returns:
+            dict[str, BookDatasource | None]: the result stored for each isbn found, None if not found upstream.
+        """
+        now = self.clock()
+        values: dict[str, bytes | None] = dict()
+        missing: list[str] = list()
+        for isbn in isbns:
+            pending = self._pending.get((source, isbn)) or self._flushing.get(
+                (source, isbn)
+            )
+            if pending is not None and pending[1] > now:
+                values[isbn] = pending[0]
+            else:
+                missing.append(isbn)
+
+        if missing:
+            rows = await self._call(self._select, source, missing, now)
+            values.update(rows)
+
+        self.stats.hits += len(values)
+        self.stats.misses += len(isbns) - len(values)
+
+        return {
+            x: BookDatasource.model_validate_json(y) if y is not None else None
+            for x, y in values.items()
+        }
+
+    def count(self, source: str, isbns: list[str]) -> None:
+        """Count the reads of some isbns, whichever layer answers them, towards their popularity.
+
+        Args:
+            source (str): the datasource name.
+            isbns (list[str]): the canonical isbns.
+        """
+        for isbn in isbns:
+            key = (source, isbn)
+            self._hits[key] = self._hits.get(key, 0) + 1
+
+    def put(self, source: str, isbn: str, value: BookDatasource | None) -> None:
+        """Queue the write of a lookup result.
+
+        Args:
+            source (str): the datasource name.
+            isbn (str): the canonical isbn.
+            value (BookDatasource | None): the result, None if the book was not found.
+        """
+        if value is None:
+            data, ttl = None, self.negative_ttl
+        else:
+            data, ttl = value.model_dump_json().encode(), self.ttl
+        if ttl <= 0:
+            return
+
+        self._pending[(source, isbn)] = (data, self.clock() + ttl)
+        if len(self._pending) >= self.flush_size:
+            self._flush_now.set()
+
+    async def flush(self) -> None:
+        """Write the queued results and read counters to the file, in a single transaction."""
+        if not self._pending and not self._hits:
+            return
+
+        # the writes being flushed are still visible to the reads until they are in the file
+        self._flushing, self._pending = self._pending, dict()
+        hits, self._hits = self._hits, dict()
+        rows = [(s, i, v, e) for (s, i), (v, e) in self._flushing.items()]
+        counters = [(n, s, i) for (s, i), n in hits.items()]
+        try:
+            await self._call(self._write, rows, counters)
+        except BaseException:
+            # keep the writes for the next flush, unless newer ones were queued meanwhile
+            self._pending = self._flushing | self._pending
+            raise
+        finally:
+            self._flushing = dict()
+        self.stats.writes += len(rows)
+        self.stats.flushes += 1
+
+    async def compact(self) -> int:
+        """Drop the expired results, then the least read ones beyond `max_entries`.
+
+        Returns:
+            int: the number of results dropped.
+        """
+        dropped = await self._call(self._compact, self.clock())
+        self.stats.compacted += dropped
+        return dropped
+
+    async def hottest(
+        self, source: str, limit: int
+    ) -> list[tuple[str, BookDatasource | None, float]]:
+        """Get the most read results of a datasource still valid, to warm a cache up.
+
+        Args:
+            source (str): the datasource name.
+            limit (int): the maximum number of results.
+
+        Returns:
+            list[tuple[str, BookDatasource | None, float]]: the isbn, result and remaining TTL of each one.
+        """
+        now = self.clock()
+        rows = await self._call(self._hottest, source, limit, now)
+        return [
+            (
+                isbn,
+                BookDatasource.model_validate_json(value)
+                if value is not None
+                else None,
+                expires_at - now,
+            )
+            for isbn, value, expires_at in rows
+        ]
+
+    async def _call(self, function: Callable[..., T], *args: object) -> T:
+        """Run a call to the file on the store thread.
+
+        Args:
+            function (Callable[..., T]): the call.
+            *args (object): its arguments.
+
+        Returns:
+            T: its result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    def _connect(self) -> None:
+        """Open the file and create the schema, on the store thread."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.executescript(SCHEMA)
+
+    def _select(
+        self, source: str, isbns: list[str], now: float
+    ) -> dict[str, bytes | None]:
+        """Read the valid results of some isbns, on the store thread."""
+        values: dict[str, bytes | None] = dict()
+        for chunk in _chunks(isbns, MAX_PARAMS):
+            marks = ",".join("?" * len(chunk))
+            cursor = self._connection.execute(
+                f"SELECT isbn, value FROM results "
+                f"WHERE source = ? AND isbn IN ({marks}) AND expires_at > ?",
+                (source, *chunk, now),
+            )
+            values.update(cursor.fetchall())
+        return values
+
+    def _write(
+        self,
+        rows: list[tuple[str, str, bytes | None, float]],
+        counters: list[tuple[int, str, str]],
+    ) -> None:
+        """Upsert the results and add up the read counters, on the store thread."""
+        with self._connection:
+            self._connection.executemany(UPSERT, rows)
+            self._connection.executemany(
+                "UPDATE results SET hits = hits + ? WHERE source = ? AND isbn = ?",
+                counters,
+            )
+
+    def _compact(self, now: float) -> int:
+        """Drop the expired and least read results, then give the space back, on the store thread."""
+        with self._connection:
+            dropped = self._connection.execute(
+                "DELETE FROM results WHERE expires_at <= ?", (now,)
+            ).rowcount
+            dropped += self._connection.execute(
+                "DELETE FROM results WHERE (source, isbn) IN ("
+                "SELECT source, isbn FROM results ORDER BY hits DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        self._connection.execute("PRAGMA incremental_vacuum")
+        return dropped
+
+    def _hottest(
+        self, source: str, limit: int, now: float
+    ) -> list[tuple[str, bytes | None, float]]:
+        """Read the most read valid results of a datasource, on the store thread."""
+        cursor = self._connection.execute(
+            "SELECT isbn, value, expires_at FROM results "
+            "WHERE source = ? AND expires_at > ? ORDER BY hits DESC LIMIT ?",
+            (source, now, limit),
+        )
+        return cursor.fetchall()
+
+
+def _chunks(items: list[str], size: int) -> Iterable[list[str]]:
+    """Split a list in chunks of at most `size` items.
+
+    Args:
+        items (list[str]): the items.
+        size (int): the maximum size of a chunk.
+
+    Yields:
+        list[str]: the chunks.
+    """
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+@dataclass
+class StoredRepository(RepositoryWrapper):
+    """
+    Decorator for any ApiService, reading through the persistent ResultStore and writing
+    the results of the datasource behind it.
+
+    Failures are not stored: only found and not found results are.
+    The blocking methods are not stored, and go straight to the datasource.
+    """
+
+    store: ResultStore
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Search for a book in the store first, then on the datasource.
+
+        Args:
+            isbn (str): the isbn of the book.
+            context (Context): the api request context.
+
+        Returns:
+            BookDatasource | None: the instance with the fetched information or None if not found.
+        """
+        stored = await self.store.lookup(self.name, [isbn])
+        if isbn in stored:
+            return stored[isbn]
+
+        book = await self.repository.search_for_book_info_async(isbn, context)
+        self.store.put(self.name, isbn, book)
+        return book
+
+    async def search_for_books_info_async(
+        self, isbns: list[str], context: Context
+    ) -> dict[str, BookDatasource | None]:
+        """Search for many books in the store first, then the missing ones on the datasource.
+
+        Args:
+            isbns (list[str]): the isbns of the books.
+            context (Context): the api request context.
+
+        Returns:
+            dict[str, BookDatasource | None]: the instance found for each isbn, None if not found.
+        """
+        books = await self.store.lookup(self.name, isbns)
+        misses = [x for x in isbns if x not in books]
+
+        if misses:
+            fetched = await super().search_for_books_info_async(misses, context)
+            for isbn, book in fetched.items():
+                self.store.put(self.name, isbn, book)
+            books.update(fetched)
+
+        return books
+
+
+@dataclass
+class CountedRepository(RepositoryWrapper):
+    """
+    Decorator for any ApiService, counting every lookup of an isbn in the ResultStore.
+
+    It sits in front of the result cache: the lookups answered from memory are counted too,
+    so that the compaction and the warm-up rank the results by their actual popularity.
+    """
+
+    store: ResultStore
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Count the lookup, then search for the book.
+
+        Args:
+            isbn (str): the isbn of the book.
+            context (Context): the api request context.
+
+        Returns:
+            BookDatasource | None: the instance with the fetched information or None if not found.
+        """
+        self.store.count(self.name, [isbn])
+        return await self.repository.search_for_book_info_async(isbn, context)
+
+    async def search_for_books_info_async(
+        self, isbns: list[str], context: Context
+    ) -> dict[str, BookDatasource | None]:
+        """Count the lookups, then search for the books.
+
+        Args:
+            isbns (list[str]): the isbns of the books.
+            context (Context): the api request context.
+
+        Returns:
+            dict[str, BookDatasource | None]: the instance found for each isbn, None if not found.
+        """
+        self.store.count(self.name, isbns)
+        return await super().search_for_books_info_async(isbns, context)
@@ -0,0 +1,103 @@
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from ferrea.core.context import Context
+
+
+@dataclass(slots=True)
+class _Stage:
+    """The time spent on a stage of a request, over all its calls."""
+
+    duration: float = 0.0
+    calls: int = 0
+
+
+@dataclass
+class Timings:
+    """
+    Durations of the stages of a single request, eg each upstream call or the serialisation.
+
+    A stage run many times, eg the fetch of each author, is summed over its calls:
+    when the calls are concurrent, the sum can exceed the wall time of the request.
+    """
+
+    context: Context | None = None
+    started_at: float = field(default_factory=time.perf_counter)
+    _stages: dict[str, _Stage] = field(default_factory=dict, init=False, repr=False)
+
+    def add(self, stage: str, duration: float) -> None:
+        """Record a run of a stage.
+
+        Args:
+            stage (str): the stage name, a token without spaces, eg `GoogleBooks.volumes`.
+            duration (float): how long it took, in seconds.
+        """
+        entry = self._stages.get(stage)
+        if entry is None:
+            entry = self._stages[stage] = _Stage()
+        entry.duration += duration
+        entry.calls += 1
+
+    def server_timing(self) -> str:
+        """Get the stages as the value of a `Server-Timing` header, the total last.
+
+        Returns:
+            str: the header value.
+        """
+        metrics = [
+            f'{name};dur={x.duration * 1000:.1f};desc="{x.calls} calls"'
+            if x.calls > 1
+            else f"{name};dur={x.duration * 1000:.1f}"
+            for name, x in self._stages.items()
+        ]
+        metrics.append(
+            f"total;dur={(time.perf_counter() - self.started_at) * 1000:.1f}"
+        )
+        return ", ".join(metrics)
+
+
+_TIMINGS: ContextVar[Timings | None] = ContextVar("ferrea_timings", default=None)
+
+
+def start_timings() -> Timings:
+    """Start timing the stages of the current request.
+
+    The timings are shared by every task the request starts from now on.
+
+    Returns:
+        Timings: the timings of the request.
+    """
+    timings = Timings()
+    _TIMINGS.set(timings)
+    return timings
+
+
+def current_timings() -> Timings | None:
+    """Get the timings of the current request.
+
+    Returns:
+        Timings | None: the timings, None if the stages are not timed.
+    """
+    return _TIMINGS.get()
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time a stage of the current request, if its stages are timed.
+
+    Args:
+        stage (str): the stage name, a token without spaces, eg `GoogleBooks.volumes`.
+    """
+    timings = _TIMINGS.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(stage, time.perf_counter() - start)
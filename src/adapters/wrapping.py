@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+
+from ferrea.core.context import Context
+from ferrea.models.datasource import BookDatasource
+
+from models.api_service import ApiService, supports_batch
+
+
+@dataclass
+class RepositoryWrapper:
+    """
+    Base for the decorators of an ApiService: every call is forwarded to the wrapped repository.
+    Subclasses override only the calls they add behaviour to.
+    """
+
+    repository: ApiService
+
+    @property
+    def name(self) -> str:
+        """Get the datasource name."""
+        return self.repository.name
+
+    def search_for_book_info(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Search for a book on the wrapped datasource.
+
+        Args:
+            isbn (str): the isbn of the book.
+            context (Context): the api request context.
+
+        Returns:
+            BookDatasource | None: the instance with the fetched information or None if not found.
+        """
+        return self.repository.search_for_book_info(isbn, context)
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Search for a book on the wrapped datasource.
+
+        Args:
+            isbn (str): the isbn of the book.
+            context (Context): the api request context.
+
+        Returns:
+            BookDatasource | None: the instance with the fetched information or None if not found.
+        """
+        return await self.repository.search_for_book_info_async(isbn, context)
+
+    @property
+    def batch_capable(self) -> bool:
+        """Whether the wrapped datasource can resolve many isbns at once."""
+        return supports_batch(self.repository)
+
+    async def search_for_books_info_async(
+        self, isbns: list[str], context: Context
+    ) -> dict[str, BookDatasource | None]:
+        """Search for many books at once on the wrapped datasource.
+
+        Args:
+            isbns (list[str]): the isbns of the books.
+            context (Context): the api request context.
+
+        Raises:
+            NotImplementedError: if the wrapped datasource is not batch capable.
+
+        Returns:
+            dict[str, BookDatasource | None]: the instance found for each isbn, None if not found.
+        """
+        if not supports_batch(self.repository):
+            raise NotImplementedError(f"{self.name} is not batch capable.")
+        return await self.repository.search_for_books_info_async(isbns, context)
+
+    async def healthy_async(self, context: Context) -> bool:
+        """Health check towards the datasource.
+
+        Args:
+            context (Context): the api request context.
+
+        Returns:
+            bool: whether the datasource answered as expected.
+        """
+        return await self.repository.healthy_async(context)
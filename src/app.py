@@ -1,33 +1,78 @@
+import sys
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-import uvicorn
+import httpx
 from fastapi import FastAPI
 from ferrea.core.oas import add_openapi_schema
 from ferrea.observability.logs import setup_logger
+from prometheus_client import REGISTRY
 
 from configs import settings
-from routers import datasources, probes
+from operations.metrics import RegistryCollector
+from operations.registry import DatasourceRegistry
+from routers import datasources, metrics, probes
+from routers._http_cache import EtagStore
+from routers._metrics import MetricsMiddleware
+from routers._profiling import ProfilingMiddleware
+from routers._timing import ServerTimingMiddleware
+from server import serve
 
 
-def app() -> FastAPI:
-    """Setup the app with custom logic, as well as adding the routers."""
-    app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Build the registry of the datasources, with their pooled HTTP clients,
+    and the entity tags of the searches, for the whole app lifetime.
+    The stats of the registry are exposed in the metrics while it is open.
+
+    Args:
+        app (FastAPI): the app.
+    """
+    async with DatasourceRegistry.open(app.state.pools) as registry:
+        app.state.registry = registry
+        app.state.etags = (
+            EtagStore.from_settings(settings.http_cache)
+            if settings.http_cache.enabled
+            else None
+        )
+        if not settings.metrics.enabled:
+            yield
+            return
+
+        collector = RegistryCollector(registry)
+        REGISTRY.register(collector)
+        try:
+            yield
+        finally:
+            REGISTRY.unregister(collector)
+
+
+def app(pools: dict[str, httpx.AsyncBaseTransport] | None = None) -> FastAPI:
+    """Setup the app with custom logic, as well as adding the routers.
+
+    Args:
+        pools (dict[str, httpx.AsyncBaseTransport] | None, optional): the transport of each
+            datasource in place of its connection pool, eg stub upstreams. Defaults to None.
+    """
+    app = FastAPI(lifespan=lifespan)
     if settings.ferrea_app.oas_path is not None:
         app = add_openapi_schema(app, Path(settings.ferrea_app.oas_path))
 
     app.include_router(datasources.router)
     app.include_router(probes.router)
+    if settings.server_timing.enabled:
+        app.add_middleware(ServerTimingMiddleware)
+    if settings.profiling.enabled:
+        app.add_middleware(ProfilingMiddleware, profiling_settings=settings.profiling)
+    if settings.metrics.enabled:
+        app.include_router(metrics.router)
+        app.add_middleware(MetricsMiddleware)
+    app.state.pools = pools
 
     return app
 
 
 if __name__ == "__main__":
     setup_logger()
-    uvicorn.run(
-        "app:app",
-        port=8080,
-        factory=True,
-        access_log=False,
-        log_level=None,
-        log_config=None,
-    )
+    sys.exit(serve(app, settings.server))
@@ -6,12 +6,97 @@ from dynaconf.typed.validators import Validator
 config_dir = Path(__file__).parent
 
 
+class HttpClient(DictValue):
+    """Settings for the pooled HTTP client towards a single datasource."""
+
+    http2: bool = False
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 3.0
+    read_timeout: float = 5.0
+    write_timeout: float = 5.0
+    pool_timeout: float = 5.0
+    total_timeout: float = 8.0
+
+
+class Hedge(DictValue):
+    """Settings for hedging the slow requests towards a single datasource."""
+
+    enabled: bool = False
+    percentile: Annotated[float, Validator(gt=0, lt=1)] = 0.95
+    min_samples: Annotated[int, Validator(ge=1)] = 50
+    window: Annotated[int, Validator(ge=1)] = 500
+    min_delay: float = 0.05
+
+
+class RateLimit(DictValue):
+    """Settings for the client-side rate limit towards a single datasource."""
+
+    enabled: bool = True
+    rate: Annotated[float, Validator(gt=0)] = 10.0
+    burst: Annotated[float, Validator(ge=1)] = 20.0
+    max_wait: float = 2.0
+
+
+class Retry(DictValue):
+    """Settings for retrying the requests a single datasource refused because of load."""
+
+    enabled: bool = True
+    max_retries: Annotated[int, Validator(ge=0)] = 2
+    backoff: float = 0.2
+    max_backoff: float = 2.0
+    budget: float = 3.0
+
+
+class Cache(DictValue):
+    """Settings for the in-process result cache in front of a single datasource."""
+
+    enabled: bool = True
+    max_entries: Annotated[int, Validator(ge=1)] = 10_000
+    max_bytes: Annotated[int, Validator(ge=1)] = 64 * 1024 * 1024
+    ttl: float = 24 * 60 * 60
+    negative_ttl: float = 10 * 60
+
+
+class Breaker(DictValue):
+    """Settings for the circuit breaker in front of a single datasource."""
+
+    enabled: bool = True
+    window: float = 30.0
+    min_calls: Annotated[int, Validator(ge=1)] = 10
+    error_rate: Annotated[float, Validator(gt=0, le=1)] = 0.5
+    slow_call: float = 3.0
+    slow_rate: Annotated[float, Validator(gt=0, le=1)] = 0.8
+    open_for: float = 15.0
+    half_open_calls: Annotated[int, Validator(ge=1)] = 3
+
+
+class Portraits(DictValue):
+    """Settings for the cache of whether each author has a portrait on OpenLibrary."""
+
+    enabled: bool = True
+    max_entries: Annotated[int, Validator(ge=1)] = 100_000
+    ttl: float = 30 * 24 * 60 * 60.0
+    negative_ttl: float = 7 * 24 * 60 * 60.0
+
+
 class Openlibrary(DictValue):
     """Settings for the Openlibrary datasource."""
 
     api_url: Annotated[str, Validator(startswith="https://")]
     cover_url: Annotated[str, Validator(startswith="https://")]
     name: str
+    enabled: bool = True
+    author_concurrency: Annotated[int, Validator(ge=1)] = 8
+    bulk_size: Annotated[int, Validator(ge=1)] = 50
+    portraits: Portraits = Portraits()
+    http: HttpClient = HttpClient()
+    hedge: Hedge = Hedge()
+    rate_limit: RateLimit = RateLimit()
+    retry: Retry = Retry()
+    cache: Cache = Cache()
+    breaker: Breaker = Breaker()
 
 
 class Google(DictValue):
@@ -19,6 +104,123 @@ class Google(DictValue):
 
     api_url: Annotated[str, Validator(startswith="https://")]
     name: str
+    enabled: bool = True
+    single_request: bool = True
+    http: HttpClient = HttpClient()
+    hedge: Hedge = Hedge()
+    rate_limit: RateLimit = RateLimit()
+    retry: Retry = Retry()
+    cache: Cache = Cache()
+    breaker: Breaker = Breaker()
+
+
+class LocalIndex(DictValue):
+    """Settings for the local index of the OpenLibrary dumps, queried before the live datasources."""
+
+    enabled: bool = False
+    name: str = "OpenLibraryDump"
+    path: str = "/var/lib/ferrea/openlibrary.index"
+
+
+class Datasources(DictValue):
+    """Settings for the datasources queried."""
+
+    order: list[str] = ["GoogleBooks", "OpenLibrary"]
+
+
+class Search(DictValue):
+    """Settings for the fan-out towards the datasources."""
+
+    policy: Annotated[str, Validator(is_in=["first_success", "all", "quorum"])] = (
+        "first_success"
+    )
+    quorum: int = 2
+    deadline: float = 8.0
+
+
+class Batch(DictValue):
+    """Settings for the batch lookups."""
+
+    max_isbns: Annotated[int, Validator(ge=1)] = 10_000
+    concurrency: Annotated[int, Validator(ge=1)] = 16
+    window_size: Annotated[int, Validator(ge=1)] = 200
+
+
+class Hedging(DictValue):
+    """Settings shared by the hedging of every datasource."""
+
+    max_rate: Annotated[float, Validator(ge=0, le=1)] = 0.05
+    burst: Annotated[float, Validator(ge=1)] = 10.0
+
+
+class Health(DictValue):
+    """Settings for the background health polling of the datasources."""
+
+    interval: Annotated[float, Validator(gt=0)] = 15.0
+    history: Annotated[int, Validator(ge=1)] = 10
+    stale_after: float = 60.0
+    passive_window: float = 60.0
+    passive_min_calls: Annotated[int, Validator(ge=1)] = 20
+    passive_error_rate: Annotated[float, Validator(gt=0, le=1)] = 0.5
+
+
+class Store(DictValue):
+    """Settings for the persistent result store, shared by every datasource."""
+
+    enabled: bool = False
+    path: str = "/var/lib/ferrea/datasources.sqlite3"
+    ttl: float = 7 * 24 * 60 * 60.0
+    negative_ttl: float = 60 * 60.0
+    max_entries: Annotated[int, Validator(ge=1)] = 1_000_000
+    flush_interval: Annotated[float, Validator(gt=0)] = 1.0
+    flush_size: Annotated[int, Validator(ge=1)] = 500
+    compact_interval: Annotated[float, Validator(gt=0)] = 10 * 60.0
+    warm_up: Annotated[int, Validator(ge=0)] = 10_000
+
+
+class HttpCache(DictValue):
+    """Settings for the HTTP caching of the search responses."""
+
+    enabled: bool = True
+    max_age: Annotated[int, Validator(ge=0)] = 60 * 60
+    stale_while_revalidate: Annotated[int, Validator(ge=0)] = 24 * 60 * 60
+    negative_max_age: Annotated[int, Validator(ge=0)] = 5 * 60
+    max_entries: Annotated[int, Validator(ge=1)] = 100_000
+
+
+class Metrics(DictValue):
+    """Settings for the Prometheus metrics of the webserver."""
+
+    enabled: bool = True
+
+
+class ServerTiming(DictValue):
+    """Settings for the `Server-Timing` header of the responses."""
+
+    enabled: bool = True
+
+
+class Profiling(DictValue):
+    """Settings for the sampling profiler of the requests."""
+
+    enabled: bool = False
+    sample_rate: Annotated[float, Validator(ge=0, le=1)] = 0.01
+    interval: Annotated[float, Validator(gt=0)] = 0.005
+    allow_header: bool = False
+    output_dir: str = "/tmp/ferrea/profiles"
+
+
+class Server(DictValue):
+    """Settings for the webserver processes."""
+
+    host: str = "0.0.0.0"
+    port: Annotated[int, Validator(ge=1, le=65535)] = 8080
+    workers: Annotated[int, Validator(ge=1)] = 1
+    backlog: Annotated[int, Validator(ge=1)] = 2048
+    keep_alive: Annotated[int, Validator(ge=1)] = 5
+    graceful_timeout: Annotated[int, Validator(ge=0)] = 30
+    loop: Annotated[str, Validator(is_in=["auto", "asyncio", "uvloop"])] = "auto"
+    http: Annotated[str, Validator(is_in=["auto", "h11", "httptools"])] = "auto"
 
 
 class FerreaApp(DictValue):
@@ -33,8 +235,20 @@ class FerreaSettings(Dynaconf):
     """Overall settings for the webserver."""
 
     ferrea_app: FerreaApp = FerreaApp()  # type: ignore
+    server: Server = Server()
     google: Google = Google()  # type: ignore
     openlibrary: Openlibrary = Openlibrary()  # type: ignore
+    local_index: LocalIndex = LocalIndex()
+    datasources: Datasources = Datasources()
+    search: Search = Search()
+    batch: Batch = Batch()
+    hedging: Hedging = Hedging()
+    health: Health = Health()
+    http_cache: HttpCache = HttpCache()
+    result_store: Store = Store()
+    metrics: Metrics = Metrics()
+    server_timing: ServerTiming = ServerTiming()
+    profiling: Profiling = Profiling()
 
     dynaconf_options = Options(
         envvar_prefix="FERREA",
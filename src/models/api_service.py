@@ -1,5 +1,6 @@
-from typing import Protocol
+from typing import Protocol, TypeGuard
 
+from ferrea.core.context import Context
 from ferrea.models.datasource import BookDatasource
 
 
@@ -13,11 +14,77 @@ class ApiService(Protocol):
         """Get the datasource name."""
         ...
 
-    def search_for_book_info(self, isbn: str) -> BookDatasource | None:
+    def search_for_book_info(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
         """Search for a book, given the ISBN."""
         ...
 
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Search for a book, given the ISBN, without blocking the event loop."""
+        ...
+
+    async def healthy_async(self, context: Context) -> bool:
+        """Health check towards the datasource, without blocking the event loop."""
+        ...
+
+
+class BatchApiService(ApiService, Protocol):
+    """
+    Optional capability of the datasources able to resolve many isbns with few upstream calls.
+    Use supports_batch to check whether a datasource has it.
+    """
+
     @property
-    def healthy(self) -> bool:
-        """Health check towards the datasource."""
+    def batch_capable(self) -> bool:
+        """Whether the datasource can resolve many isbns at once."""
         ...
+
+    async def search_for_books_info_async(
+        self, isbns: list[str], context: Context
+    ) -> dict[str, BookDatasource | None]:
+        """Search for many books at once, given their ISBNs."""
+        ...
+
+
+def supports_batch(datasource: ApiService) -> TypeGuard[BatchApiService]:
+    """Check whether a datasource can resolve many isbns at once.
+
+    Args:
+        datasource (ApiService): the datasource.
+
+    Returns:
+        TypeGuard[BatchApiService]: whether the datasource has the batch capability.
+    """
+    return getattr(datasource, "batch_capable", False)
+
+
+class LocalApiService(ApiService, Protocol):
+    """
+    Optional capability of the datasources answering from local data, without any network call.
+    They are queried before the others, which are only called on their misses.
+    Use is_local to check whether a datasource has it.
+    """
+
+    @property
+    def local(self) -> bool:
+        """Whether the datasource answers from local data."""
+        ...
+
+    def knows(self, isbn: str) -> bool:
+        """Whether the datasource holds a book, without reading it."""
+        ...
+
+
+def is_local(datasource: ApiService) -> TypeGuard[LocalApiService]:
+    """Check whether a datasource answers from local data.
+
+    Args:
+        datasource (ApiService): the datasource.
+
+    Returns:
+        TypeGuard[LocalApiService]: whether the datasource has the local capability.
+    """
+    return getattr(datasource, "local", False)
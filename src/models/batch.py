@@ -0,0 +1,19 @@
+from ferrea.models.datasource import BookDatasource
+from pydantic import BaseModel, Field
+
+from configs import settings
+
+
+class BatchRequest(BaseModel):
+    """Batch lookup request. Holds the isbns to resolve."""
+
+    isbns: list[str] = Field(min_length=1, max_length=settings.batch.max_isbns)
+
+
+class BatchItem(BaseModel):
+    """Batch lookup result for a single isbn. Streamed as a line of the response."""
+
+    isbn: str
+    items: int
+    result: list[BookDatasource]
+    error: str | None = None
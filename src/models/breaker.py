@@ -0,0 +1,9 @@
+from enum import StrEnum, auto
+
+
+class BreakerState(StrEnum):
+    """State of the circuit breaker in front of a datasource."""
+
+    CLOSED = auto()
+    OPEN = auto()
+    HALF_OPEN = auto()
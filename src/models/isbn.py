@@ -0,0 +1,69 @@
+import re
+from typing import Annotated
+
+from pydantic import AfterValidator
+
+ISBN_SEPARATORS = re.compile(r"[\s\-]")
+# ASCII digits only: `\d` and `int` accept any Unicode digit
+ISBN_10_PATTERN = re.compile(r"^[0-9]{9}[0-9X]$")
+ISBN_13_PATTERN = re.compile(r"^97[89][0-9]{10}$")
+ISBN_13_PREFIX = "978"
+
+
+def canonical_isbn(isbn: str) -> str:
+    """Validate an ISBN-10 or ISBN-13 and convert it to its canonical ISBN-13 form.
+    Hyphens and spaces are ignored, as well as the case of the ISBN-10 `X` check digit.
+
+    Args:
+        isbn (str): the isbn, as provided by the client.
+
+    Raises:
+        ValueError: if the isbn is malformed or its check digit does not match.
+
+    Returns:
+        str: the ISBN-13, without separators.
+    """
+    digits = ISBN_SEPARATORS.sub("", isbn).upper()
+
+    if ISBN_10_PATTERN.match(digits):
+        if digits[-1] != _isbn_10_check_digit(digits[:9]):
+            raise ValueError(f"{isbn} is not a valid ISBN-10: wrong check digit")
+        body = ISBN_13_PREFIX + digits[:9]
+        return body + _isbn_13_check_digit(body)
+
+    if ISBN_13_PATTERN.match(digits):
+        if digits[-1] != _isbn_13_check_digit(digits[:12]):
+            raise ValueError(f"{isbn} is not a valid ISBN-13: wrong check digit")
+        return digits
+
+    raise ValueError(f"{isbn} is neither an ISBN-10 nor an ISBN-13")
+
+
+def _isbn_10_check_digit(body: str) -> str:
+    """Compute the check digit of an ISBN-10.
+
+    Args:
+        body (str): the first 9 digits.
+
+    Returns:
+        str: the check digit, `X` standing for 10.
+    """
+    remainder = sum((10 - i) * int(x) for i, x in enumerate(body)) % 11
+    check = (11 - remainder) % 11
+    return "X" if check == 10 else str(check)
+
+
+def _isbn_13_check_digit(body: str) -> str:
+    """Compute the check digit of an ISBN-13.
+
+    Args:
+        body (str): the first 12 digits.
+
+    Returns:
+        str: the check digit.
+    """
+    total = sum(int(x) * (3 if i % 2 else 1) for i, x in enumerate(body))
+    return str((10 - total % 10) % 10)
+
+
+CanonicalIsbn = Annotated[str, AfterValidator(canonical_isbn)]
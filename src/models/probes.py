@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+from datetime import datetime
 from enum import StrEnum, auto
 
 from pydantic import BaseModel, Field
 
+from models.breaker import BreakerState
+
 
 class HealthProbe(BaseModel):
     """Health Probe object. Holds the overall status and each entity checked."""
@@ -18,6 +21,10 @@ class Entity(BaseModel):
     name: str
     status: HealthStatus
     internal_status: bool = Field(exclude=True)
+    breaker: BreakerState | None = None
+    checked_at: datetime | None = None
+    latencies: list[float] | None = None
+    error_rate: float | None = None
 
 
 class HealthStatus(StrEnum):
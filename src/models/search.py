@@ -0,0 +1,9 @@
+from enum import StrEnum, auto
+
+
+class CompletionPolicy(StrEnum):
+    """When the fan-out towards the datasources is considered complete."""
+
+    FIRST_SUCCESS = auto()
+    ALL = auto()
+    QUORUM = auto()
@@ -0,0 +1,178 @@
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Iterable, Iterator
+from dataclasses import dataclass
+from itertools import islice
+
+from ferrea.core.context import Context
+from ferrea.models.datasource import BookDatasource
+from ferrea.observability.logs import ferrea_logger
+
+from adapters.wrapping import RepositoryWrapper
+from models.api_service import ApiService, is_local, supports_batch
+from models.batch import BatchItem
+from models.isbn import canonical_isbn
+from operations.data_search import fetch_data
+
+
+@dataclass
+class _PrefetchedRepository(RepositoryWrapper):
+    """Answer from the results of a bulk search, falling back to the datasource for other isbns."""
+
+    books: dict[str, BookDatasource | None]
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Search for a book among the prefetched ones first.
+
+        Args:
+            isbn (str): the isbn of the book.
+            context (Context): the api request context.
+
+        Returns:
+            BookDatasource | None: the instance with the fetched information or None if not found.
+        """
+        if isbn in self.books:
+            return self.books[isbn]
+        return await self.repository.search_for_book_info_async(isbn, context)
+
+
+async def resolve_batch(
+    isbns: Iterable[str],
+    datasources: list[ApiService],
+    context: Context,
+    concurrency: int,
+    window_size: int,
+) -> AsyncIterator[BatchItem]:
+    """Resolve many isbns, yielding each result as soon as it is available.
+
+    The isbns are canonicalised and deduplicated first: invalid ones are yielded straight away
+    with an error. They are then processed in windows of `window_size`: the batch capable
+    datasources resolve the whole window in bulk, the others isbn by isbn.
+    At most `concurrency` isbns are resolved at once, and at most as many results are buffered,
+    so memory does not grow with the size of the batch.
+
+    Args:
+        isbns (Iterable[str]): the isbns, as provided by the client.
+        datasources (list[ApiService]): the list of all configured datasources.
+        context (Context): the api request context.
+        concurrency (int): the maximum number of isbns resolved at once.
+        window_size (int): the number of isbns resolved in bulk by the batch capable datasources.
+
+    Yields:
+        BatchItem: the result for a single isbn, in completion order.
+    """
+    invalid: deque[BatchItem] = deque()
+    pending = _canonical_isbns(isbns, invalid)
+    jobs: asyncio.Queue[tuple[str, list[ApiService]] | None] = asyncio.Queue(
+        maxsize=concurrency
+    )
+    results: asyncio.Queue[BatchItem] = asyncio.Queue(maxsize=concurrency)
+
+    async def producer() -> None:
+        while window := list(islice(pending, window_size)):
+            window_datasources = await _prefetch(window, datasources, context)
+            for isbn in window:
+                await jobs.put((isbn, window_datasources))
+        for _ in range(concurrency):
+            await jobs.put(None)
+
+    async def worker() -> None:
+        while (job := await jobs.get()) is not None:
+            isbn, window_datasources = job
+            books_data = await fetch_data(isbn, window_datasources, context)
+            await results.put(
+                BatchItem(isbn=isbn, items=len(books_data), result=books_data)
+            )
+
+    tasks = [asyncio.create_task(producer())]
+    tasks.extend(asyncio.create_task(worker()) for _ in range(concurrency))
+    done = asyncio.gather(*tasks)
+    ferrea_logger.info(
+        f"Start resolving a batch with {concurrency} workers.",
+        **context.log,
+    )
+
+    try:
+        while not (done.done() and results.empty()):
+            while invalid:
+                yield invalid.popleft()
+
+            getter = asyncio.ensure_future(results.get())
+            await asyncio.wait({getter, done}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
+
+        while invalid:
+            yield invalid.popleft()
+        done.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _prefetch(
+    window: list[str],
+    datasources: list[ApiService],
+    context: Context,
+) -> list[ApiService]:
+    """Resolve a window of isbns in bulk on the batch capable datasources.
+    The isbns known to a local datasource are left out of the bulk searches.
+
+    Args:
+        window (list[str]): the isbns of the window.
+        datasources (list[ApiService]): the list of all configured datasources.
+        context (Context): the api request context.
+
+    Returns:
+        list[ApiService]: the datasources, where the batch capable ones answer from their bulk results.
+    """
+    local = [x for x in datasources if is_local(x)]
+    window = [x for x in window if not any(y.knows(x) for y in local)]
+    if not window:
+        return datasources
+
+    capable = [x for x in datasources if supports_batch(x)]
+    found = await asyncio.gather(
+        *[x.search_for_books_info_async(window, context) for x in capable],
+        return_exceptions=True,
+    )
+
+    prefetched: dict[str, ApiService] = dict()
+    for datasource, books in zip(capable, found):
+        if isinstance(books, Exception):
+            ferrea_logger.warning(
+                f"Bulk search on {datasource.name} failed with {books!r}: falling back to single lookups.",
+                **context.log,
+            )
+            continue
+        prefetched[datasource.name] = _PrefetchedRepository(datasource, books)  # type: ignore[arg-type]
+
+    return [prefetched.get(x.name, x) for x in datasources]
+
+
+def _canonical_isbns(isbns: Iterable[str], invalid: deque[BatchItem]) -> Iterator[str]:
+    """Canonicalise and deduplicate the isbns lazily.
+
+    Args:
+        isbns (Iterable[str]): the isbns, as provided by the client.
+        invalid (deque[BatchItem]): where to collect the error items of the invalid isbns.
+
+    Yields:
+        str: each distinct isbn, as ISBN-13.
+    """
+    seen: set[str] = set()
+    for isbn in isbns:
+        try:
+            canonical = canonical_isbn(isbn)
+        except ValueError as e:
+            invalid.append(BatchItem(isbn=isbn, items=0, result=[], error=str(e)))
+            continue
+
+        if canonical not in seen:
+            seen.add(canonical)
+            yield canonical
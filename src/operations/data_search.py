@@ -1,32 +1,142 @@
+import asyncio
+
 from ferrea.core.context import Context
 from ferrea.models.datasource import BookDatasource
 from ferrea.observability.logs import ferrea_logger
 
-from models.api_service import ApiService
+from adapters.breaker import CircuitOpenError
+from configs import settings
+from models.api_service import ApiService, is_local
+from models.search import CompletionPolicy
 
 
-def fetch_data(
+async def fetch_data(
     isbn: str,
     datasources: list[ApiService],
     context: Context,
-) -> BookDatasource | None:
+    policy: CompletionPolicy | None = None,
+    quorum: int | None = None,
+    deadline: float | None = None,
+) -> list[BookDatasource]:
     """From all the registered datasources, try to fetch the data.
 
+    The local datasources are queried first, inline: if their hits already complete the search,
+    the others are not called at all. The others are queried concurrently.
+    Depending on the policy, the search completes:
+    - first_success: as soon as one datasource has found the book, the others are cancelled.
+    - all: when every datasource has answered.
+    - quorum: as soon as `quorum` datasources have found the book.
+    If the deadline expires first, the results gathered so far are returned.
+    No more hits than the policy requires are returned: among the datasources answering
+    together, the first ones in order are kept.
+
     Args:
         isbn (str): the book isbn.
         datasources (list[ApiService]): the list of all configured datasources.
         context (Context): the api request context.
+        policy (CompletionPolicy | None): the completion policy. Defaults to the configured one.
+        quorum (int | None): the hits required by the quorum policy. Defaults to the configured one.
+        deadline (float | None): the overall deadline in seconds. Defaults to the configured one.
 
     Returns:
-        BookDatasource | None: the instance with the fetched information or None if not found.
+        list[BookDatasource]: the instances found, in the datasources order. Empty if not found.
     """
+    policy = CompletionPolicy(policy or settings.search.policy)
+    quorum = quorum or settings.search.quorum
+    deadline = deadline or settings.search.deadline
+
+    hits: dict[int, BookDatasource] = dict()
+    for position, datasource in enumerate(datasources):
+        if is_local(datasource) and not _is_complete(policy, len(hits), quorum):
+            book_data = await _search(datasource, isbn, context)
+            if book_data is not None:
+                hits[position] = book_data
+    if hits and _is_complete(policy, len(hits), quorum):
+        return [hits[x] for x in sorted(hits)]
+
     ferrea_logger.info(
-        "Start searching external datasources for book data.",
+        f"Start searching external datasources for {isbn} with policy {policy}.",
         **context.log,
     )
-    for datasource in datasources:
-        book_data = datasource.search_for_book_info(
-            isbn
-        )  # TODO: right now returns just the latest. Implement a logic for the multiple datasources.
+    tasks = {
+        asyncio.create_task(_search(datasource, isbn, context)): position
+        for position, datasource in enumerate(datasources)
+        if not is_local(datasource)
+    }
+    pending = set(tasks)
+
+    try:
+        async with asyncio.timeout(deadline):
+            while pending and not _is_complete(policy, len(hits), quorum):
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                # answers arriving together are taken in the datasources order
+                for task in sorted(done, key=tasks.__getitem__):
+                    if _is_complete(policy, len(hits), quorum):
+                        break
+                    book_data = task.result()
+                    if book_data is not None:
+                        hits[tasks[task]] = book_data
+    except TimeoutError:
+        ferrea_logger.warning(
+            (
+                f"Deadline of {deadline}s expired while searching {isbn}:"
+                f" returning {len(hits)} partial results."
+            ),
+            **context.log,
+        )
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
 
-    return book_data
+    return [hits[x] for x in sorted(hits)]
+
+
+def _is_complete(policy: CompletionPolicy, hits: int, quorum: int) -> bool:
+    """Check whether the search can stop before every datasource has answered.
+
+    Args:
+        policy (CompletionPolicy): the completion policy.
+        hits (int): the number of datasources that found the book so far.
+        quorum (int): the hits required by the quorum policy.
+
+    Returns:
+        bool: whether the search is complete.
+    """
+    match policy:
+        case CompletionPolicy.FIRST_SUCCESS:
+            return hits >= 1
+        case CompletionPolicy.QUORUM:
+            return hits >= quorum
+        case _:
+            return False
+
+
+async def _search(
+    datasource: ApiService,
+    isbn: str,
+    context: Context,
+) -> BookDatasource | None:
+    """Search a single datasource, so that its failure does not affect the others.
+
+    Args:
+        datasource (ApiService): the datasource.
+        isbn (str): the book isbn.
+        context (Context): the api request context.
+
+    Returns:
+        BookDatasource | None: the instance with the fetched information or None if not found.
+    """
+    try:
+        return await datasource.search_for_book_info_async(isbn, context)
+    except CircuitOpenError as e:
+        ferrea_logger.info(str(e), **context.log)
+        return None
+    except Exception as e:
+        ferrea_logger.warning(
+            f"Search of {isbn} on {datasource.name} failed with {e!r}.",
+            **context.log,
+        )
+        return None
@@ -0,0 +1,259 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from ferrea.core.context import Context
+from ferrea.models.datasource import BookDatasource
+from ferrea.observability.logs import ferrea_logger
+
+from adapters.breaker import CircuitBreaker
+from adapters.ratelimit import ThrottledError
+from adapters.wrapping import RepositoryWrapper
+from configs.config import Health
+from models.api_service import ApiService
+from models.probes import Entity, HealthProbe, HealthStatus
+
+
+@dataclass
+class _SourceHealth:
+    """What is known about the health of a single datasource."""
+
+    healthy: bool | None = None
+    checked_at: datetime | None = None
+    checked_at_monotonic: float | None = None
+    latencies: deque[float] = field(default_factory=deque)
+    outcomes: deque[tuple[float, bool]] = field(default_factory=deque)
+    failures: int = 0
+
+    def prune(self, since: float) -> None:
+        """Drop the outcomes older than a moment.
+
+        Args:
+            since (float): the moment, on the monotonic clock.
+        """
+        while self.outcomes and self.outcomes[0][0] < since:
+            _, success = self.outcomes.popleft()
+            self.failures -= not success
+
+
+@dataclass
+class HealthMonitor:
+    """
+    Health of the datasources, kept up to date in the background.
+
+    The upstreams are probed every `interval` seconds, and the outcomes of the real lookups
+    are folded in: a datasource is unhealthy if its last probe failed, if it was not probed
+    for `stale_after` seconds, or if too many of its recent lookups failed.
+    The snapshot is rebuilt when read, from the last round of probes and the current
+    breaker states and error rates: the probe endpoints answer without any call to the
+    upstreams, and without lagging behind a breaker opening.
+    """
+
+    datasources: list[ApiService]
+    breakers: dict[str, CircuitBreaker]
+    context: Context
+    interval: float
+    history: int
+    stale_after: float
+    passive_window: float
+    passive_min_calls: int
+    passive_error_rate: float
+    clock: Callable[[], float] = time.monotonic
+    _sources: dict[str, _SourceHealth] = field(init=False, repr=False)
+    _snapshot: HealthProbe = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._sources = {
+            x.name: _SourceHealth(latencies=deque(maxlen=self.history))
+            for x in self.datasources
+        }
+        self.refresh()
+
+    @classmethod
+    def from_settings(
+        cls,
+        health_settings: Health,
+        datasources: list[ApiService],
+        breakers: dict[str, CircuitBreaker],
+        context: Context,
+    ) -> "HealthMonitor":
+        """Build the monitor from the settings.
+
+        Args:
+            health_settings (Health): the health settings.
+            datasources (list[ApiService]): the datasources to monitor.
+            breakers (dict[str, CircuitBreaker]): the circuit breaker of each datasource, if enabled.
+            context (Context): the context the probes are logged with.
+
+        Returns:
+            HealthMonitor: the monitor.
+        """
+        return cls(
+            datasources=datasources,
+            breakers=breakers,
+            context=context,
+            interval=health_settings.interval,
+            history=health_settings.history,
+            stale_after=health_settings.stale_after,
+            passive_window=health_settings.passive_window,
+            passive_min_calls=health_settings.passive_min_calls,
+            passive_error_rate=health_settings.passive_error_rate,
+        )
+
+    @property
+    def snapshot(self) -> HealthProbe:
+        """Get the health as of the last round of probes and the lookups since."""
+        self.refresh()
+        return self._snapshot
+
+    async def run(self) -> None:
+        """Probe the datasources forever, every `interval` seconds."""
+        while True:
+            await self.poll()
+            await asyncio.sleep(self.interval)
+
+    async def poll(self) -> None:
+        """Probe every datasource once, then rebuild the snapshot."""
+        results = await asyncio.gather(
+            *[self._probe(x) for x in self.datasources], return_exceptions=True
+        )
+        for datasource, result in zip(self.datasources, results):
+            source = self._sources[datasource.name]
+            if isinstance(result, BaseException):
+                ferrea_logger.warning(
+                    f"Health probe of {datasource.name} failed with {result!r}"
+                )
+                source.healthy = False
+            else:
+                healthy, latency = result
+                source.healthy = healthy
+                source.latencies.append(latency)
+            source.checked_at = datetime.now(timezone.utc)
+            source.checked_at_monotonic = self.clock()
+
+        self.refresh()
+
+    def record(self, name: str, success: bool) -> None:
+        """Record the outcome of a real lookup on a datasource.
+
+        Args:
+            name (str): the datasource name.
+            success (bool): whether the datasource answered.
+        """
+        source = self._sources.get(name)
+        if source is None:
+            return
+        now = self.clock()
+        source.outcomes.append((now, success))
+        source.failures += not success
+        source.prune(now - self.passive_window)
+
+    def refresh(self) -> None:
+        """Rebuild the snapshot from what is known about each datasource."""
+        now = self.clock()
+        entities: list[Entity] = list()
+        for name, source in self._sources.items():
+            source.prune(now - self.passive_window)
+            error_rate = (
+                source.failures / len(source.outcomes)
+                if len(source.outcomes) >= self.passive_min_calls
+                else None
+            )
+            stale = (
+                source.checked_at_monotonic is not None
+                and now - source.checked_at_monotonic > self.stale_after
+            )
+            # not probed yet: healthy until proven otherwise
+            healthy = (
+                source.healthy is not False
+                and not stale
+                and (error_rate is None or error_rate < self.passive_error_rate)
+            )
+            breaker = self.breakers.get(name)
+            entities.append(
+                Entity(
+                    name=name,
+                    status=(
+                        HealthStatus.HEALTHY if healthy else HealthStatus.UNHEALTHY
+                    ),
+                    internal_status=healthy,
+                    breaker=breaker.state if breaker is not None else None,
+                    checked_at=source.checked_at,
+                    latencies=list(source.latencies),
+                    error_rate=error_rate,
+                )
+            )
+
+        # the service itself stays healthy: restarting it does not fix an outage upstream,
+        # which is reported by the entities
+        self._snapshot = HealthProbe(status=HealthStatus.HEALTHY, entities=entities)
+
+    async def _probe(self, datasource: ApiService) -> tuple[bool, float]:
+        """Probe a datasource, timing the call.
+
+        Args:
+            datasource (ApiService): the datasource.
+
+        Returns:
+            tuple[bool, float]: whether it is healthy, and the duration of the probe in seconds.
+        """
+        start = time.perf_counter()
+        healthy = await datasource.healthy_async(self.context)
+        return healthy, time.perf_counter() - start
+
+
+@dataclass
+class MonitoredRepository(RepositoryWrapper):
+    """
+    Decorator for any ApiService, reporting the outcome of each lookup to the health monitor.
+    The calls refused by the client-side rate limit are not reported: the upstream was not called.
+    """
+
+    monitor: HealthMonitor
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Search for a book on the datasource, recording whether it answered.
+
+        Args:
+            isbn (str): the isbn of the book.
+            context (Context): the api request context.
+
+        Returns:
+            BookDatasource | None: the instance with the fetched information or None if not found.
+        """
+        try:
+            book = await super().search_for_book_info_async(isbn, context)
+        except ThrottledError:
+            raise
+        except Exception:
+            self.monitor.record(self.name, False)
+            raise
+        self.monitor.record(self.name, True)
+        return book
+
+    async def search_for_books_info_async(
+        self, isbns: list[str], context: Context
+    ) -> dict[str, BookDatasource | None]:
+        """Search for many books at once on the datasource, recording whether it answered.
+
+        Args:
+            isbns (list[str]): the isbns of the books.
+            context (Context): the api request context.
+
+        Returns:
+            dict[str, BookDatasource | None]: the instance found for each isbn, None if not found.
+        """
+        try:
+            books = await super().search_for_books_info_async(isbns, context)
+        except ThrottledError:
+            raise
+        except Exception:
+            self.monitor.record(self.name, False)
+            raise
+        self.monitor.record(self.name, True)
+        return books
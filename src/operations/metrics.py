@@ -0,0 +1,174 @@
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, fields
+
+import httpx
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+from adapters._http import transport_layers
+from adapters.cache import CacheStats, FlagCache
+from adapters.ratelimit import RateLimitTransport
+from adapters.retrying import RetryTransport
+from models.breaker import BreakerState
+
+from .registry import DatasourceRegistry
+
+
+def _counters(
+    prefix: str,
+    documentation: str,
+    stats: Iterable[tuple[tuple[str, ...], object]],
+    labels: tuple[str, ...],
+) -> Iterator[Metric]:
+    """Expose each field of some stats dataclasses as a counter.
+
+    Args:
+        prefix (str): the prefix of the metric names.
+        documentation (str): what the counters are about.
+        stats (Iterable[tuple[tuple[str, ...], object]]): the label values and stats of each series.
+        labels (tuple[str, ...]): the label names.
+
+    Yields:
+        Metric: a counter for each field.
+    """
+    stats = list(stats)
+    if not stats:
+        return
+    for x in fields(stats[0][1]):  # type: ignore[arg-type]
+        counter = CounterMetricFamily(
+            f"{prefix}_{x.name}", f"{documentation}: {x.name}.", labels=labels
+        )
+        for values, item in stats:
+            counter.add_metric(values, getattr(item, x.name))
+        yield counter
+
+
+# registered by identity in the prometheus registry
+@dataclass(eq=False)
+class RegistryCollector(Collector):
+    """
+    Prometheus collector reading the stats the datasources already keep, at scrape time.
+
+    Nothing is recorded on the hot path: the caches, circuit breakers, retries, rate limits,
+    hedges and connection pools count their own events, and are only read on a scrape.
+    """
+
+    registry: DatasourceRegistry
+
+    def collect(self) -> Iterator[Metric]:
+        """Read the stats of the registry.
+
+        Yields:
+            Metric: the metrics.
+        """
+        yield from self._caches()
+        yield from self._breakers()
+        yield from self._transports()
+        yield from self._store()
+        yield from self._local_index()
+
+        hedges = self.registry.hedge_budget.stats
+        yield from _counters("ferrea_hedge", "Hedged requests", [((), hedges)], ())
+
+        coalesced = CounterMetricFamily(
+            "ferrea_coalesced_lookups", "Lookups joining an identical one in flight."
+        )
+        coalesced.add_metric((), self.registry.single_flight.coalesced)
+        yield coalesced
+
+    def _caches(self) -> Iterator[Metric]:
+        """Read the hits and misses of the in-process caches of each datasource."""
+        stats: list[tuple[tuple[str, ...], CacheStats]] = list()
+        entries = GaugeMetricFamily(
+            "ferrea_cache_entries",
+            "Entries in the in-process caches.",
+            labels=("datasource", "cache"),
+        )
+        for name, cache in self.registry.caches.items():
+            stats.append(((name, "results"), cache.stats))
+            entries.add_metric((name, "results"), len(cache))
+        for repository in self.registry.repositories:
+            portraits = getattr(repository, "portraits", None)
+            if isinstance(portraits, FlagCache):
+                stats.append(((repository.name, "portraits"), portraits.stats))
+                entries.add_metric((repository.name, "portraits"), len(portraits))
+
+        yield entries
+        yield from _counters(
+            "ferrea_cache", "In-process caches", stats, ("datasource", "cache")
+        )
+
+    def _breakers(self) -> Iterator[Metric]:
+        """Read the state and counters of the circuit breaker of each datasource."""
+        breakers = self.registry.breakers
+        state = GaugeMetricFamily(
+            "ferrea_breaker_state",
+            "Whether the circuit breaker is in the state.",
+            labels=("datasource", "state"),
+        )
+        for name, breaker in breakers.items():
+            current = breaker.state
+            for x in BreakerState:
+                state.add_metric((name, x.value), float(x == current))
+        yield state
+        yield from _counters(
+            "ferrea_breaker",
+            "Circuit breakers",
+            [((x,), y.stats) for x, y in breakers.items()],
+            ("datasource",),
+        )
+
+    def _transports(self) -> Iterator[Metric]:
+        """Read the retries, the rate limit and the connection pool of each datasource."""
+        retries: list[tuple[tuple[str, ...], object]] = list()
+        rate_limits: list[tuple[tuple[str, ...], object]] = list()
+        connections = GaugeMetricFamily(
+            "ferrea_pool_connections",
+            "Connections of the pool towards the upstream.",
+            labels=("datasource", "state"),
+        )
+        for name, client in self.registry.clients.items():
+            for layer in transport_layers(client):
+                if isinstance(layer, RetryTransport):
+                    retries.append(((name,), layer.stats))
+                elif isinstance(layer, RateLimitTransport):
+                    rate_limits.append(((name,), layer.bucket.stats))
+                elif isinstance(layer, httpx.AsyncHTTPTransport):
+                    pool = layer._pool.connections
+                    idle = sum(x.is_idle() for x in pool)
+                    connections.add_metric((name, "idle"), idle)
+                    connections.add_metric((name, "active"), len(pool) - idle)
+
+        yield connections
+        yield from _counters("ferrea_retry", "Retries", retries, ("datasource",))
+        yield from _counters(
+            "ferrea_rate_limit", "Rate limits", rate_limits, ("datasource",)
+        )
+
+    def _store(self) -> Iterator[Metric]:
+        """Read the counters of the persistent store, if enabled."""
+        store = self.registry.store
+        if store is None:
+            return
+        pending = GaugeMetricFamily(
+            "ferrea_store_pending_writes", "Writes queued for the persistent store."
+        )
+        pending.add_metric((), len(store))
+        yield pending
+        yield from _counters(
+            "ferrea_store", "Persistent store", [((), store.stats)], ()
+        )
+
+    def _local_index(self) -> Iterator[Metric]:
+        """Read the size and counters of the local index, if enabled."""
+        index = self.registry.local_index
+        if index is None:
+            return
+        entries = GaugeMetricFamily(
+            "ferrea_local_index_isbns", "Isbns in the local index."
+        )
+        entries.add_metric((), len(index))
+        yield entries
+        yield from _counters(
+            "ferrea_local_index", "Local index", [((), index.stats)], ()
+        )
@@ -1,37 +1,17 @@
-from models.api_service import ApiService
 from models.probes import Entity, HealthProbe, HealthStatus
+from operations.health import HealthMonitor
 
 
-def check_health(datasources: list[ApiService]) -> HealthProbe:
-    """From all the registered datasources, try to fetch the data.
+def check_health(monitor: HealthMonitor) -> HealthProbe:
+    """Get the health of the datasources, as polled in the background.
 
     Args:
-        datasources (list[ApiService]): the list of all datasources configured.
+        monitor (HealthMonitor): the health monitor of the app.
 
     Returns:
         HealthProbe: the health probe instance.
     """
-    entities: list[Entity] = list()
-
-    for datasource in datasources:
-        entities.append(
-            Entity(
-                name=datasource.name,
-                status=(
-                    HealthStatus.HEALTHY
-                    if datasource.healthy
-                    else HealthStatus.UNHEALTHY
-                ),
-                internal_status=datasource.healthy,
-            )
-        )
-
-    if all([x.internal_status for x in entities]):
-        status = HealthStatus.HEALTHY
-    else:
-        status = HealthStatus.HEALTHY
-
-    return HealthProbe(status=status, entities=entities)
+    return monitor.snapshot
 
 
 def check_readiness() -> HealthProbe:
@@ -0,0 +1,83 @@
+import os
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+
+
+def _folded(frame: FrameType | None) -> str:
+    """Fold a stack into a single line, from the outermost frame to the innermost.
+
+    Args:
+        frame (FrameType | None): the innermost frame.
+
+    Returns:
+        str: the frames separated by `;`, each one as `file:function`.
+    """
+    frames: list[str] = list()
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{os.path.basename(code.co_filename)}:{code.co_qualname}")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class SamplingProfiler:
+    """
+    Sampling profiler of a single thread, eg the one running the event loop.
+
+    A background thread records the stack of the profiled thread every `interval` seconds,
+    so that the profiled code runs untouched: the overhead does not depend on how many
+    calls it makes. Every task on the event loop is sampled, not only the ones of the request
+    that started the profiler.
+    """
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        """Prepare the profiler.
+
+        Args:
+            thread_id (int): the identifier of the thread to profile.
+            interval (float): the time between two samples, in seconds.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._run, name="ferrea-profiler", daemon=True
+        )
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._sampler.start()
+
+    def stop(self) -> Counter[str]:
+        """Stop sampling.
+
+        Returns:
+            Counter[str]: how many times each folded stack was sampled.
+        """
+        self._stopped.set()
+        self._sampler.join()
+        return self.samples
+
+    def _run(self) -> None:
+        """Sample the profiled thread until stopped."""
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[_folded(frame)] += 1
+
+
+def write_folded(samples: Counter[str], path: Path) -> None:
+    """Write the samples in the folded stacks format read by the flame graph tools.
+
+    Args:
+        samples (Counter[str]): how many times each folded stack was sampled.
+        path (Path): the file to write.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
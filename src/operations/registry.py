@@ -0,0 +1,226 @@
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+
+import httpx
+from ferrea.core.context import Context
+from ferrea.observability.logs import ferrea_logger
+
+from adapters._http import build_client
+from adapters.breaker import BreakerRepository, CircuitBreaker
+from adapters.cache import CachedRepository, FlagCache, ResultCache
+from adapters.coalescing import CoalescedRepository, SingleFlight
+from adapters.googlebooks import GoogleBooksRepository
+from adapters.hedging import HedgeBudget
+from adapters.local_index import LocalIndex, LocalIndexRepository
+from adapters.openlibrary import OpenLibraryRepository
+from adapters.store import CountedRepository, ResultStore, StoredRepository
+from configs import settings
+from configs.config import Google, Openlibrary
+from models.api_service import ApiService
+from operations.health import HealthMonitor, MonitoredRepository
+
+RepositoryFactory = Callable[[httpx.AsyncClient, SingleFlight], ApiService]
+
+
+def _factories() -> dict[str, tuple[Google | Openlibrary, RepositoryFactory]]:
+    """Get how to build the repository of each known datasource, by name.
+    The state a repository needs besides its client, like the cache of the OpenLibrary
+    portraits, is built once here.
+
+    Returns:
+        dict[str, tuple[Google | Openlibrary, RepositoryFactory]]: the settings and factory of each datasource.
+    """
+    portraits = (
+        FlagCache.from_settings(settings.openlibrary.portraits)
+        if settings.openlibrary.portraits.enabled
+        else None
+    )
+    return {
+        settings.google.name: (
+            settings.google,
+            lambda client, _: GoogleBooksRepository(settings.google.name, client),
+        ),
+        settings.openlibrary.name: (
+            settings.openlibrary,
+            lambda client, flight: OpenLibraryRepository(
+                settings.openlibrary.name, client, flight, portraits
+            ),
+        ),
+    }
+
+
+def _enabled(
+    factories: dict[str, tuple[Google | Openlibrary, RepositoryFactory]],
+) -> list[str]:
+    """Get the datasources to query, in order.
+
+    The datasources listed in `datasources.order` come first, in that order, the others after.
+    The disabled ones are left out.
+
+    Args:
+        factories (dict[str, tuple[Google | Openlibrary, RepositoryFactory]]): the known datasources.
+
+    Raises:
+        ValueError: if the order lists an unknown datasource.
+
+    Returns:
+        list[str]: the names of the enabled datasources.
+    """
+    order = list(settings.datasources.order)
+    unknown = set(order) - set(factories)
+    if unknown:
+        raise ValueError(f"Unknown datasources in datasources.order: {sorted(unknown)}")
+
+    ordered = order + [x for x in factories if x not in order]
+    return [x for x in ordered if factories[x][0].enabled]
+
+
+@dataclass
+class DatasourceRegistry:
+    """
+    The datasources of the app, built once at startup.
+
+    The repositories are stateless: they only hold their pooled client, the request context is
+    passed on each call. Each one is decorated once with its passive health recording, circuit
+    breaker, lookups coalescing, persistent store and result cache, all shared by every request.
+    The local index of the OpenLibrary dumps, if enabled, comes first and undecorated: it never
+    calls the network, and the live datasources are only called on its misses.
+    """
+
+    datasources: list[ApiService]
+    repositories: list[ApiService]
+    clients: dict[str, httpx.AsyncClient]
+    caches: dict[str, ResultCache]
+    breakers: dict[str, CircuitBreaker]
+    single_flight: SingleFlight
+    hedge_budget: HedgeBudget
+    health: HealthMonitor
+    store: ResultStore | None = None
+    local_index: LocalIndex | None = None
+
+    @classmethod
+    @asynccontextmanager
+    async def open(
+        cls, pools: dict[str, httpx.AsyncBaseTransport] | None = None
+    ) -> AsyncIterator["DatasourceRegistry"]:
+        """Build the registry from the settings, polling the health of the datasources
+        in the background until it is closed.
+
+        If the persistent store is enabled, the result caches are warmed up with its most
+        read results. If the local index is enabled, its file is mapped until the registry is closed.
+
+        Args:
+            pools (dict[str, httpx.AsyncBaseTransport] | None, optional): the transport of each
+                datasource in place of its connection pool, eg stub upstreams. Defaults to None.
+
+        Yields:
+            DatasourceRegistry: the registry.
+        """
+        factories = _factories()
+        names = _enabled(factories)
+        pools = pools or dict()
+        single_flight = SingleFlight()
+        hedge_budget = HedgeBudget.from_settings(settings.hedging)
+
+        async with AsyncExitStack() as stack:
+            clients = {
+                x: await stack.enter_async_context(
+                    build_client(factories[x][0], hedge_budget, pools.get(x))
+                )
+                for x in names
+            }
+            repositories = [factories[x][1](clients[x], single_flight) for x in names]
+            caches = {
+                x: ResultCache.from_settings(factories[x][0].cache)
+                for x in names
+                if factories[x][0].cache.enabled
+            }
+            breakers = {
+                x: CircuitBreaker.from_settings(x, factories[x][0].breaker)
+                for x in names
+                if factories[x][0].breaker.enabled
+            }
+            health = HealthMonitor.from_settings(
+                settings.health,
+                repositories,
+                breakers,
+                Context("health-poller", settings.ferrea_app.name),
+            )
+            registry = cls(
+                datasources=list(),
+                repositories=repositories,
+                clients=clients,
+                caches=caches,
+                breakers=breakers,
+                single_flight=single_flight,
+                hedge_budget=hedge_budget,
+                health=health,
+            )
+            if settings.result_store.enabled:
+                registry.store = await stack.enter_async_context(
+                    ResultStore.open(settings.result_store)
+                )
+                await registry.warm_up(settings.result_store.warm_up)
+            registry.datasources = [registry._decorate(x) for x in repositories]
+            if settings.local_index.enabled:
+                registry.local_index = stack.enter_context(
+                    LocalIndex.open(settings.local_index.path)
+                )
+                ferrea_logger.info(
+                    f"Mapped the local index {settings.local_index.path} with {len(registry.local_index)} isbns"
+                )
+                registry.datasources.insert(
+                    0,
+                    LocalIndexRepository(
+                        settings.local_index.name, registry.local_index
+                    ),
+                )
+
+            poller = asyncio.create_task(health.run())
+            try:
+                yield registry
+            finally:
+                poller.cancel()
+                await asyncio.gather(poller, return_exceptions=True)
+
+    async def warm_up(self, limit: int) -> None:
+        """Load the most read results of the persistent store into the result caches.
+
+        Args:
+            limit (int): the maximum number of results loaded for each datasource.
+        """
+        if self.store is None:
+            return
+        for name, cache in self.caches.items():
+            rows = await self.store.hottest(name, limit)
+            for isbn, book, ttl in rows:
+                cache.store(isbn, book, ttl)
+            ferrea_logger.info(
+                f"Warmed up the cache of {name} with {len(rows)} results"
+            )
+
+    def _decorate(self, repository: ApiService) -> ApiService:
+        """Put the health monitor, circuit breaker, lookups coalescing, persistent store,
+        result cache and read counting of the datasource, if enabled, in front of the repository.
+
+        Args:
+            repository (ApiService): the repository.
+
+        Returns:
+            ApiService: the decorated repository.
+        """
+        repository = MonitoredRepository(repository, self.health)
+        breaker = self.breakers.get(repository.name)
+        if breaker is not None:
+            repository = BreakerRepository(repository, breaker)
+        repository = CoalescedRepository(repository, self.single_flight)
+        if self.store is not None:
+            repository = StoredRepository(repository, self.store)
+        cache = self.caches.get(repository.name)
+        if cache is not None:
+            repository = CachedRepository(repository, cache)
+        if self.store is not None:
+            repository = CountedRepository(repository, self.store)
+        return repository
@@ -2,13 +2,15 @@ from fastapi import Request
 from ferrea.core.context import Context
 from ferrea.core.header import FERRA_CORRELATION_HEADER, get_correlation_id
 
-from adapters.googlebooks import GoogleBooksRepository
-from adapters.openlibrary import OpenLibraryRepository
+from adapters.timing import current_timings
 from configs import settings
+from models.api_service import ApiService
+
+from ._http_cache import EtagStore
 
 
 async def _build_context(request: Request) -> Context:
-    """Build a context from the request.
+    """Build a context from the request, and time its stages against it.
 
     Args:
         request (Request): the HTTP Request.
@@ -18,30 +20,32 @@ async def _build_context(request: Request) -> Context:
     """
     ferrea_correlation_id = request.headers.get(FERRA_CORRELATION_HEADER)
     correlation_id = await get_correlation_id(ferrea_correlation_id)
-    return Context(str(correlation_id), settings.ferrea_app.name)
+    context = Context(str(correlation_id), settings.ferrea_app.name)
+    timings = current_timings()
+    if timings is not None:
+        timings.context = context
+    return context
 
 
-async def _openlibrary_factory(request: Request) -> OpenLibraryRepository:
-    """Factory for the OpenLibraryRepository.
+async def _datasources(request: Request) -> list[ApiService]:
+    """Get the datasources of the app, in the configured order.
 
     Args:
         request (Request): the HTTP Request.
 
     Returns:
-        OpenLibraryRepository: the repository.
+        list[ApiService]: the datasources, as built at startup.
     """
-    context = await _build_context(request)
-    return OpenLibraryRepository(context, settings.openlibrary.name)
+    return request.app.state.registry.datasources
 
 
-async def _google_factory(request: Request) -> GoogleBooksRepository:
-    """Factory for the GoogleBooksRepository.
+async def _etags(request: Request) -> EtagStore | None:
+    """Get the entity tags of the searches.
 
     Args:
         request (Request): the HTTP Request.
 
     Returns:
-        GoogleBooksRepository: the repository.
+        EtagStore | None: the store, None if the HTTP caching is disabled.
     """
-    context = await _build_context(request)
-    return GoogleBooksRepository(context, settings.google.name)
+    return request.app.state.etags
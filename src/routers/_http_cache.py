@@ -0,0 +1,157 @@
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from configs.config import HttpCache
+
+
+def etag(body: bytes) -> str:
+    """Compute the strong entity tag of a response body.
+
+    The body is the canonical serialisation of the result, so the same result always
+    gets the same tag, whichever instance of the app served it.
+
+    Args:
+        body (bytes): the response body.
+
+    Returns:
+        str: the quoted entity tag.
+    """
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def matches(if_none_match: str, tag: str) -> bool:
+    """Check an `If-None-Match` header against the current entity tag.
+
+    The comparison is the weak one, as required for `If-None-Match`.
+
+    Args:
+        if_none_match (str): the header value, a list of entity tags or `*`.
+        tag (str): the current entity tag.
+
+    Returns:
+        bool: whether the client already has the current representation.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    opaque = tag.removeprefix("W/")
+    return any(x.strip().removeprefix("W/") == opaque for x in if_none_match.split(","))
+
+
+@dataclass(slots=True)
+class Tag:
+    """The entity tag last sent for a search, and until when it is trusted."""
+
+    etag: str
+    found: bool
+    expires_at: float
+
+
+@dataclass
+class EtagStore:
+    """
+    Bounded LRU of the entity tags last sent for each isbn.
+
+    A tag is trusted as long as the response it was sent with is fresh: until then a
+    conditional request is answered with `304 Not Modified` straight from the store,
+    without searching the datasources nor serialising the result again.
+    Found and not found results have their own `max-age`.
+    """
+
+    max_entries: int
+    max_age: int
+    stale_while_revalidate: int
+    negative_max_age: int
+    clock: Callable[[], float] = time.monotonic
+    _tags: OrderedDict[str, Tag] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+
+    @classmethod
+    def from_settings(cls, http_cache_settings: HttpCache) -> "EtagStore":
+        """Build the store from the settings.
+
+        Args:
+            http_cache_settings (HttpCache): the HTTP caching settings.
+
+        Returns:
+            EtagStore: the store.
+        """
+        return cls(
+            max_entries=http_cache_settings.max_entries,
+            max_age=http_cache_settings.max_age,
+            stale_while_revalidate=http_cache_settings.stale_while_revalidate,
+            negative_max_age=http_cache_settings.negative_max_age,
+        )
+
+    def __len__(self) -> int:
+        """Get the number of tags, including the expired ones not evicted yet."""
+        return len(self._tags)
+
+    def lookup(self, isbn: str) -> Tag | None:
+        """Get the tag last sent for an isbn, if still trusted.
+
+        Args:
+            isbn (str): the canonical isbn.
+
+        Returns:
+            Tag | None: the tag, None if unknown or expired.
+        """
+        tag = self._tags.get(isbn)
+        if tag is None:
+            return None
+
+        if tag.expires_at <= self.clock():
+            del self._tags[isbn]
+            return None
+
+        self._tags.move_to_end(isbn)
+        return tag
+
+    def store(self, isbn: str, body: bytes, found: bool) -> Tag:
+        """Tag the response of a search, evicting the least recently used tags if needed.
+
+        Args:
+            isbn (str): the canonical isbn.
+            body (bytes): the response body.
+            found (bool): whether any book was found.
+
+        Returns:
+            Tag: the tag of the response.
+        """
+        max_age = self.max_age if found else self.negative_max_age
+        tag = Tag(etag(body), found, self.clock() + max_age)
+        if max_age <= 0:
+            return tag
+
+        self._tags.pop(isbn, None)
+        self._tags[isbn] = tag
+        while len(self._tags) > self.max_entries:
+            self._tags.popitem(last=False)
+        return tag
+
+    def headers(self, tag: Tag) -> dict[str, str]:
+        """Get the caching headers of a response.
+
+        The `max-age` is the time the tag is still trusted for: a `304 Not Modified`
+        answered from the store only extends the freshness of the cached response that long.
+
+        Args:
+            tag (Tag): the tag of the response.
+
+        Returns:
+            dict[str, str]: the `ETag` and `Cache-Control` headers.
+        """
+        max_age = max(0, math.ceil(tag.expires_at - self.clock()))
+        if tag.found:
+            cache_control = (
+                f"public, max-age={max_age}, "
+                f"stale-while-revalidate={self.stale_while_revalidate}"
+            )
+        else:
+            cache_control = f"public, max-age={max_age}"
+
+        return {"ETag": tag.etag, "Cache-Control": cache_control}
@@ -0,0 +1,102 @@
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from adapters.metrics import LATENCY_BUCKETS
+
+UNMATCHED_ROUTE = "unmatched"
+
+REQUESTS = Counter(
+    "ferrea_http_requests",
+    "Requests served, by route.",
+    ("method", "route", "status"),
+)
+REQUEST_LATENCY = Histogram(
+    "ferrea_http_request_duration_seconds",
+    "Duration of the requests, by route, until the response is sent.",
+    ("method", "route"),
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge("ferrea_http_requests_in_flight", "Requests being served.")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting and timing the requests, by route template.
+
+    The route is the path template, eg `/api/v1/books/{isbn}`, to keep the label set bounded;
+    the requests not matching any route share a single label.
+    The labelled series are bound once per label set, not on every request.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Wrap the app.
+
+        Args:
+            app (ASGIApp): the app.
+        """
+        self.app = app
+        self._requests: dict[tuple[str, str, int], Counter] = dict()
+        self._latencies: dict[tuple[str, str], Histogram] = dict()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Serve the request, counting and timing it.
+
+        Args:
+            scope (Scope): the connection scope.
+            receive (Receive): the channel of the incoming messages.
+            send (Send): the channel of the outgoing messages.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            key = (scope["method"], getattr(route, "path", UNMATCHED_ROUTE))
+            self._latency(key).observe(time.perf_counter() - start)
+            self._counter((*key, status_code)).inc()
+
+    def _latency(self, key: tuple[str, str]) -> Histogram:
+        """Get the latency series of a route, binding it on first use.
+
+        Args:
+            key (tuple[str, str]): the method and route.
+
+        Returns:
+            Histogram: the series.
+        """
+        series = self._latencies.get(key)
+        if series is None:
+            series = REQUEST_LATENCY.labels(*key)
+            self._latencies[key] = series
+        return series
+
+    def _counter(self, key: tuple[str, str, int]) -> Counter:
+        """Get the requests series of a route and status, binding it on first use.
+
+        Args:
+            key (tuple[str, str, int]): the method, route and status code.
+
+        Returns:
+            Counter: the series.
+        """
+        series = self._requests.get(key)
+        if series is None:
+            series = REQUESTS.labels(*key)
+            self._requests[key] = series
+        return series
@@ -0,0 +1,110 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from uuid import uuid4
+
+from ferrea.core.header import FERRA_CORRELATION_HEADER
+from ferrea.observability.logs import ferrea_logger
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from configs.config import Profiling
+from operations.profiling import SamplingProfiler, write_folded
+
+PROFILE_HEADER = "X-Ferrea-Profile"
+# the characters kept from the correlation id in the profile file name
+UNSAFE_CHARACTERS = re.compile(r"[^A-Za-z0-9_-]")
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware capturing a stack profile of a fraction of the requests.
+
+    A request is profiled with probability `sample_rate`, or on demand through the
+    `X-Ferrea-Profile` header if allowed. The profile is written in the folded stacks format,
+    named after the correlation id of the request, ready for a flame graph.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        profiling_settings: Profiling,
+        draw: Callable[[], float] = random.random,
+    ) -> None:
+        """Wrap the app.
+
+        Args:
+            app (ASGIApp): the app.
+            profiling_settings (Profiling): the profiling settings.
+            draw (Callable[[], float], optional): how to draw the sampling. Defaults to random.random.
+        """
+        self.app = app
+        self.sample_rate = profiling_settings.sample_rate
+        self.interval = profiling_settings.interval
+        self.allow_header = profiling_settings.allow_header
+        self.output_dir = Path(profiling_settings.output_dir)
+        self.draw = draw
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Serve the request, profiling it if sampled.
+
+        Args:
+            scope (Scope): the connection scope.
+            receive (Receive): the channel of the incoming messages.
+            send (Send): the channel of the outgoing messages.
+        """
+        if scope["type"] != "http" or not self._sampled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        correlation_id = uuid4().hex
+
+        async def send_correlation(message: Message) -> None:
+            nonlocal correlation_id
+            if message["type"] == "http.response.start":
+                correlation_id = Headers(raw=message["headers"]).get(
+                    FERRA_CORRELATION_HEADER, correlation_id
+                )
+            await send(message)
+
+        profiler = SamplingProfiler(threading.get_ident(), self.interval)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_correlation)
+        finally:
+            samples = await asyncio.to_thread(profiler.stop)
+            path = self.output_dir / _file_name(correlation_id)
+            await asyncio.to_thread(write_folded, samples, path)
+            ferrea_logger.info(
+                f"Profile of {scope['method']} {scope['path']} ({correlation_id}) written to {path}"
+            )
+
+    def _sampled(self, scope: Scope) -> bool:
+        """Decide whether to profile a request.
+
+        Args:
+            scope (Scope): the connection scope.
+
+        Returns:
+            bool: whether to profile it.
+        """
+        if self.allow_header and PROFILE_HEADER in Headers(scope=scope):
+            return True
+        return self.draw() < self.sample_rate
+
+
+def _file_name(correlation_id: str) -> str:
+    """Name the profile of a request after its correlation id, reduced to safe characters.
+
+    Args:
+        correlation_id (str): the correlation id, as sent back to the client.
+
+    Returns:
+        str: the file name.
+    """
+    safe = UNSAFE_CHARACTERS.sub("_", correlation_id)[:64] or uuid4().hex
+    return f"{int(time.time())}-{safe}.folded"
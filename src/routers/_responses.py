@@ -0,0 +1,39 @@
+from ferrea.models.datasource import BookDatasource
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import Response
+
+BOOKS_ADAPTER = TypeAdapter(list[BookDatasource])
+
+
+class JSONBytesResponse(Response):
+    """JSON response whose body is already serialised: the bytes are sent as they are."""
+
+    media_type = "application/json"
+
+
+def model_bytes(model: BaseModel, **kwargs: bool) -> bytes:
+    """Serialise a model straight to JSON bytes, without an intermediate str.
+
+    Args:
+        model (BaseModel): the model.
+        **kwargs (bool): the serialisation options, eg `exclude_none`.
+
+    Returns:
+        bytes: the JSON document, UTF-8 encoded.
+    """
+    return model.__pydantic_serializer__.to_json(model, **kwargs)
+
+
+def books_envelope(books: list[BookDatasource]) -> bytes:
+    """Serialise the books into the `{items, result}` envelope of the search.
+
+    The books are serialised in a single pass by pydantic, and the envelope is written
+    around them: nothing is parsed back.
+
+    Args:
+        books (list[BookDatasource]): the books found.
+
+    Returns:
+        bytes: the JSON document, UTF-8 encoded.
+    """
+    return b'{"items":%d,"result":%b}' % (len(books), BOOKS_ADAPTER.dump_json(books))
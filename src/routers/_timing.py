@@ -0,0 +1,51 @@
+from ferrea.observability.logs import ferrea_logger
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from adapters.timing import start_timings
+
+SERVER_TIMING_HEADER = "Server-Timing"
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware timing the stages of each request, eg every upstream call, the mapping
+    and the serialisation, and sending them back in a `Server-Timing` header.
+
+    The timings are logged under the correlation id of the request, once it is known.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Wrap the app.
+
+        Args:
+            app (ASGIApp): the app.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Serve the request, timing its stages.
+
+        Args:
+            scope (Scope): the connection scope.
+            receive (Receive): the channel of the incoming messages.
+            send (Send): the channel of the outgoing messages.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = start_timings()
+
+        async def send_timings(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                value = timings.server_timing()
+                MutableHeaders(scope=message).append(SERVER_TIMING_HEADER, value)
+                if timings.context is not None:
+                    ferrea_logger.info(
+                        f"{scope['method']} {scope['path']} timings: {value}",
+                        **timings.context.log,
+                    )
+            await send(message)
+
+        await self.app(scope, receive, send_timings)
@@ -1,16 +1,22 @@
-import json
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Path
+from fastapi import APIRouter, Depends, Header, Path
 from ferrea.core.context import Context
 from ferrea.core.header import FERRA_CORRELATION_HEADER
 from starlette import status
-from starlette.responses import JSONResponse
+from starlette.responses import Response, StreamingResponse
 
+from adapters.timing import timed
+from configs import settings
 from models.api_service import ApiService
+from models.batch import BatchRequest
+from models.isbn import CanonicalIsbn
+from operations.batch import resolve_batch
 from operations.data_search import fetch_data
 
-from ._builders import _build_context, _google_factory, _openlibrary_factory
+from ._builders import _build_context, _datasources, _etags
+from ._http_cache import EtagStore, matches
+from ._responses import JSONBytesResponse, books_envelope, model_bytes
 
 router = APIRouter(prefix="/api/v1")
 
@@ -18,49 +24,108 @@ router = APIRouter(prefix="/api/v1")
 @router.get("/books/{isbn}", response_model=None)
 async def search_book_datasource(
     isbn: Annotated[
-        str,
+        CanonicalIsbn,
         Path(
             min_length=10,
             max_length=17,
-            pattern=r"^(\d|\-){10,17}$",
+            pattern=r"^[0-9\-]{9,16}[0-9Xx]$",
         ),
     ],
     context: Annotated[Context, Depends(_build_context)],
-    google_books_repository: Annotated[ApiService, Depends(_google_factory)],
-    openlibrary_repository: Annotated[ApiService, Depends(_openlibrary_factory)],
-) -> JSONResponse:
+    datasources: Annotated[list[ApiService], Depends(_datasources)],
+    etags: Annotated[EtagStore | None, Depends(_etags)],
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
     """
     This function performs the search of the book's data on external datasources.
 
+    The isbn is validated and converted to its ISBN-13 form before any call to the datasources.
+    The response carries an `ETag` computed from its body: a request whose `If-None-Match`
+    holds the tag last sent for the isbn, while still fresh, is answered with
+    `304 Not Modified` without searching again. A book not found is always searched and
+    answered with a 404: there is no representation to be up to date with.
+
     Args:
-        isbn (str): the isbn of the desired book.
+        isbn (str): the isbn of the desired book, as ISBN-10 or ISBN-13.
+        if_none_match (str | None): the entity tags the client already has, if any.
 
     Returns:
-        JSONResponse: the serialization of the object if found or a message for resource not found.
+        Response: the serialization of the object if found, a message for resource not found,
+            or no body if the client is up to date.
     """
     headers = {
         FERRA_CORRELATION_HEADER: context.uuid,
-        "content-type": "application/json",
     }
 
-    book_data = fetch_data(
-        isbn,
-        [google_books_repository, openlibrary_repository],
-        context,
-    )
+    if etags is not None and if_none_match is not None:
+        tag = etags.lookup(isbn)
+        if tag is not None and tag.found and matches(if_none_match, tag.etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers=headers | etags.headers(tag),
+            )
 
-    if book_data is None:
+    with timed("search"):
+        books_data = await fetch_data(
+            isbn,
+            datasources,
+            context,
+        )
+
+    if not books_data:
         status_code = status.HTTP_404_NOT_FOUND
-        results = []
     else:
         status_code = status.HTTP_200_OK
-        results = [json.loads(book_data.model_dump_json())]
 
-    return JSONResponse(
+    with timed("serialize"):
+        body = books_envelope(books_data)
+    if etags is not None:
+        tag = etags.store(isbn, body, bool(books_data))
+        headers |= etags.headers(tag)
+        if tag.found and if_none_match is not None and matches(if_none_match, tag.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return JSONBytesResponse(
+        body,
         status_code=status_code,
-        content={
-            "items": len(results),
-            "result": results,
-        },
+        headers=headers,
+    )
+
+
+@router.post("/books:batch", response_model=None)
+async def search_books_batch(
+    batch: BatchRequest,
+    context: Annotated[Context, Depends(_build_context)],
+    datasources: Annotated[list[ApiService], Depends(_datasources)],
+) -> StreamingResponse:
+    """
+    This function performs the search of many books' data on external datasources.
+
+    The isbns are deduplicated after their conversion to ISBN-13, then resolved with bounded
+    concurrency. Each result is streamed back as a NDJSON line as soon as it is available.
+
+    Args:
+        batch (BatchRequest): the isbns of the desired books.
+
+    Returns:
+        StreamingResponse: a line for each distinct isbn, with the data found or an error for invalid isbns.
+    """
+    headers = {
+        FERRA_CORRELATION_HEADER: context.uuid,
+    }
+
+    items = resolve_batch(
+        batch.isbns,
+        datasources,
+        context,
+        settings.batch.concurrency,
+        settings.batch.window_size,
+    )
+    lines = (model_bytes(x) + b"\n" async for x in items)
+
+    return StreamingResponse(
+        lines,
+        status_code=status.HTTP_200_OK,
+        media_type="application/x-ndjson",
         headers=headers,
     )
@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from starlette import status
+from starlette.responses import Response
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_model=None)
+async def metrics() -> Response:
+    """
+    This function exposes the metrics of the webserver, in the Prometheus text format.
+
+    Returns:
+        Response: the metrics.
+    """
+    return Response(
+        generate_latest(REGISTRY),
+        status_code=status.HTTP_200_OK,
+        media_type=CONTENT_TYPE_LATEST,
+    )
@@ -0,0 +1,214 @@
+import gc
+import os
+import signal
+import socket
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from types import FrameType
+
+import uvicorn
+from fastapi import FastAPI
+from ferrea.observability.logs import ferrea_logger
+
+from configs.config import Server
+
+# exit code of a worker which could not start, eg its lifespan failed: it is not respawned
+WORKER_BOOT_ERROR = 3
+# how often the supervisor checks its workers, in seconds
+POLL_INTERVAL = 0.2
+
+
+def server_config(app: FastAPI, server_settings: Server) -> uvicorn.Config:
+    """Get the uvicorn configuration of the app from the settings.
+
+    The `auto` event loop and HTTP parser pick uvloop and httptools when they are installed.
+
+    Args:
+        app (FastAPI): the app.
+        server_settings (Server): the settings of the webserver.
+
+    Returns:
+        uvicorn.Config: the configuration.
+    """
+    return uvicorn.Config(
+        app,
+        host=server_settings.host,
+        port=server_settings.port,
+        loop=server_settings.loop,
+        http=server_settings.http,
+        backlog=server_settings.backlog,
+        timeout_keep_alive=server_settings.keep_alive,
+        timeout_graceful_shutdown=server_settings.graceful_timeout,
+        access_log=False,
+        log_level=None,
+        log_config=None,
+    )
+
+
+@dataclass
+class Supervisor:
+    """
+    Pre-fork supervisor of the worker processes.
+
+    The app is built and checked once, in the supervisor, before the workers are forked:
+    they start with the modules, settings and compiled mappings already loaded, shared
+    copy-on-write, and frozen out of the garbage collector so that its passes do not copy
+    them. The listening socket is bound once and shared, the kernel spreads the connections.
+    Each worker then runs its own lifespan: clients, caches and event loop are per process.
+
+    A worker dying is respawned, unless it could not start at all. On SIGTERM or SIGINT, each
+    worker is asked to drain: it stops accepting, finishes its requests in flight within
+    the graceful timeout, then shuts its lifespan down. The workers still alive past it are killed.
+    """
+
+    config: uvicorn.Config
+    workers: int
+    graceful_timeout: float
+    _socket: socket.socket | None = field(default=None, init=False, repr=False)
+    _children: set[int] = field(default_factory=set, init=False, repr=False)
+    _stopping: bool = field(default=False, init=False, repr=False)
+
+    def run(self) -> int:
+        """Fork the workers and supervise them until asked to stop.
+
+        Returns:
+            int: the exit code of the supervisor.
+        """
+        self.config.load()
+        self._socket = self.config.bind_socket()
+        gc.collect()
+        gc.freeze()
+
+        for x in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(x, self._stop)
+        try:
+            for _ in range(self.workers):
+                self._spawn()
+            ferrea_logger.info(
+                f"Started {self.workers} workers on {self.config.host}:{self.config.port}"
+            )
+            code = self._supervise()
+        finally:
+            self._drain()
+            self._socket.close()
+        return code
+
+    def _stop(self, signum: int, frame: FrameType | None) -> None:
+        """Ask the supervisor to stop, from a signal handler."""
+        self._stopping = True
+
+    def _spawn(self) -> None:
+        """Fork a worker serving the app on the shared socket."""
+        pid = os.fork()
+        if pid > 0:
+            self._children.add(pid)
+            return
+
+        # in the worker: uvicorn installs its own handlers for the shutdown signals
+        for x in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(x, signal.SIG_DFL)
+        code = 0
+        try:
+            server = uvicorn.Server(self.config)
+            server.run(sockets=[self._socket])  # type: ignore[list-item]
+            if not server.started:
+                code = WORKER_BOOT_ERROR
+        except SystemExit as e:
+            # uvicorn exits on its own when the app cannot start
+            code = e.code if isinstance(e.code, int) else 1
+        except BaseException as e:
+            ferrea_logger.error(f"Worker {os.getpid()} failed with {e!r}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _supervise(self) -> int:
+        """Respawn the workers dying, until asked to stop or a worker cannot start.
+
+        Returns:
+            int: the exit code of the supervisor.
+        """
+        while not self._stopping:
+            for pid, code in self._reap():
+                if code == WORKER_BOOT_ERROR:
+                    ferrea_logger.error(
+                        f"Worker {pid} could not start: stopping the server"
+                    )
+                    return WORKER_BOOT_ERROR
+                ferrea_logger.warning(
+                    f"Worker {pid} exited with {code}: starting a new one"
+                )
+                self._spawn()
+            time.sleep(POLL_INTERVAL)
+        return 0
+
+    def _reap(self) -> list[tuple[int, int]]:
+        """Collect the workers which exited, without waiting.
+
+        Returns:
+            list[tuple[int, int]]: the pid and exit code of each.
+        """
+        exited: list[tuple[int, int]] = list()
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._children.clear()
+                break
+            if pid == 0:
+                break
+            self._children.discard(pid)
+            exited.append((pid, os.waitstatus_to_exitcode(status)))
+        return exited
+
+    def _drain(self) -> None:
+        """Ask every worker to drain, and kill the ones still alive past the graceful timeout."""
+        for pid in self._children:
+            _signal(pid, signal.SIGTERM)
+
+        # a little more than the workers' own timeout, for their lifespan to shut down
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self._children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(POLL_INTERVAL)
+
+        for pid in list(self._children):
+            ferrea_logger.warning(f"Worker {pid} did not drain in time: killing it")
+            _signal(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self._children.discard(pid)
+
+
+def _signal(pid: int, signum: int) -> None:
+    """Send a signal to a worker, which may have exited already."""
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def serve(factory: Callable[[], FastAPI], server_settings: Server) -> int:
+    """Serve the app as configured: in this process, or in pre-forked workers.
+
+    Args:
+        factory (Callable[[], FastAPI]): how to build the app.
+        server_settings (Server): the settings of the webserver.
+
+    Raises:
+        RuntimeError: if many workers are required on a platform without fork.
+
+    Returns:
+        int: the exit code of the server.
+    """
+    config = server_config(factory(), server_settings)
+    if server_settings.workers == 1:
+        server = uvicorn.Server(config)
+        server.run()
+        return 0 if server.started else WORKER_BOOT_ERROR
+
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Many workers require a platform with fork")
+    return Supervisor(
+        config, server_settings.workers, server_settings.graceful_timeout
+    ).run()
@@ -0,0 +1,219 @@
+"""
+Build the local index of the OpenLibrary dumps, served by the LocalIndex datasource.
+
+The editions and authors dumps are published at https://openlibrary.org/developers/dumps,
+as gzipped text files with a line per record: type, key, revision, last modified and JSON.
+Only the fields read by the mapping are kept: the editions are denormalized with the name
+and portrait of their authors, so that a lookup is a single read.
+
+Usage, from the folder of the app:
+
+    python -m tools.openlibrary_dump \\
+        --editions ol_dump_editions_latest.txt.gz \\
+        --authors ol_dump_authors_latest.txt.gz \\
+        --output /var/lib/ferrea/openlibrary.index
+
+`--isbns` restricts the index to the isbns of a file, one per line, eg the catalogue.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, Any
+
+from adapters.local_index import PORTRAIT_IDS, IndexWriter
+from adapters.openlibrary import AUTHOR_DATA, BOOK_DATA
+from models.isbn import canonical_isbn
+
+# the fields of an edition read by the mapping, and its authors
+EDITION_FIELDS = (
+    "title",
+    "publishers",
+    "publish_date",
+    "covers",
+    "first_sentence",
+    "languages",
+    "type",
+    "authors",
+)
+
+
+def _open(path: Path) -> IO[str]:
+    """Open a dump, gzipped or not."""
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return path.open(encoding="utf-8")
+
+
+def read_dump(path: Path, record_type: str) -> Iterator[dict[str, Any]]:
+    """Read the records of a type from a dump, skipping the malformed lines.
+
+    Args:
+        path (Path): the dump.
+        record_type (str): the type of the records, eg `/type/edition`.
+
+    Yields:
+        dict[str, Any]: the JSON of each record.
+    """
+    with _open(path) as f:
+        for line in f:
+            columns = line.split("\t", 4)
+            if len(columns) != 5 or columns[0] != record_type:
+                continue
+            try:
+                yield json.loads(columns[4])
+            except json.JSONDecodeError:
+                continue
+
+
+def edition_isbns(edition: dict[str, Any]) -> list[str]:
+    """Get the distinct valid isbns of an edition, as ISBN-13.
+
+    Args:
+        edition (dict[str, Any]): the edition.
+
+    Returns:
+        list[str]: the isbns.
+    """
+    isbns: dict[str, None] = dict()
+    for x in edition.get("isbn_13", []) + edition.get("isbn_10", []):
+        try:
+            isbns[canonical_isbn(str(x))] = None
+        except ValueError:
+            continue
+    return list(isbns)
+
+
+def _olid(key: str) -> str:
+    """Get the OpenLibrary ID from a key, eg `OL1A` from `/authors/OL1A`."""
+    return key.rsplit("/", 1)[-1]
+
+
+def _spool_editions(path: Path, spool: IO[str], wanted: set[str] | None) -> set[str]:
+    """Trim the editions with an isbn to the fields read, into a spool file.
+
+    Args:
+        path (Path): the editions dump.
+        spool (IO[str]): where to write the trimmed editions, one JSON per line.
+        wanted (set[str] | None): the isbns to keep, None for all.
+
+    Returns:
+        set[str]: the ids of the authors of the editions kept.
+    """
+    authors: set[str] = set()
+    for edition in read_dump(path, "/type/edition"):
+        isbns = edition_isbns(edition)
+        if wanted is not None:
+            isbns = [x for x in isbns if x in wanted]
+        if not isbns:
+            continue
+
+        book = {x: edition[x] for x in EDITION_FIELDS if x in edition}
+        book_authors = [
+            _olid(x["key"]) for x in book.pop("authors", []) if isinstance(x, dict)
+        ]
+        authors.update(book_authors)
+        spool.write(json.dumps([isbns, book, book_authors]) + "\n")
+    return authors
+
+
+def _read_authors(path: Path, wanted: set[str]) -> dict[str, tuple[str, bool]]:
+    """Read the name and whether there is a portrait of the wanted authors.
+
+    Args:
+        path (Path): the authors dump.
+        wanted (set[str]): the ids of the authors.
+
+    Returns:
+        dict[str, tuple[str, bool]]: the name and portrait flag of each author found.
+    """
+    authors: dict[str, tuple[str, bool]] = dict()
+    for author in read_dump(path, "/type/author"):
+        olid = _olid(author.get("key", ""))
+        if olid not in wanted:
+            continue
+        # removed photos are kept as negative ids
+        portrait = any(isinstance(x, int) and x > 0 for x in author.get("photos", []))
+        authors[olid] = (author.get("name"), portrait)
+    return authors
+
+
+def build_index(
+    editions: Path, authors: Path, output: Path, wanted: set[str] | None = None
+) -> int:
+    """Build the index from the dumps.
+
+    The editions are read first and spooled to disk, trimmed, so that only their authors
+    are kept in memory when reading the authors dump.
+
+    Args:
+        editions (Path): the editions dump.
+        authors (Path): the authors dump.
+        output (Path): the index file.
+        wanted (set[str] | None, optional): the isbns to keep, None for all. Defaults to None.
+
+    Returns:
+        int: the number of isbns indexed.
+    """
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryFile("w+", dir=output.parent, encoding="utf-8") as spool:
+        author_ids = _spool_editions(editions, spool, wanted)
+        known = _read_authors(authors, author_ids)
+
+        spool.seek(0)
+        with IndexWriter(output) as writer:
+            for line in spool:
+                isbns, book, book_authors = json.loads(line)
+                resolved = [known.get(x) for x in book_authors]
+                record = {
+                    BOOK_DATA: book,
+                    AUTHOR_DATA: [
+                        {"name": x[0]} if x is not None else None for x in resolved
+                    ],
+                    PORTRAIT_IDS: [
+                        olid if x is not None and x[1] else None
+                        for olid, x in zip(book_authors, resolved)
+                    ],
+                }
+                writer.add(isbns, record)
+        return writer.count
+
+
+def _read_isbns(path: Path) -> set[str]:
+    """Read a file of isbns, one per line, skipping the invalid ones."""
+    isbns: set[str] = set()
+    for line in path.read_text().splitlines():
+        try:
+            isbns.add(canonical_isbn(line.strip()))
+        except ValueError:
+            continue
+    return isbns
+
+
+def main() -> None:
+    """Build the index from the command line."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--editions", type=Path, required=True)
+    parser.add_argument("--authors", type=Path, required=True)
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--isbns", type=Path, help="the isbns to keep, one per line")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    wanted = _read_isbns(args.isbns) if args.isbns is not None else None
+    count = build_index(args.editions, args.authors, args.output, wanted)
+    print(
+        f"indexed {count} isbns into {args.output}"
+        f" ({os.path.getsize(args.output)} bytes) in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import asyncio
+
+import pytest
+from ferrea.core.context import Context
+from ferrea.models.datasource import BookDatasource
+
+from adapters.breaker import BreakerRepository, CircuitBreaker, CircuitOpenError
+from adapters.ratelimit import ThrottledError
+from models.breaker import BreakerState
+
+CONTEXT = Context("tst", "tst")
+
+
+class FakeClock:
+    """Manually driven monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRepository:
+    """Datasource failing on demand."""
+
+    name = "fake"
+
+    def __init__(self) -> None:
+        self.failing = False
+        self.calls = 0
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        self.calls += 1
+        if self.failing:
+            raise RuntimeError("upstream down")
+        return None
+
+
+def _breaker(clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker(
+        name="fake",
+        window=10.0,
+        min_calls=4,
+        error_rate=0.5,
+        slow_call=1.0,
+        slow_rate=0.5,
+        open_for=30.0,
+        half_open_calls=2,
+        clock=clock,
+    )
+
+
+def test_breaker_opens_on_error_rate() -> None:
+    """The breaker opens once enough calls failed within the window."""
+    breaker = _breaker(FakeClock())
+
+    for success in (True, True, False):
+        breaker.record(success, 0.1)
+    assert breaker.state == BreakerState.CLOSED
+
+    breaker.record(False, 0.1)
+    assert breaker.state == BreakerState.OPEN
+    assert breaker.stats.opened == 1
+
+
+def test_breaker_opens_on_slow_calls() -> None:
+    """The breaker opens when too many calls are slow, even if they succeed."""
+    breaker = _breaker(FakeClock())
+
+    for latency in (0.1, 0.1, 2.0, 2.0):
+        breaker.record(True, latency)
+
+    assert breaker.state == BreakerState.OPEN
+
+
+def test_breaker_forgets_outcomes_out_of_the_window() -> None:
+    """Failures older than the window do not count."""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    clock.now = 20.0
+    for _ in range(3):
+        breaker.record(True, 0.1)
+    breaker.record(False, 0.1)
+
+    assert breaker.state == BreakerState.CLOSED
+
+
+def test_breaker_half_open_then_closes() -> None:
+    """After the cool down a few trial calls are let through, closing the breaker if they succeed."""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    for _ in range(4):
+        breaker.record(False, 0.1)
+
+    assert not breaker.allow()
+    clock.now = 30.0
+    assert breaker.state == BreakerState.HALF_OPEN
+
+    assert breaker.allow()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(True, 0.1)
+    breaker.record(True, 0.1)
+
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.stats.rejected == 2
+
+
+def test_breaker_half_open_failure_opens_again() -> None:
+    """A failed trial call opens the breaker for another cool down."""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    for _ in range(4):
+        breaker.record(False, 0.1)
+    clock.now = 30.0
+
+    assert breaker.allow()
+    breaker.record(False, 0.1)
+
+    assert breaker.state == BreakerState.OPEN
+    assert breaker.stats.opened == 2
+
+
+def test_breaker_repository_skips_while_open() -> None:
+    """The datasource is not called while the breaker is open."""
+    clock = FakeClock()
+    repository = FakeRepository()
+    wrapped = BreakerRepository(repository, _breaker(clock))
+    repository.failing = True
+
+    async def main() -> None:
+        for _ in range(4):
+            with pytest.raises(RuntimeError):
+                await wrapped.search_for_book_info_async("9788804668237", CONTEXT)
+        with pytest.raises(CircuitOpenError):
+            await wrapped.search_for_book_info_async("9788804668237", CONTEXT)
+
+    asyncio.run(main())
+
+    assert repository.calls == 4
+
+
+def test_breaker_repository_releases_cancelled_trials() -> None:
+    """A trial call cancelled before its outcome is known is given back."""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    for _ in range(4):
+        breaker.record(False, 0.1)
+    clock.now = 30.0
+
+    class SlowRepository(FakeRepository):
+        async def search_for_book_info_async(
+            self, isbn: str, context: Context
+        ) -> BookDatasource | None:
+            await asyncio.sleep(10)
+            return None
+
+    wrapped = BreakerRepository(SlowRepository(), breaker)
+
+    async def main() -> None:
+        task = asyncio.create_task(
+            wrapped.search_for_book_info_async("9788804668237", CONTEXT)
+        )
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+
+    assert breaker.state == BreakerState.HALF_OPEN
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_breaker_repository_ignores_throttled_calls() -> None:
+    """The calls refused by the client-side rate limit do not open the breaker."""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+
+    class ThrottledRepository(FakeRepository):
+        async def search_for_book_info_async(
+            self, isbn: str, context: Context
+        ) -> BookDatasource | None:
+            raise ThrottledError("rate limit of 5.0/s exceeded")
+
+    wrapped = BreakerRepository(ThrottledRepository(), breaker)
+
+    async def main() -> None:
+        for _ in range(10):
+            with pytest.raises(ThrottledError):
+                await wrapped.search_for_book_info_async("9788804668237", CONTEXT)
+
+    asyncio.run(main())
+
+    assert breaker.state == BreakerState.CLOSED
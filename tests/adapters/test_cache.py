@@ -0,0 +1,100 @@
+from ferrea.models.datasource import BookDatasource
+
+from adapters.cache import FlagCache, ResultCache
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _book(title: str) -> BookDatasource:
+    """Build a minimal book."""
+    return BookDatasource(
+        title=title,
+        authors=["Milan Kundera"],
+        publishing=None,
+        published_on=None,
+        cover=None,
+        plot=None,
+        languages=[],
+        book_formats=[],
+    )
+
+
+def test_result_cache_ttls() -> None:
+    """Found and not found results expire after their own TTL."""
+    clock = FakeClock()
+    cache = ResultCache(
+        max_entries=10, max_bytes=10_000, ttl=100, negative_ttl=10, clock=clock
+    )
+    cache.store("found", _book("Identity"))
+    cache.store("missing", None)
+
+    assert cache.lookup("found") == (True, _book("Identity"))
+    assert cache.lookup("missing") == (True, None)
+
+    clock.now = 50
+    assert cache.lookup("found")[0]
+    assert cache.lookup("missing") == (False, None)
+
+    assert cache.stats.hits == 3
+    assert cache.stats.misses == 1
+    assert cache.stats.expirations == 1
+
+
+def test_result_cache_evicts_least_recently_used() -> None:
+    """Past the entries bound, the least recently used entry is evicted."""
+    cache = ResultCache(max_entries=2, max_bytes=10_000, ttl=100, negative_ttl=10)
+    cache.store("a", None)
+    cache.store("b", None)
+    cache.lookup("a")
+    cache.store("c", None)
+
+    assert cache.lookup("b") == (False, None)
+    assert cache.lookup("a") == (True, None)
+    assert cache.stats.evictions == 1
+
+
+def test_result_cache_bytes_bound() -> None:
+    """Past the bytes bound, entries are evicted until the cache fits again."""
+    book = _book("Identity")
+    size = len(book.model_dump_json()) + 1
+    cache = ResultCache(max_entries=100, max_bytes=size * 2, ttl=100, negative_ttl=10)
+    for key in "abc":
+        cache.store(key, book)
+
+    assert len(cache) == 2
+    assert cache.size_bytes <= size * 2
+
+
+def test_flag_cache_ttls() -> None:
+    """Yes and no answers expire after their own TTL."""
+    clock = FakeClock()
+    cache = FlagCache(max_entries=10, ttl=100.0, negative_ttl=10.0, clock=clock)
+    cache.store("OL4326321A", True)
+    cache.store("OL1A", False)
+
+    assert cache.lookup("OL4326321A") == (True, True)
+    assert cache.lookup("OL1A") == (True, False)
+    clock.now = 10.0
+    assert cache.lookup("OL1A") == (False, False)
+    assert cache.lookup("OL4326321A") == (True, True)
+    assert cache.stats.expirations == 1
+
+
+def test_flag_cache_evicts_least_recently_used() -> None:
+    """The cache keeps at most `max_entries` answers."""
+    cache = FlagCache(max_entries=2, ttl=100.0, negative_ttl=10.0, clock=FakeClock())
+    cache.store("a", True)
+    cache.store("b", True)
+    cache.lookup("a")
+    cache.store("c", True)
+
+    assert cache.lookup("b") == (False, False)
+    assert cache.stats.evictions == 1
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from adapters.coalescing import SingleFlight
+
+
+def test_single_flight_coalesces_concurrent_calls() -> None:
+    """Concurrent calls with the same key perform a single execution."""
+    flight = SingleFlight()
+    calls = list()
+
+    async def fetch() -> str:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "Identity"
+
+    async def main() -> list[str]:
+        return await asyncio.gather(*[flight.do("isbn", fetch) for _ in range(10)])
+
+    results = asyncio.run(main())
+
+    assert results == ["Identity"] * 10
+    assert len(calls) == 1
+    assert flight.coalesced == 9
+    assert len(flight) == 0
+
+
+def test_single_flight_shares_errors() -> None:
+    """Concurrent callers receive the same error."""
+    flight = SingleFlight()
+
+    async def fetch() -> str:
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main() -> list[BaseException | str]:
+        return await asyncio.gather(
+            *[flight.do("isbn", fetch) for _ in range(3)], return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(x, ValueError) for x in results)
+
+
+def test_single_flight_survives_cancelled_caller() -> None:
+    """Cancelling the first caller does not cancel the call for the others."""
+    flight = SingleFlight()
+
+    async def fetch() -> str:
+        await asyncio.sleep(0.05)
+        return "Identity"
+
+    async def main() -> str:
+        first = asyncio.create_task(flight.do("isbn", fetch))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do("isbn", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "Identity"
+
+
+def test_single_flight_cancels_call_without_callers() -> None:
+    """The call is cancelled once every caller has left, and the next caller starts anew."""
+    flight = SingleFlight()
+    cancelled = list()
+
+    async def fetch() -> str:
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return "Identity"
+
+    async def main() -> str:
+        callers = [asyncio.create_task(flight.do("isbn", fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for x in callers:
+            x.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert cancelled == [1]
+        assert len(flight) == 0
+        return await flight.do("isbn", fetch)
+
+    assert asyncio.run(main()) == "Identity"
@@ -1,8 +1,14 @@
+import asyncio
+from typing import Any
+
+import httpx
+import pytest
 from ferrea.core.context import Context
 from ferrea.models.datasource import BookDatasource
 from pydantic import HttpUrl
 
 from adapters.googlebooks import GoogleBooksRepository
+from configs import settings
 
 # the cover seems to rotate on a pool of multiple links, unreliable as test
 COVER_URL = HttpUrl(
@@ -25,8 +31,8 @@ ISBN = "0060930314"
 
 def test_googlebooks_repository() -> None:
     """Test Google Books service integration, happy path."""
-    repository = GoogleBooksRepository(Context("tst", "tst"), "OL")
-    data = repository.search_for_book_info(ISBN)
+    repository = GoogleBooksRepository("OL")
+    data = repository.search_for_book_info(ISBN, Context("tst", "tst"))
 
     if data is None:
         raise ValueError()
@@ -45,3 +51,70 @@ def test_googlebooks_repository() -> None:
     )
 
     assert data == expected_data
+
+
+def _requests(
+    search: dict[str, Any], single_request: bool, monkeypatch: pytest.MonkeyPatch
+) -> tuple[BookDatasource | None, list[str]]:
+    """Search a book on a fake upstream, returning the book and the paths requested."""
+    monkeypatch.setattr(settings.google, "single_request", single_request)
+    paths: list[str] = list()
+    volume = {
+        "id": "mXPU2T--gPQC",
+        "volumeInfo": {"title": "Identity", "authors": ["Milan Kundera"]},
+    }
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        if request.url.path.endswith("/volumes"):
+            return httpx.Response(200, json=search)
+        return httpx.Response(200, json=volume)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    repository = GoogleBooksRepository("GB", client)
+    book = asyncio.run(
+        repository.search_for_book_info_async(ISBN, Context("tst", "tst"))
+    )
+    return book, [x.rsplit("/", 1)[-1] for x in paths]
+
+
+def test_googlebooks_single_request(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A search result without the optional fields is mapped without fetching the volume."""
+    search = {
+        "totalItems": 1,
+        "items": [
+            {
+                "id": "mXPU2T--gPQC",
+                "volumeInfo": {"title": "Identity", "authors": ["Milan Kundera"]},
+            }
+        ],
+    }
+
+    book, paths = _requests(search, True, monkeypatch)
+
+    assert paths == ["volumes"]
+    assert book is not None
+    assert book.plot is None
+
+
+def test_googlebooks_single_request_fallback(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A search result missing a required field falls back to fetching the volume."""
+    search = {
+        "totalItems": 1,
+        "items": [{"id": "mXPU2T--gPQC", "volumeInfo": {"title": "Identity"}}],
+    }
+
+    book, paths = _requests(search, True, monkeypatch)
+
+    assert paths == ["volumes", "mXPU2T--gPQC"]
+    assert book is not None
+    assert book.authors == ["Milan Kundera"]
+
+
+def test_googlebooks_two_requests(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Without the single request mode, the volume is always fetched."""
+    search = {"totalItems": 1, "items": [{"id": "mXPU2T--gPQC"}]}
+
+    _, paths = _requests(search, False, monkeypatch)
+
+    assert paths == ["volumes", "mXPU2T--gPQC"]
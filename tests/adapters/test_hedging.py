@@ -0,0 +1,186 @@
+import asyncio
+
+import httpx
+import pytest
+
+from adapters._http import DeadlineTransport
+from adapters.hedging import HedgeBudget, HedgingTransport, LatencyTracker, hedged
+
+
+def _transport(
+    upstream: httpx.AsyncBaseTransport, budget: HedgeBudget
+) -> HedgingTransport:
+    """Hedge the upstream after 10 calls, at their 95th percentile."""
+    return HedgingTransport(
+        upstream, budget, percentile=0.95, min_samples=10, window=100, min_delay=0.01
+    )
+
+
+def _slow_first(delay: float) -> tuple[httpx.MockTransport, list[int]]:
+    """Build an upstream whose first answer is slow, and the next ones fast."""
+    calls: list[int] = list()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(len(calls))
+        if len(calls) == 1:
+            await asyncio.sleep(delay)
+            return httpx.Response(200, json={"attempt": "primary"})
+        return httpx.Response(200, json={"attempt": "hedge"})
+
+    return httpx.MockTransport(handler), calls
+
+
+def _warmed_up(transport: HedgingTransport, route: str, latency: float) -> None:
+    """Feed the latency tracker of a route."""
+    tracker = LatencyTracker(
+        percentile=transport.percentile,
+        min_samples=transport.min_samples,
+        window=transport.window,
+    )
+    for _ in range(transport.min_samples):
+        tracker.observe(latency)
+    transport.trackers[route] = tracker
+
+
+def test_latency_tracker_percentile() -> None:
+    """The percentile is only known after enough samples."""
+    tracker = LatencyTracker(percentile=0.95, min_samples=10, window=100)
+    for latency in range(1, 10):
+        tracker.observe(latency / 100)
+    assert tracker.value() is None
+
+    for latency in range(10, 101):
+        tracker.observe(latency / 100)
+    assert tracker.value() == 0.95
+
+
+def test_latency_tracker_window() -> None:
+    """The oldest latencies leave the window."""
+    tracker = LatencyTracker(percentile=0.5, min_samples=1, window=3)
+    for latency in (0.9, 0.8, 0.7, 0.1, 0.2):
+        tracker.observe(latency)
+
+    assert tracker.value() == 0.2
+
+
+def test_hedge_budget_caps_the_rate() -> None:
+    """Hedges are limited to a fraction of the requests."""
+    budget = HedgeBudget(max_rate=0.25, burst=1.0)
+    granted = 0
+    for _ in range(100):
+        budget.deposit()
+        granted += budget.withdraw()
+
+    assert granted == 25
+    assert budget.stats.hedges == 25
+    assert budget.stats.denied == 75
+
+
+def test_hedging_transport_takes_the_fastest() -> None:
+    """A request slower than the percentile is duplicated, and the duplicate answer is returned."""
+    upstream, calls = _slow_first(1.0)
+    budget = HedgeBudget(max_rate=1.0, burst=1.0)
+    transport = _transport(upstream, budget)
+    _warmed_up(transport, "isbn", 0.01)
+
+    async def main() -> httpx.Response:
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("https://upstream/isbn", extensions=hedged("isbn"))
+
+    response = asyncio.run(main())
+
+    assert response.json() == {"attempt": "hedge"}
+    assert len(calls) == 2
+    assert budget.stats.wins == 1
+
+
+def test_hedging_transport_waits_for_a_success() -> None:
+    """A duplicate failing fast does not win over a slow success."""
+    calls: list[int] = list()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(len(calls))
+        if len(calls) == 1:
+            await asyncio.sleep(0.1)
+            return httpx.Response(200, json={"attempt": "primary"})
+        return httpx.Response(503)
+
+    budget = HedgeBudget(max_rate=1.0, burst=1.0)
+    transport = _transport(httpx.MockTransport(handler), budget)
+    _warmed_up(transport, "isbn", 0.01)
+
+    async def main() -> httpx.Response:
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("https://upstream/isbn", extensions=hedged("isbn"))
+
+    response = asyncio.run(main())
+
+    assert response.json() == {"attempt": "primary"}
+    assert len(calls) == 2
+    assert budget.stats.wins == 0
+
+
+def test_hedging_transport_respects_the_budget() -> None:
+    """Without budget left, the slow request is awaited."""
+    upstream, calls = _slow_first(0.1)
+    budget = HedgeBudget(max_rate=0.0, burst=1.0)
+    transport = _transport(upstream, budget)
+    _warmed_up(transport, "isbn", 0.01)
+
+    async def main() -> httpx.Response:
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("https://upstream/isbn", extensions=hedged("isbn"))
+
+    response = asyncio.run(main())
+
+    assert response.json() == {"attempt": "primary"}
+    assert len(calls) == 1
+    assert budget.stats.denied == 1
+
+
+def test_hedging_transport_ignores_unmarked_requests() -> None:
+    """Only the requests marked as hedgeable are duplicated."""
+    upstream, calls = _slow_first(0.1)
+    budget = HedgeBudget(max_rate=1.0, burst=1.0)
+    transport = _transport(upstream, budget)
+    _warmed_up(transport, "isbn", 0.01)
+
+    async def main() -> httpx.Response:
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("https://upstream/authors")
+
+    response = asyncio.run(main())
+
+    assert response.json() == {"attempt": "primary"}
+    assert budget.stats.requests == 0
+
+
+def test_deadline_transport_bounds_the_call() -> None:
+    """A call exceeding the total budget fails with a timeout."""
+    upstream, _ = _slow_first(1.0)
+
+    async def main() -> httpx.Response:
+        async with httpx.AsyncClient(
+            transport=DeadlineTransport(upstream, 0.05)
+        ) as client:
+            return await client.get("https://upstream/isbn")
+
+    with pytest.raises(httpx.TimeoutException):
+        asyncio.run(main())
+
+
+def test_hedging_transport_observes_the_cancelled_attempt() -> None:
+    """The attempt losing the race is observed too, as at least as slow as its wait."""
+    upstream, _ = _slow_first(1.0)
+    transport = _transport(upstream, HedgeBudget(max_rate=1.0, burst=1.0))
+    _warmed_up(transport, "isbn", 0.01)
+
+    async def main() -> httpx.Response:
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("https://upstream/isbn", extensions=hedged("isbn"))
+
+    asyncio.run(main())
+    tracker = transport.trackers["isbn"]
+
+    assert len(tracker._samples) == 12
+    assert (tracker.value() or 0.0) > 0.01
@@ -0,0 +1,137 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from ferrea.core.context import Context
+
+import adapters.local_index
+from adapters.local_index import IndexWriter, LocalIndex, LocalIndexRepository
+
+CONTEXT = Context("tst", "tst")
+FOUND = "9780060930318"
+NOT_FOUND = "9790000000001"
+
+
+def _record(title: str) -> dict:
+    return {
+        "book": {
+            "title": title,
+            "publishers": ["Harper Perennial"],
+            "publish_date": "April 1999",
+            "covers": [40647],
+            "languages": [{"key": "/languages/eng"}],
+            "type": {"key": "/type/edition"},
+        },
+        "author": [None, {"name": "Milan Kundera"}, {"name": "Linda Asher"}],
+        "portraits": ["OL1A", "OL19963A", None],
+    }
+
+
+def _index(path: Path) -> Path:
+    with IndexWriter(path / "openlibrary.index") as writer:
+        writer.add(["9780571194292"], _record("L'identité"))
+        writer.add([FOUND, "9780060930318"], _record("Identity"))
+        writer.add([FOUND], _record("Duplicate"))
+    return path / "openlibrary.index"
+
+
+def test_local_index_reads_the_records(tmp_path: Path) -> None:
+    """The records are found by isbn, the first one added wins, the misses are counted."""
+    with LocalIndex.open(_index(tmp_path)) as index:
+        assert len(index) == 2
+        assert index.get(FOUND)["book"]["title"] == "Identity"  # type: ignore[index]
+        assert index.get(NOT_FOUND) is None
+        assert index.get("not an isbn") is None
+        assert FOUND in index
+        assert (index.stats.hits, index.stats.misses) == (1, 2)
+
+
+def test_local_index_sorts_by_chunks(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """The isbns are sorted across chunks, the first record of a duplicate still wins."""
+    monkeypatch.setattr(adapters.local_index, "SORT_CHUNK", 2)
+    with IndexWriter(tmp_path / "openlibrary.index") as writer:
+        for x in (5, 3, 9, 3, 1, 5, 7):
+            writer.add([f"978000000000{x}"], _record(f"{x} added {writer._spooled}"))
+
+    with LocalIndex.open(tmp_path / "openlibrary.index") as index:
+        assert list(index._isbns) == [int(f"978000000000{x}") for x in (1, 3, 5, 7, 9)]  # type: ignore[arg-type]
+        assert index.get("9780000000003")["book"]["title"].startswith("3 ")  # type: ignore[index]
+        assert index.get("9780000000005")["book"]["title"] == "5 added 0"  # type: ignore[index]
+
+
+def test_local_index_rejects_other_files(tmp_path: Path) -> None:
+    """A file which is not an index is refused when mapped."""
+    path = tmp_path / "openlibrary.index"
+    path.write_bytes(b"not an index at all")
+
+    with pytest.raises(ValueError):
+        with LocalIndex.open(path):
+            pass
+
+
+def test_local_index_of_nothing(tmp_path: Path) -> None:
+    """An index without any isbn can still be mapped."""
+    with IndexWriter(tmp_path / "openlibrary.index"):
+        pass
+
+    with LocalIndex.open(tmp_path / "openlibrary.index") as index:
+        assert len(index) == 0
+        assert index.get(FOUND) is None
+
+
+def test_local_index_repository_maps_like_openlibrary(tmp_path: Path) -> None:
+    """The records are mapped as the live OpenLibrary ones, portraits included."""
+    with LocalIndex.open(_index(tmp_path)) as index:
+        repository = LocalIndexRepository("OpenLibraryDump", index)
+        book = asyncio.run(repository.search_for_book_info_async(FOUND, CONTEXT))
+        missing = asyncio.run(repository.search_for_book_info_async(NOT_FOUND, CONTEXT))
+
+    assert missing is None
+    assert book is not None
+    assert book.title == "Identity"
+    assert book.authors == ["Milan Kundera", "Linda Asher"]
+    assert book.published_on == 1999
+    assert book.languages == ["eng"]
+    assert book.authors_portrait is not None
+    assert str(book.authors_portrait[0]).endswith("/a/olid/OL19963A-M.jpg")
+    assert book.authors_portrait[1] is None
+
+
+def test_local_index_repository_maps_sparse_records(tmp_path: Path) -> None:
+    """A record without languages, cover nor authors is still served, with the defaults."""
+    with IndexWriter(tmp_path / "openlibrary.index") as writer:
+        writer.add(
+            [FOUND], {"book": {"title": "Identity"}, "author": [], "portraits": []}
+        )
+
+    with LocalIndex.open(tmp_path / "openlibrary.index") as index:
+        repository = LocalIndexRepository("OpenLibraryDump", index)
+        book = asyncio.run(repository.search_for_book_info_async(FOUND, CONTEXT))
+
+    assert book is not None
+    assert book.title == "Identity"
+    assert book.authors == []
+    assert book.cover is None
+    assert book.languages == []
+
+
+def test_local_index_repository_keeps_authors_without_portraits(tmp_path: Path) -> None:
+    """A record listing fewer portraits than authors keeps every author."""
+    record = {
+        "book": {"title": "Identity"},
+        "author": [{"name": "Milan Kundera"}, {"name": "Linda Asher"}],
+        "portraits": ["OL19963A"],
+    }
+    with IndexWriter(tmp_path / "openlibrary.index") as writer:
+        writer.add([FOUND], record)
+
+    with LocalIndex.open(tmp_path / "openlibrary.index") as index:
+        repository = LocalIndexRepository("OpenLibraryDump", index)
+        book = asyncio.run(repository.search_for_book_info_async(FOUND, CONTEXT))
+
+    assert book is not None
+    assert book.authors == ["Milan Kundera", "Linda Asher"]
+    assert book.authors_portrait is not None
+    assert book.authors_portrait[1] is None
@@ -0,0 +1,24 @@
+from adapters.mapping import Field, FieldMapping
+
+MAPPING = FieldMapping(
+    {
+        "title": Field("volumeInfo.title"),
+        "languages": Field("volumeInfo.language", lambda x: [x]),
+    }
+)
+
+
+def test_field_mapping_extract() -> None:
+    """Each field is read from its expression and post-processed."""
+    record = {"volumeInfo": {"title": "Identity", "language": "en"}}
+
+    assert MAPPING.extract(record) == {"title": "Identity", "languages": ["en"]}
+    assert MAPPING.missing(record) == []
+
+
+def test_field_mapping_missing() -> None:
+    """Fields without a value in the record are reported as missing."""
+    record = {"volumeInfo": {"title": "Identity"}}
+
+    assert MAPPING.missing(record) == ["languages"]
+    assert MAPPING.extract(record) == {"title": "Identity"}
@@ -0,0 +1,50 @@
+import asyncio
+
+import httpx
+from prometheus_client import REGISTRY
+
+from adapters.hedging import hedged
+from adapters.metrics import MetricsTransport, endpoint
+
+
+def _count(datasource: str, name: str, status: str) -> float:
+    """Read how many calls were timed for a label set."""
+    value = REGISTRY.get_sample_value(
+        "ferrea_upstream_request_duration_seconds_count",
+        {"datasource": datasource, "endpoint": name, "status": status},
+    )
+    return value or 0.0
+
+
+def test_metrics_transport_labels() -> None:
+    """The calls are timed by endpoint and status class, hedged ones by their route."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/error":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(404 if request.url.path == "/missing" else 200)
+
+    transport = MetricsTransport(httpx.MockTransport(handler), "metrics-test")
+
+    async def main() -> None:
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("https://upstream/found", extensions=endpoint("found"))
+            await client.get("https://upstream/missing", extensions=hedged("isbn"))
+            await client.get("https://upstream/other")
+            try:
+                await client.get("https://upstream/error", extensions=endpoint("found"))
+            except httpx.ConnectError:
+                pass
+
+    asyncio.run(main())
+
+    assert _count("metrics-test", "found", "2xx") == 1
+    assert _count("metrics-test", "isbn", "4xx") == 1
+    assert _count("metrics-test", "other", "2xx") == 1
+    assert _count("metrics-test", "found", "error") == 1
+    assert (
+        REGISTRY.get_sample_value(
+            "ferrea_upstream_requests_in_flight", {"datasource": "metrics-test"}
+        )
+        == 0
+    )
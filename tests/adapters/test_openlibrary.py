@@ -1,16 +1,45 @@
+import asyncio
+
+import httpx
+import pytest
 from ferrea.core.context import Context
 from ferrea.models.datasource import BookDatasource
 from pydantic import HttpUrl
 
+from adapters._http import UpstreamError
+from adapters.cache import FlagCache
 from adapters.openlibrary import OpenLibraryRepository
 
 ISBN = "0060930314"
+CONTEXT = Context("tst", "tst")
+PORTRAIT = "https://covers.openlibrary.org/a/olid/OL4326321A-M.jpg"
+
+
+def _portraits(
+    transport: httpx.MockTransport,
+) -> tuple[OpenLibraryRepository, FlagCache]:
+    """Build a repository on a fake upstream, with a portraits cache."""
+    portraits = FlagCache(max_entries=10, ttl=100.0, negative_ttl=10.0)
+    client = httpx.AsyncClient(transport=transport)
+    return OpenLibraryRepository("OL", client, portraits=portraits), portraits
+
+
+def _search(repository: OpenLibraryRepository, times: int) -> list[str | None]:
+    """Search the portrait of the same author a few times."""
+
+    async def main() -> list[str | None]:
+        return [
+            await repository._perform_author_portrait_search("OL4326321A", CONTEXT)
+            for _ in range(times)
+        ]
+
+    return asyncio.run(main())
 
 
 def test_openlibrary_repository() -> None:
     """Test OpenLibrary service integration, happy path."""
-    repository = OpenLibraryRepository(Context("tst", "tst"), "GB")
-    data = repository.search_for_book_info(ISBN)
+    repository = OpenLibraryRepository("GB")
+    data = repository.search_for_book_info(ISBN, Context("tst", "tst"))
 
     if data is None:
         raise ValueError()
@@ -30,3 +59,147 @@ def test_openlibrary_repository() -> None:
     )
 
     assert data == expected_data
+
+
+def test_openlibrary_portrait_head() -> None:
+    """The portrait is checked with a HEAD request, once per author."""
+    requests: list[httpx.Request] = list()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200)
+
+    repository, _ = _portraits(httpx.MockTransport(handler))
+
+    assert _search(repository, 2) == [PORTRAIT, PORTRAIT]
+    assert [x.method for x in requests] == ["HEAD"]
+
+
+def test_openlibrary_portrait_ranged_get() -> None:
+    """If HEAD is not supported, only the first byte of the portrait is requested."""
+    requests: list[httpx.Request] = list()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.method == "HEAD":
+            return httpx.Response(405)
+        return httpx.Response(206, content=b"\xff")
+
+    repository, _ = _portraits(httpx.MockTransport(handler))
+
+    assert _search(repository, 1) == [PORTRAIT]
+    assert [x.method for x in requests] == ["HEAD", "GET"]
+    assert requests[1].headers["Range"] == "bytes=0-0"
+
+
+def test_openlibrary_portrait_not_found_cached() -> None:
+    """A missing portrait is cached too, and its error body is never parsed."""
+    calls: list[str] = list()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.method)
+        return httpx.Response(404, content=b"<html>Not Found</html>")
+
+    repository, portraits = _portraits(httpx.MockTransport(handler))
+
+    assert _search(repository, 2) == [None, None]
+    assert calls == ["HEAD"]
+    assert portraits.lookup("OL4326321A") == (True, False)
+
+
+def test_openlibrary_authors_resolved_concurrently() -> None:
+    """The authors are fetched concurrently, in order, a missing one left out with its portrait."""
+    inflight, peak = [0], [0]
+    edition = {
+        "title": "Identity",
+        "authors": [{"key": f"/authors/{x}"} for x in ("OL1A", "OL2A", "OL3A")],
+    }
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.startswith("/isbn/"):
+            return httpx.Response(200, json=edition)
+        if request.method == "HEAD":
+            return httpx.Response(200)
+
+        author = request.url.path.rsplit("/", 1)[-1].removesuffix(".json")
+        inflight[0] += 1
+        peak[0] = max(peak[0], inflight[0])
+        # the first author answers last
+        await asyncio.sleep(0.03 if author == "OL1A" else 0.01)
+        inflight[0] -= 1
+        if author == "OL2A":
+            return httpx.Response(404)
+        return httpx.Response(200, json={"name": author})
+
+    repository = OpenLibraryRepository(
+        "OL", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    book = asyncio.run(repository.search_for_book_info_async(ISBN, CONTEXT))
+
+    assert book is not None
+    assert peak[0] == 3
+    assert book.authors == ["OL1A", "OL3A"]
+    assert [str(x) for x in book.authors_portrait] == [
+        "https://covers.openlibrary.org/a/olid/OL1A-M.jpg",
+        "https://covers.openlibrary.org/a/olid/OL3A-M.jpg",
+    ]
+
+
+def _failing_author() -> OpenLibraryRepository:
+    """Build a repository on a fake upstream failing on the second author of every book."""
+    edition = {
+        "title": "Identity",
+        "authors": [{"key": f"/authors/{x}"} for x in ("OL1A", "OL2A")],
+    }
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/books":
+            return httpx.Response(200, json={f"ISBN:{ISBN}": {"details": edition}})
+        if request.url.path.startswith("/isbn/"):
+            return httpx.Response(200, json=edition)
+        if request.url.path.endswith("OL2A.json"):
+            return httpx.Response(503)
+        return httpx.Response(200, json={"name": "Milan Kundera"})
+
+    return OpenLibraryRepository(
+        "OL", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+
+
+def test_openlibrary_author_failure_fails_the_lookup() -> None:
+    """An author failing upstream fails the lookup, instead of a partial book cached as found."""
+    repository = _failing_author()
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(repository.search_for_book_info_async(ISBN, CONTEXT))
+
+
+def test_openlibrary_bulk_author_failure_leaves_the_isbn_out() -> None:
+    """An author failing upstream leaves its books out of the bulk results."""
+    repository = _failing_author()
+
+    books = asyncio.run(repository.search_for_books_info_async([ISBN], CONTEXT))
+
+    assert books == {}
+
+
+def test_openlibrary_bulk_malformed_edition_leaves_the_isbn_out() -> None:
+    """An edition that cannot be mapped is left out, without failing the other ones."""
+    editions = {
+        f"ISBN:{ISBN}": {"details": {"title": "Identity"}},
+        "ISBN:0000000000": {"details": {"title": ["Identity"]}},
+    }
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=editions)
+
+    repository = OpenLibraryRepository(
+        "OL", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    books = asyncio.run(
+        repository.search_for_books_info_async([ISBN, "0000000000"], CONTEXT)
+    )
+
+    assert list(books) == [ISBN]
+    assert books[ISBN] is not None
+    assert books[ISBN].title == "Identity"
@@ -0,0 +1,71 @@
+import asyncio
+
+import httpx
+import pytest
+
+from adapters.ratelimit import RateLimitTransport, ThrottledError, TokenBucket
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_queues_beyond_the_burst() -> None:
+    """Once the burst is spent, the calls are booked at the refill rate."""
+    bucket = TokenBucket(rate=10.0, burst=2.0, max_wait=1.0, clock=FakeClock())
+
+    waits = [bucket.reserve() for _ in range(4)]
+
+    assert waits == pytest.approx([0.0, 0.0, 0.1, 0.2])
+    assert bucket.stats.delayed == 2
+
+
+def test_token_bucket_refuses_long_waits() -> None:
+    """A call that would wait more than allowed is refused, without taking a token."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, burst=1.0, max_wait=0.5, clock=clock)
+
+    assert bucket.reserve() == 0.0
+    with pytest.raises(ThrottledError):
+        bucket.reserve()
+
+    clock.now = 1.0
+    assert bucket.reserve() == 0.0
+    assert bucket.stats.rejected == 1
+
+
+def test_token_bucket_refuses_waits_past_the_deadline() -> None:
+    """A call is not held past the time left to it, even within `max_wait`."""
+    bucket = TokenBucket(rate=10.0, burst=1.0, max_wait=1.0, clock=FakeClock())
+
+    assert bucket.reserve(0.05) == 0.0
+    with pytest.raises(ThrottledError):
+        bucket.reserve(0.05)
+    assert bucket.reserve(0.5) == pytest.approx(0.1)
+
+
+def test_rate_limit_transport_spaces_the_requests() -> None:
+    """Requests beyond the burst are held, instead of failing."""
+    sent: list[float] = list()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(asyncio.get_running_loop().time())
+        return httpx.Response(200)
+
+    bucket = TokenBucket(rate=20.0, burst=1.0, max_wait=1.0)
+    transport = RateLimitTransport(httpx.MockTransport(handler), bucket)
+
+    async def main() -> None:
+        async with httpx.AsyncClient(transport=transport) as client:
+            await asyncio.gather(*[client.get("https://upstream") for _ in range(3)])
+
+    asyncio.run(main())
+
+    assert len(sent) == 3
+    assert sent[-1] - sent[0] >= 0.09
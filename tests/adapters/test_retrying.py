@@ -0,0 +1,118 @@
+import asyncio
+
+import httpx
+
+from adapters._http import DeadlineTransport
+from adapters.retrying import RetryTransport, retry_after
+
+
+def _upstream(
+    statuses: list[int], headers: dict[str, str] | None = None
+) -> tuple[httpx.MockTransport, list[int]]:
+    """Build an upstream answering with the given statuses, in order."""
+    calls: list[int] = list()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = statuses[len(calls)]
+        calls.append(status)
+        return httpx.Response(status, headers=headers)
+
+    return httpx.MockTransport(handler), calls
+
+
+def _send(transport: RetryTransport) -> httpx.Response:
+    """Send a single GET through the transport."""
+
+    async def main() -> httpx.Response:
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("https://upstream/isbn")
+
+    return asyncio.run(main())
+
+
+def test_retry_after_header() -> None:
+    """Both the delay and the date forms are understood."""
+    assert retry_after(httpx.Response(429, headers={"Retry-After": "3"})) == 3.0
+    assert (
+        retry_after(
+            httpx.Response(
+                429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}
+            )
+        )
+        == 0.0
+    )
+    assert retry_after(httpx.Response(429, headers={"Retry-After": "soon"})) is None
+    assert retry_after(httpx.Response(429)) is None
+
+
+def test_retry_transport_honours_retry_after() -> None:
+    """A throttled request is retried after the wait asked by the upstream."""
+    upstream, calls = _upstream([429, 200], {"Retry-After": "1"})
+    waits: list[float] = list()
+
+    async def sleep(wait: float) -> None:
+        waits.append(wait)
+
+    transport = RetryTransport(
+        upstream, max_retries=2, backoff=0.1, max_backoff=1.0, budget=5.0, sleep=sleep
+    )
+
+    assert _send(transport).status_code == 200
+    assert calls == [429, 200]
+    assert waits == [1.0]
+    assert transport.stats.recovered == 1
+
+
+def test_retry_transport_backs_off_with_jitter() -> None:
+    """Without Retry-After, the wait is a jittered exponential backoff."""
+    upstream, calls = _upstream([503, 503, 200])
+    waits: list[float] = list()
+
+    async def sleep(wait: float) -> None:
+        waits.append(wait)
+
+    transport = RetryTransport(
+        upstream, max_retries=2, backoff=0.1, max_backoff=1.0, budget=5.0, sleep=sleep
+    )
+
+    assert _send(transport).status_code == 200
+    assert len(calls) == 3
+    assert 0 <= waits[0] <= 0.1
+    assert 0 <= waits[1] <= 0.2
+
+
+def test_retry_transport_stops_at_the_budget() -> None:
+    """A wait beyond the budget is not taken: the refusal is returned."""
+    upstream, calls = _upstream([429, 200], {"Retry-After": "60"})
+
+    async def sleep(wait: float) -> None:
+        raise AssertionError("should not wait")
+
+    transport = RetryTransport(
+        upstream, max_retries=2, backoff=0.1, max_backoff=1.0, budget=5.0, sleep=sleep
+    )
+
+    assert _send(transport).status_code == 429
+    assert calls == [429]
+    assert transport.stats.exhausted == 1
+
+
+def test_retry_transport_stops_at_the_deadline() -> None:
+    """A wait beyond the time left to the call is not taken: the refusal is returned."""
+    upstream, calls = _upstream([429, 200], {"Retry-After": "2"})
+
+    async def sleep(wait: float) -> None:
+        raise AssertionError("should not wait")
+
+    transport = RetryTransport(
+        upstream, max_retries=2, backoff=0.1, max_backoff=1.0, budget=5.0, sleep=sleep
+    )
+
+    async def main() -> httpx.Response:
+        async with httpx.AsyncClient(
+            transport=DeadlineTransport(transport, 1.0)
+        ) as client:
+            return await client.get("https://upstream/isbn")
+
+    assert asyncio.run(main()).status_code == 429
+    assert calls == [429]
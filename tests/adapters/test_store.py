@@ -0,0 +1,186 @@
+import asyncio
+from pathlib import Path
+
+from ferrea.core.context import Context
+from ferrea.models.datasource import BookDatasource
+
+from adapters.cache import CachedRepository, ResultCache
+from adapters.store import CountedRepository, ResultStore, StoredRepository
+
+CONTEXT = Context("tst", "tst")
+FOUND = "9780060930318"
+NOT_FOUND = "9790000000001"
+
+
+class FakeClock:
+    """Manually driven wall clock."""
+
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRepository:
+    """Datasource counting its lookups."""
+
+    name = "fake"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        self.calls += 1
+        return _book() if isbn == FOUND else None
+
+
+def _book() -> BookDatasource:
+    return BookDatasource(
+        title="Identity",
+        authors=["Milan Kundera"],
+        publishing="Harper Perennial",
+        published_on=1999,
+        cover=None,
+        plot=None,
+        languages=["eng"],
+        book_formats=["edition"],
+    )
+
+
+def _store(path: Path, clock: FakeClock, max_entries: int = 100) -> ResultStore:
+    return ResultStore(
+        path=path / "results.sqlite3",
+        ttl=3600.0,
+        negative_ttl=60.0,
+        max_entries=max_entries,
+        flush_interval=60.0,
+        flush_size=100,
+        compact_interval=600.0,
+        clock=clock,
+    )
+
+
+def test_store_survives_a_restart(tmp_path: Path) -> None:
+    """The flushed results are read back by the next store on the same file."""
+    clock = FakeClock()
+
+    async def main() -> dict[str, BookDatasource | None]:
+        store = _store(tmp_path, clock)
+        await store.connect()
+        store.put("fake", FOUND, _book())
+        store.put("fake", NOT_FOUND, None)
+        await store.close()
+
+        store = _store(tmp_path, clock)
+        await store.connect()
+        try:
+            return await store.lookup("fake", [FOUND, NOT_FOUND, "9780812511819"])
+        finally:
+            await store.close()
+
+    assert asyncio.run(main()) == {FOUND: _book(), NOT_FOUND: None}
+
+
+def test_store_reads_queued_writes(tmp_path: Path) -> None:
+    """A result not flushed yet is already visible."""
+
+    async def main() -> dict[str, BookDatasource | None]:
+        store = _store(tmp_path, FakeClock())
+        await store.connect()
+        store.put("fake", FOUND, _book())
+        try:
+            return await store.lookup("fake", [FOUND])
+        finally:
+            await store.close()
+
+    assert asyncio.run(main()) == {FOUND: _book()}
+
+
+def test_store_expires_not_found_sooner(tmp_path: Path) -> None:
+    """Not found results have their own shorter TTL."""
+    clock = FakeClock()
+
+    async def main() -> dict[str, BookDatasource | None]:
+        store = _store(tmp_path, clock)
+        await store.connect()
+        store.put("fake", FOUND, _book())
+        store.put("fake", NOT_FOUND, None)
+        await store.flush()
+        clock.now += 60.0
+        try:
+            return await store.lookup("fake", [FOUND, NOT_FOUND])
+        finally:
+            await store.close()
+
+    assert asyncio.run(main()) == {FOUND: _book()}
+
+
+def test_store_compaction_keeps_the_most_read(tmp_path: Path) -> None:
+    """Compaction drops the expired results, then the least read ones."""
+    clock = FakeClock()
+
+    async def main() -> tuple[int, list[str]]:
+        store = _store(tmp_path, clock, max_entries=2)
+        await store.connect()
+        for isbn in ("a", "b", "c"):
+            store.put("fake", isbn, _book())
+        store.put("fake", NOT_FOUND, None)
+        await store.flush()
+        store.count("fake", ["a", "c"])
+        store.count("fake", ["c"])
+        await store.flush()
+        clock.now += 60.0
+        try:
+            dropped = await store.compact()
+            hottest = await store.hottest("fake", 10)
+        finally:
+            await store.close()
+        return dropped, [x for x, _, _ in hottest]
+
+    assert asyncio.run(main()) == (2, ["c", "a"])
+
+
+def test_stored_repository_reads_through(tmp_path: Path) -> None:
+    """The datasource is only called for the results not stored yet."""
+    repository = FakeRepository()
+
+    async def main() -> list[BookDatasource | None]:
+        store = _store(tmp_path, FakeClock())
+        await store.connect()
+        wrapped = StoredRepository(repository, store)
+        try:
+            return [
+                await wrapped.search_for_book_info_async(x, CONTEXT)
+                for x in (FOUND, NOT_FOUND, FOUND, NOT_FOUND)
+            ]
+        finally:
+            await store.close()
+
+    assert asyncio.run(main()) == [_book(), None, _book(), None]
+    assert repository.calls == 2
+
+
+def test_counted_repository_counts_cache_hits(tmp_path: Path) -> None:
+    """The lookups answered by the result cache count towards the popularity too."""
+    repository = FakeRepository()
+    cache = ResultCache(max_entries=10, max_bytes=10_000, ttl=60.0, negative_ttl=60.0)
+
+    async def main() -> list[str]:
+        store = _store(tmp_path, FakeClock())
+        await store.connect()
+        wrapped = CountedRepository(
+            CachedRepository(StoredRepository(repository, store), cache), store
+        )
+        try:
+            for isbn in (NOT_FOUND, FOUND, FOUND, FOUND):
+                await wrapped.search_for_book_info_async(isbn, CONTEXT)
+            await store.flush()
+            return [x for x, _, _ in await store.hottest("fake", 10)]
+        finally:
+            await store.close()
+
+    assert asyncio.run(main()) == [FOUND, NOT_FOUND]
+    assert repository.calls == 2
@@ -0,0 +1,47 @@
+import asyncio
+import re
+
+from adapters.timing import Timings, current_timings, start_timings, timed
+
+
+def test_timed_without_timings() -> None:
+    """Nothing is recorded outside of a timed request."""
+
+    async def main() -> Timings | None:
+        with timed("search"):
+            pass
+        return current_timings()
+
+    assert asyncio.run(main()) is None
+
+
+def test_timings_shared_by_the_tasks_of_the_request() -> None:
+    """The stages timed by the tasks of a request are recorded on the request."""
+
+    async def stage() -> None:
+        with timed("OpenLibrary.author"):
+            await asyncio.sleep(0)
+
+    async def main() -> str:
+        timings = start_timings()
+        with timed("search"):
+            await asyncio.gather(stage(), stage())
+        return timings.server_timing()
+
+    header = asyncio.run(main())
+
+    assert re.fullmatch(
+        r'OpenLibrary\.author;dur=[\d.]+;desc="2 calls", search;dur=[\d.]+, total;dur=[\d.]+',
+        header,
+    )
+
+
+def test_timings_sum_the_calls() -> None:
+    """A stage run many times is summed over its calls."""
+    timings = Timings()
+    timings.add("GoogleBooks.volumes", 0.010)
+    timings.add("GoogleBooks.volumes", 0.015)
+
+    assert timings.server_timing().startswith(
+        'GoogleBooks.volumes;dur=25.0;desc="2 calls", total;dur='
+    )
@@ -0,0 +1,45 @@
+import pytest
+
+from models.isbn import canonical_isbn
+
+ISBN_13 = "9780060930318"
+
+
+@pytest.mark.parametrize(
+    "isbn",
+    [
+        "0060930314",
+        "0-06-093031-4",
+        "9780060930318",
+        "978-0-06-093031-8",
+        "978 0 06 093031 8",
+    ],
+)
+def test_canonical_isbn(isbn: str) -> None:
+    """Every form of the same book is converted to the same ISBN-13."""
+    assert canonical_isbn(isbn) == ISBN_13
+
+
+def test_canonical_isbn_x_check_digit() -> None:
+    """The ISBN-10 X check digit is accepted, regardless of its case."""
+    assert canonical_isbn("080442957X") == "9780804429573"
+    assert canonical_isbn("080442957x") == "9780804429573"
+
+
+@pytest.mark.parametrize(
+    "isbn",
+    [
+        "0060930315",
+        "9780060930319",
+        "1234",
+        "9770060930318",
+        "00609303X4",
+        # Arabic-Indic and fullwidth digits
+        "\u0660\u0660\u0666\u0660\u0669\u0663\u0660\u0663\u0661\u0664",
+        "\uff10\uff10\uff16\uff10\uff19\uff13\uff10\uff13\uff11\uff14",
+    ],
+)
+def test_canonical_isbn_invalid(isbn: str) -> None:
+    """Malformed isbns and wrong check digits are rejected."""
+    with pytest.raises(ValueError):
+        canonical_isbn(isbn)
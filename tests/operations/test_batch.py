@@ -0,0 +1,104 @@
+import asyncio
+from dataclasses import dataclass, field
+
+from ferrea.core.context import Context
+from ferrea.models.datasource import BookDatasource
+
+from models.batch import BatchItem
+from operations.batch import resolve_batch
+
+
+@dataclass
+class FakeRepository:
+    """In-memory datasource knowing a single isbn, tracking the lookups received."""
+
+    name: str
+    known_isbn: str
+    lookups: list[str] = field(default_factory=list)
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Find only the known isbn."""
+        self.lookups.append(isbn)
+        await asyncio.sleep(0.01)
+        if isbn != self.known_isbn:
+            return None
+        return _book()
+
+
+@dataclass
+class FakeBatchRepository(FakeRepository):
+    """In-memory batch capable datasource, tracking the bulk lookups received."""
+
+    bulk_lookups: list[list[str]] = field(default_factory=list)
+    batch_capable = True
+
+    async def search_for_books_info_async(
+        self, isbns: list[str], context: Context
+    ) -> dict[str, BookDatasource | None]:
+        """Find only the known isbn, in bulk."""
+        self.bulk_lookups.append(isbns)
+        return {x: _book() if x == self.known_isbn else None for x in isbns}
+
+
+def _book() -> BookDatasource:
+    """Build a minimal book."""
+    return BookDatasource(
+        title="Identity",
+        authors=["Milan Kundera"],
+        publishing=None,
+        published_on=None,
+        cover=None,
+        plot=None,
+        languages=[],
+        book_formats=[],
+    )
+
+
+async def _collect(
+    isbns: list[str],
+    repository: FakeRepository,
+) -> list[BatchItem]:
+    """Resolve the batch and gather every streamed item."""
+    return [
+        x
+        async for x in resolve_batch(
+            isbns,
+            [repository],  # type: ignore[list-item]
+            Context("tst", "tst"),
+            concurrency=2,
+            window_size=2,
+        )
+    ]
+
+
+def test_resolve_batch() -> None:
+    """Isbns are deduplicated after canonicalisation, and invalid ones are reported."""
+    repository = FakeRepository("fake", "9780060930318")
+    isbns = ["0060930314", "978-0-06-093031-8", "0812511816", "0060930315"]
+
+    items = asyncio.run(_collect(isbns, repository))
+
+    by_isbn = {x.isbn: x for x in items}
+    assert len(items) == 3
+    assert sorted(repository.lookups) == ["9780060930318", "9780812511819"]
+    assert by_isbn["9780060930318"].items == 1
+    assert by_isbn["9780812511819"].items == 0
+    assert by_isbn["0060930315"].error is not None
+
+
+def test_resolve_batch_bulk_datasource() -> None:
+    """Batch capable datasources resolve each window in bulk, without single lookups."""
+    repository = FakeBatchRepository("fake", "9780060930318")
+    isbns = ["0060930314", "0812511816", "080442957X"]
+
+    items = asyncio.run(_collect(isbns, repository))
+
+    assert len(items) == 3
+    assert repository.lookups == []
+    assert repository.bulk_lookups == [
+        ["9780060930318", "9780812511819"],
+        ["9780804429573"],
+    ]
+    assert sum(x.items for x in items) == 1
@@ -0,0 +1,179 @@
+import asyncio
+from dataclasses import dataclass
+
+from ferrea.core.context import Context
+from ferrea.models.datasource import BookDatasource
+
+from models.search import CompletionPolicy
+from operations.data_search import fetch_data
+
+ISBN = "0060930314"
+
+
+@dataclass
+class FakeRepository:
+    """In-memory datasource answering after a fixed delay."""
+
+    name: str
+    delay: float
+    book: BookDatasource | None
+
+    async def search_for_book_info_async(
+        self, isbn: str, context: Context
+    ) -> BookDatasource | None:
+        """Answer after the configured delay."""
+        await asyncio.sleep(self.delay)
+        return self.book
+
+
+@dataclass
+class FakeLocalRepository(FakeRepository):
+    """In-memory datasource answering from local data."""
+
+    local = True
+
+    def knows(self, isbn: str) -> bool:
+        """Whether the book is known."""
+        return self.book is not None
+
+
+def _book(title: str) -> BookDatasource:
+    """Build a minimal book."""
+    return BookDatasource(
+        title=title,
+        authors=["Milan Kundera"],
+        publishing=None,
+        published_on=None,
+        cover=None,
+        plot=None,
+        languages=[],
+        book_formats=[],
+    )
+
+
+def test_fetch_data_first_success() -> None:
+    """The fastest hit is returned without waiting for the slower datasources."""
+    datasources = [
+        FakeRepository("slow", 5, _book("slow")),
+        FakeRepository("miss", 0, None),
+        FakeRepository("fast", 0.01, _book("fast")),
+    ]
+
+    data = asyncio.run(
+        fetch_data(
+            ISBN,
+            datasources,  # type: ignore[arg-type]
+            Context("tst", "tst"),
+            policy=CompletionPolicy.FIRST_SUCCESS,
+            deadline=1,
+        )
+    )
+
+    assert [x.title for x in data] == ["fast"]
+
+
+def test_fetch_data_first_success_among_simultaneous_hits() -> None:
+    """Hits arriving together still make a single result, the first in the datasources order."""
+    datasources = [
+        FakeLocalRepository("local first", 0, _book("local first")),
+        FakeLocalRepository("local second", 0, _book("local second")),
+    ]
+    live = [
+        FakeRepository("first", 0, _book("first")),
+        FakeRepository("second", 0, _book("second")),
+    ]
+
+    data = [
+        asyncio.run(
+            fetch_data(
+                ISBN,
+                x,  # type: ignore[arg-type]
+                Context("tst", "tst"),
+                policy=CompletionPolicy.FIRST_SUCCESS,
+                deadline=1,
+            )
+        )
+        for x in (datasources, live)
+    ]
+
+    assert [[x.title for x in y] for y in data] == [["local first"], ["first"]]
+
+
+def test_fetch_data_all_keeps_datasource_order() -> None:
+    """With the all policy, every hit is returned in the datasources order."""
+    datasources = [
+        FakeRepository("second", 0.02, _book("second")),
+        FakeRepository("first", 0.01, _book("first")),
+    ]
+
+    data = asyncio.run(
+        fetch_data(
+            ISBN,
+            datasources,  # type: ignore[arg-type]
+            Context("tst", "tst"),
+            policy=CompletionPolicy.ALL,
+            deadline=1,
+        )
+    )
+
+    assert [x.title for x in data] == ["second", "first"]
+
+
+def test_fetch_data_deadline_returns_partial_results() -> None:
+    """When the deadline expires, the hits gathered so far are returned."""
+    datasources = [
+        FakeRepository("fast", 0.01, _book("fast")),
+        FakeRepository("slow", 5, _book("slow")),
+    ]
+
+    data = asyncio.run(
+        fetch_data(
+            ISBN,
+            datasources,  # type: ignore[arg-type]
+            Context("tst", "tst"),
+            policy=CompletionPolicy.ALL,
+            deadline=0.1,
+        )
+    )
+
+    assert [x.title for x in data] == ["fast"]
+
+
+def test_fetch_data_local_hit_skips_the_live_datasources() -> None:
+    """A hit of a local datasource completes the search without calling the others."""
+    datasources = [
+        FakeLocalRepository("local", 0, _book("local")),
+        FakeRepository("live", 5, _book("live")),
+    ]
+
+    data = asyncio.run(
+        fetch_data(
+            ISBN,
+            datasources,  # type: ignore[arg-type]
+            Context("tst", "tst"),
+            policy=CompletionPolicy.FIRST_SUCCESS,
+            deadline=1,
+        )
+    )
+
+    assert [x.title for x in data] == ["local"]
+
+
+def test_fetch_data_local_miss_falls_back_to_the_live_datasources() -> None:
+    """On a miss of the local datasources, the others are queried."""
+    datasources = [
+        FakeLocalRepository("local", 0, None),
+        FakeRepository("live", 0.01, _book("live")),
+    ]
+
+    data = asyncio.run(
+        fetch_data(
+            ISBN,
+            datasources,  # type: ignore[arg-type]
+            Context("tst", "tst"),
+            policy=CompletionPolicy.FIRST_SUCCESS,
+            deadline=1,
+        )
+    )
+
+    assert [x.title for x in data] == ["live"]
@@ -0,0 +1,185 @@
+import asyncio
+
+import pytest
+from ferrea.core.context import Context
+
+from adapters.breaker import CircuitBreaker
+from adapters.ratelimit import ThrottledError
+from models.breaker import BreakerState
+from models.probes import HealthStatus
+from operations.health import HealthMonitor, MonitoredRepository
+
+CONTEXT = Context("tst", "tst")
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRepository:
+    """Datasource with a switchable health."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.up = True
+        self.probes = 0
+
+    async def healthy_async(self, context: Context) -> bool:
+        self.probes += 1
+        if self.up is None:
+            raise RuntimeError("upstream unreachable")
+        return self.up
+
+    async def search_for_book_info_async(self, isbn: str, context: Context) -> None:
+        if not self.up:
+            raise RuntimeError("upstream down")
+        return None
+
+
+def _monitor(*datasources: FakeRepository, clock: FakeClock) -> HealthMonitor:
+    return HealthMonitor(
+        datasources=list(datasources),  # type: ignore[arg-type]
+        breakers=dict(),
+        context=CONTEXT,
+        interval=10.0,
+        history=3,
+        stale_after=30.0,
+        passive_window=60.0,
+        passive_min_calls=4,
+        passive_error_rate=0.5,
+        clock=clock,
+    )
+
+
+def _statuses(monitor: HealthMonitor) -> dict[str, HealthStatus]:
+    return {x.name: x.status for x in monitor.snapshot.entities}
+
+
+def test_health_monitor_answers_from_the_last_poll() -> None:
+    """The snapshot reflects the last round of probes, without probing again."""
+    google, openlibrary = FakeRepository("GoogleBooks"), FakeRepository("OpenLibrary")
+    monitor = _monitor(google, openlibrary, clock=FakeClock())
+    openlibrary.up = None
+
+    asyncio.run(monitor.poll())
+    statuses = [_statuses(monitor) for _ in range(5)]
+
+    assert google.probes == 1
+    assert (
+        statuses
+        == [
+            {"GoogleBooks": HealthStatus.HEALTHY, "OpenLibrary": HealthStatus.UNHEALTHY}
+        ]
+        * 5
+    )
+    assert monitor.snapshot.status == HealthStatus.HEALTHY
+    entity = monitor.snapshot.entities[0]
+    assert entity.checked_at is not None
+    assert len(entity.latencies) == 1
+
+
+def test_health_monitor_keeps_recent_latencies() -> None:
+    """Only the latencies of the most recent probes are kept."""
+    google = FakeRepository("GoogleBooks")
+    monitor = _monitor(google, clock=FakeClock())
+
+    async def main() -> None:
+        for _ in range(5):
+            await monitor.poll()
+
+    asyncio.run(main())
+
+    assert len(monitor.snapshot.entities[0].latencies) == 3
+
+
+def test_health_monitor_flags_stale_probes() -> None:
+    """A datasource not probed for too long is unhealthy."""
+    clock = FakeClock()
+    google = FakeRepository("GoogleBooks")
+    monitor = _monitor(google, clock=clock)
+
+    asyncio.run(monitor.poll())
+    clock.now = 31.0
+    monitor.refresh()
+
+    assert _statuses(monitor) == {"GoogleBooks": HealthStatus.UNHEALTHY}
+
+
+def test_health_monitor_folds_in_passive_health() -> None:
+    """Failing real lookups make a datasource unhealthy, even if its probe succeeds."""
+    clock = FakeClock()
+    google = FakeRepository("GoogleBooks")
+    monitor = _monitor(google, clock=clock)
+    wrapped = MonitoredRepository(google, monitor)  # type: ignore[arg-type]
+
+    async def main() -> None:
+        await monitor.poll()
+        google.up = False
+        for _ in range(4):
+            with pytest.raises(RuntimeError):
+                await wrapped.search_for_book_info_async("9788804668237", CONTEXT)
+        google.up = True
+
+    asyncio.run(main())
+
+    assert _statuses(monitor) == {"GoogleBooks": HealthStatus.UNHEALTHY}
+    assert monitor.snapshot.entities[0].error_rate == 1.0
+
+    clock.now = 61.0
+    asyncio.run(monitor.poll())
+
+    assert _statuses(monitor) == {"GoogleBooks": HealthStatus.HEALTHY}
+
+
+def test_health_monitor_ignores_throttled_lookups() -> None:
+    """The lookups refused by the client-side rate limit say nothing about the upstream."""
+    clock = FakeClock()
+    google = FakeRepository("GoogleBooks")
+    monitor = _monitor(google, clock=clock)
+
+    class ThrottledRepository(FakeRepository):
+        async def search_for_book_info_async(self, isbn: str, context: Context) -> None:
+            raise ThrottledError("rate limit of 5.0/s exceeded")
+
+    wrapped = MonitoredRepository(ThrottledRepository("GoogleBooks"), monitor)  # type: ignore[arg-type]
+
+    async def main() -> None:
+        await monitor.poll()
+        for _ in range(4):
+            with pytest.raises(ThrottledError):
+                await wrapped.search_for_book_info_async("9788804668237", CONTEXT)
+
+    asyncio.run(main())
+
+    assert _statuses(monitor) == {"GoogleBooks": HealthStatus.HEALTHY}
+
+
+def test_health_monitor_reads_breakers_live() -> None:
+    """The snapshot shows a breaker opening before the next round of probes."""
+    clock = FakeClock()
+    google = FakeRepository("GoogleBooks")
+    monitor = _monitor(google, clock=clock)
+    breaker = CircuitBreaker(
+        name="GoogleBooks",
+        window=10.0,
+        min_calls=1,
+        error_rate=0.5,
+        slow_call=1.0,
+        slow_rate=0.5,
+        open_for=30.0,
+        half_open_calls=1,
+        clock=clock,
+    )
+    monitor.breakers[google.name] = breaker
+
+    asyncio.run(monitor.poll())
+    assert monitor.snapshot.entities[0].breaker == BreakerState.CLOSED
+    breaker.record(False, 0.1)
+
+    assert monitor.snapshot.entities[0].breaker == BreakerState.OPEN
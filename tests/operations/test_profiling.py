@@ -0,0 +1,33 @@
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from operations.profiling import SamplingProfiler, write_folded
+
+
+def _busy(until: float) -> None:
+    """Keep the thread busy."""
+    while time.perf_counter() < until:
+        pass
+
+
+def test_profiler_samples_the_thread() -> None:
+    """The stacks of the profiled thread are sampled, from the outermost frame."""
+    profiler = SamplingProfiler(threading.get_ident(), 0.001)
+
+    profiler.start()
+    _busy(time.perf_counter() + 0.1)
+    samples = profiler.stop()
+
+    assert samples
+    assert any(x.endswith("test_profiling.py:_busy") for x in samples)
+
+
+def test_write_folded(tmp_path: Path) -> None:
+    """The profile is written one stack per line, the most sampled first."""
+    path = tmp_path / "profiles" / "request.folded"
+
+    write_folded(Counter({"app.py:main;a.py:f": 1, "app.py:main;b.py:g": 3}), path)
+
+    assert path.read_text() == "app.py:main;b.py:g 3\napp.py:main;a.py:f 1\n"
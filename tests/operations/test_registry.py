@@ -0,0 +1,77 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from adapters.local_index import IndexWriter
+from adapters.store import ResultStore
+from configs import settings
+from operations.registry import DatasourceRegistry, _enabled, _factories
+
+
+def test_registry_follows_the_configured_order(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The datasources are queried in the configured order, the unlisted ones last."""
+    monkeypatch.setattr(settings.datasources, "order", [settings.openlibrary.name])
+
+    assert _enabled(_factories()) == [settings.openlibrary.name, settings.google.name]
+
+
+def test_registry_skips_disabled_datasources(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A disabled datasource is not built."""
+    monkeypatch.setattr(settings.google, "enabled", False)
+
+    async def main() -> list[str]:
+        async with DatasourceRegistry.open() as registry:
+            return [x.name for x in registry.datasources]
+
+    assert asyncio.run(main()) == [settings.openlibrary.name]
+
+
+def test_registry_rejects_unknown_datasources(monkeypatch: pytest.MonkeyPatch) -> None:
+    """An unknown datasource in the order is a configuration error."""
+    monkeypatch.setattr(settings.datasources, "order", ["Goodreads"])
+
+    with pytest.raises(ValueError):
+        _enabled(_factories())
+
+
+def test_registry_warms_the_caches_up(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """The results of the persistent store are loaded in the caches at startup."""
+    monkeypatch.setattr(settings.result_store, "enabled", True)
+    monkeypatch.setattr(settings.result_store, "path", str(tmp_path / "results.db"))
+    isbn = "9790000000001"
+
+    async def main() -> bool:
+        async with ResultStore.open(settings.result_store) as store:
+            store.put(settings.google.name, isbn, None)
+
+        async with DatasourceRegistry.open() as registry:
+            cache = registry.caches[settings.google.name]
+            found, _ = cache.lookup(isbn)
+            return found
+
+    assert asyncio.run(main())
+
+
+def test_registry_puts_the_local_index_first(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """The local index, if enabled, is queried before the live datasources."""
+    with IndexWriter(tmp_path / "openlibrary.index"):
+        pass
+    monkeypatch.setattr(settings.local_index, "enabled", True)
+    monkeypatch.setattr(
+        settings.local_index, "path", str(tmp_path / "openlibrary.index")
+    )
+
+    async def main() -> list[str]:
+        async with DatasourceRegistry.open() as registry:
+            return [x.name for x in registry.datasources]
+
+    assert asyncio.run(main()) == [
+        settings.local_index.name,
+        settings.google.name,
+        settings.openlibrary.name,
+    ]
@@ -0,0 +1,96 @@
+from routers._http_cache import EtagStore, etag, matches
+
+
+class FakeClock:
+    """Manually driven monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _store(clock: FakeClock, max_entries: int = 10) -> EtagStore:
+    return EtagStore(
+        max_entries=max_entries,
+        max_age=3600,
+        stale_while_revalidate=86400,
+        negative_max_age=300,
+        clock=clock,
+    )
+
+
+def test_etag_is_stable() -> None:
+    """The same body always gets the same tag, another body another tag."""
+    body = b'{"items":0,"result":[]}'
+
+    assert etag(body) == etag(bytes(body))
+    assert etag(body) != etag(b'{"items":1,"result":[]}')
+    assert etag(body).startswith('"') and etag(body).endswith('"')
+
+
+def test_matches() -> None:
+    """Lists, weak tags and the wildcard match."""
+    tag = etag(b"body")
+
+    assert matches(tag, tag)
+    assert matches(f'"other", W/{tag}', tag)
+    assert matches("*", tag)
+    assert not matches('"other"', tag)
+
+
+def test_store_found_and_not_found_headers() -> None:
+    """Found and not found results have their own max-age."""
+    store = _store(FakeClock())
+
+    found = store.store("9780060930318", b"found", True)
+    not_found = store.store("9790000000001", b"not found", False)
+
+    assert store.headers(found) == {
+        "ETag": etag(b"found"),
+        "Cache-Control": "public, max-age=3600, stale-while-revalidate=86400",
+    }
+    assert store.headers(not_found)["Cache-Control"] == "public, max-age=300"
+
+
+def test_store_headers_advertise_remaining_freshness() -> None:
+    """The max-age of a response is the time its tag is still trusted for."""
+    clock = FakeClock()
+    store = _store(clock)
+    found = store.store("9780060930318", b"found", True)
+
+    clock.now = 3000.0
+    assert store.headers(found)["Cache-Control"] == (
+        "public, max-age=600, stale-while-revalidate=86400"
+    )
+    clock.now = 4000.0
+    assert store.headers(found)["Cache-Control"].startswith("public, max-age=0,")
+
+
+def test_store_expires_tags() -> None:
+    """A tag is trusted only while the response it was sent with is fresh."""
+    clock = FakeClock()
+    store = _store(clock)
+    store.store("9780060930318", b"found", True)
+    store.store("9790000000001", b"not found", False)
+
+    clock.now = 300.0
+    assert store.lookup("9780060930318") is not None
+    assert store.lookup("9790000000001") is None
+    clock.now = 3600.0
+    assert store.lookup("9780060930318") is None
+    assert len(store) == 0
+
+
+def test_store_evicts_least_recently_used() -> None:
+    """The store keeps at most `max_entries` tags."""
+    store = _store(FakeClock(), max_entries=2)
+    store.store("a", b"a", True)
+    store.store("b", b"b", True)
+    store.lookup("a")
+    store.store("c", b"c", True)
+
+    assert store.lookup("b") is None
+    assert store.lookup("a") is not None
+    assert store.lookup("c") is not None
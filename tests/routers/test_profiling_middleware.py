@@ -0,0 +1,10 @@
+from routers._profiling import _file_name
+
+
+def test_profile_file_name_is_safe() -> None:
+    """The correlation id sent back by the app cannot escape the profiles directory."""
+    name = _file_name("../../etc/cron.d/x")
+
+    assert name.endswith("-______etc_cron_d_x.folded")
+    assert _file_name("").endswith(".folded")
+    assert "/" not in _file_name("/")
@@ -0,0 +1,52 @@
+import json
+
+from ferrea.models.datasource import BookDatasource
+from pydantic import HttpUrl
+
+from models.probes import Entity, HealthProbe, HealthStatus
+from routers._responses import books_envelope, model_bytes
+
+
+def _book(title: str) -> BookDatasource:
+    """Build a book with non ASCII content."""
+    return BookDatasource(
+        title=title,
+        authors=["Milan Kundera"],
+        publishing=None,
+        published_on=1999,
+        cover=HttpUrl("https://covers.openlibrary.org/b/id/40647-M.jpg"),
+        plot="Chantal et Jean-Marc, à Paris.",
+        languages=["fre"],
+        book_formats=["edition"],
+    )
+
+
+def test_books_envelope_matches_the_model() -> None:
+    """The envelope holds exactly the serialisation of each book."""
+    books = [_book("L'identité"), _book("Identity")]
+
+    body = json.loads(books_envelope(books))
+
+    assert body == {
+        "items": 2,
+        "result": [json.loads(x.model_dump_json()) for x in books],
+    }
+
+
+def test_books_envelope_empty() -> None:
+    """No books is an empty result."""
+    assert books_envelope([]) == b'{"items":0,"result":[]}'
+
+
+def test_model_bytes_options() -> None:
+    """The serialisation options are applied."""
+    probe = HealthProbe(
+        status=HealthStatus.HEALTHY,
+        entities=[
+            Entity(name="webserver", status=HealthStatus.HEALTHY, internal_status=True)
+        ],
+    )
+
+    assert model_bytes(probe, exclude_none=True) == (
+        b'{"status":"healthy","entities":[{"name":"webserver","status":"healthy"}]}'
+    )
@@ -1,6 +1,10 @@
+from pathlib import Path
+
+import pytest
 from fastapi.testclient import TestClient
 
 from app import app
+from configs import settings
 
 ISBN = "0060930314"
 ENDPOINT = "/api/v1/books"
@@ -9,9 +13,8 @@ ENDPOINT = "/api/v1/books"
 def test_app_happy_path() -> None:
     """Test app when everything goes as expected."""
 
-    client = TestClient(app())
-
-    response = client.get(f"{ENDPOINT}/{ISBN}")
+    with TestClient(app()) as client:
+        response = client.get(f"{ENDPOINT}/{ISBN}")
 
     assert response.status_code == 200
 
@@ -19,8 +22,94 @@ def test_app_happy_path() -> None:
 def test_app_not_found() -> None:
     """Test with a not existing isbn."""
 
-    client = TestClient(app())
-
-    response = client.get(f"{ENDPOINT}/123456789")
+    with TestClient(app()) as client:
+        response = client.get(f"{ENDPOINT}/9790000000001")
 
     assert response.status_code == 404
+
+
+def test_app_not_modified_never_for_missing() -> None:
+    """A conditional request for a book not found is searched and answered with a 404."""
+
+    with TestClient(app()) as client:
+        response = client.get(f"{ENDPOINT}/9790000000001")
+        etag = response.headers["ETag"]
+        conditional = [
+            client.get(f"{ENDPOINT}/9790000000001", headers={"If-None-Match": x})
+            for x in (etag, "*")
+        ]
+
+    assert response.headers["Cache-Control"] == "public, max-age=300"
+    assert [x.status_code for x in conditional] == [404, 404]
+    assert all(x.content for x in conditional)
+
+
+def test_app_invalid_checksum() -> None:
+    """Test with an isbn with a wrong check digit."""
+
+    with TestClient(app()) as client:
+        response = client.get(f"{ENDPOINT}/0060930315")
+
+    assert response.status_code == 422
+
+
+def test_app_liveness() -> None:
+    """The liveness probe answers from the background health snapshot."""
+
+    with TestClient(app()) as client:
+        response = client.get("/_/health")
+
+    assert response.status_code == 200
+    assert {x["name"] for x in response.json()["entities"]} == {
+        "GoogleBooks",
+        "OpenLibrary",
+    }
+
+
+def test_app_metrics() -> None:
+    """The metrics hold the requests by route and the stats of the datasources."""
+
+    with TestClient(app()) as client:
+        client.get(f"{ENDPOINT}/9790000000001")
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain")
+    assert (
+        'ferrea_http_requests_total{method="GET",route="/api/v1/books/{isbn}",status="404"}'
+        in response.text
+    )
+    assert 'ferrea_cache_misses_total{cache="results",datasource="GoogleBooks"}' in (
+        response.text
+    )
+    assert 'ferrea_pool_connections{datasource="OpenLibrary",state="idle"}' in (
+        response.text
+    )
+
+
+def test_app_server_timing() -> None:
+    """The stages of the request are sent back in the Server-Timing header."""
+
+    with TestClient(app()) as client:
+        response = client.get(f"{ENDPOINT}/9790000000001")
+
+    stages = [x.split(";")[0] for x in response.headers["Server-Timing"].split(", ")]
+    assert {"search", "serialize", "total"} <= set(stages)
+    assert stages[-1] == "total"
+
+
+def test_app_profiling_on_demand(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """A request asking for it is profiled, the others are not."""
+    monkeypatch.setattr(settings.profiling, "enabled", True)
+    monkeypatch.setattr(settings.profiling, "sample_rate", 0.0)
+    monkeypatch.setattr(settings.profiling, "allow_header", True)
+    monkeypatch.setattr(settings.profiling, "output_dir", str(tmp_path))
+
+    with TestClient(app()) as client:
+        client.get("/_/ready")
+        response = client.get("/_/ready", headers={"X-Ferrea-Profile": "1"})
+
+    assert response.status_code == 200
+    assert len(list(tmp_path.glob("*.folded"))) == 1
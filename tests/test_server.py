@@ -0,0 +1,23 @@
+import pytest
+from fastapi import FastAPI
+
+from configs import settings
+from server import server_config
+
+
+def test_server_config_follows_the_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The uvicorn configuration is read from the server settings."""
+    monkeypatch.setattr(settings.server, "port", 9090)
+    monkeypatch.setattr(settings.server, "backlog", 512)
+    monkeypatch.setattr(settings.server, "keep_alive", 15)
+    monkeypatch.setattr(settings.server, "graceful_timeout", 45)
+    monkeypatch.setattr(settings.server, "http", "h11")
+
+    config = server_config(FastAPI(), settings.server)
+
+    assert config.port == 9090
+    assert config.backlog == 512
+    assert config.timeout_keep_alive == 15
+    assert config.timeout_graceful_shutdown == 45
+    assert config.http == "h11"
+    assert config.access_log is False
@@ -0,0 +1,98 @@
+import gzip
+import json
+from pathlib import Path
+
+from adapters.local_index import LocalIndex
+from tools.openlibrary_dump import build_index
+
+
+def _dump(path: Path, rows: list[tuple[str, str, dict]]) -> Path:
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for record_type, key, record in rows:
+            f.write(
+                f"{record_type}\t{key}\t1\t2024-01-01T00:00:00\t{json.dumps(record)}\n"
+            )
+        f.write("malformed line\n")
+    return path
+
+
+def test_build_index_from_the_dumps(tmp_path: Path) -> None:
+    """Editions are indexed by every valid isbn, with the name and portrait of their authors."""
+    editions = _dump(
+        tmp_path / "editions.txt.gz",
+        [
+            (
+                "/type/edition",
+                "/books/OL1M",
+                {
+                    "title": "Identity",
+                    "isbn_10": ["0060930314", "not an isbn"],
+                    "publish_date": "April 1999",
+                    "works": [{"key": "/works/OL1W"}],
+                    "authors": [{"key": "/authors/OL1A"}, {"key": "/authors/OL2A"}],
+                },
+            ),
+            ("/type/edition", "/books/OL2M", {"title": "No isbn"}),
+            ("/type/redirect", "/books/OL3M", {"location": "/books/OL1M"}),
+        ],
+    )
+    authors = _dump(
+        tmp_path / "authors.txt.gz",
+        [
+            (
+                "/type/author",
+                "/authors/OL1A",
+                {"key": "/authors/OL1A", "name": "Milan Kundera", "photos": [6]},
+            ),
+            (
+                "/type/author",
+                "/authors/OL2A",
+                {"key": "/authors/OL2A", "name": "Linda Asher", "photos": [-1]},
+            ),
+            (
+                "/type/author",
+                "/authors/OL3A",
+                {"key": "/authors/OL3A", "name": "Someone Else"},
+            ),
+        ],
+    )
+
+    count = build_index(editions, authors, tmp_path / "openlibrary.index")
+
+    assert count == 1
+    with LocalIndex.open(tmp_path / "openlibrary.index") as index:
+        record = index.get("9780060930318")
+    assert record == {
+        "book": {"title": "Identity", "publish_date": "April 1999"},
+        "author": [{"name": "Milan Kundera"}, {"name": "Linda Asher"}],
+        "portraits": ["OL1A", None],
+    }
+
+
+def test_build_index_keeps_the_wanted_isbns(tmp_path: Path) -> None:
+    """Only the wanted isbns are indexed."""
+    editions = _dump(
+        tmp_path / "editions.txt.gz",
+        [
+            (
+                "/type/edition",
+                "/books/OL1M",
+                {"title": "Identity", "isbn_13": ["9780060930318"]},
+            ),
+            (
+                "/type/edition",
+                "/books/OL2M",
+                {"title": "Other", "isbn_13": ["9780571194292"]},
+            ),
+        ],
+    )
+    authors = _dump(tmp_path / "authors.txt.gz", [])
+
+    count = build_index(
+        editions, authors, tmp_path / "openlibrary.index", {"9780571194292"}
+    )
+
+    assert count == 1
+    with LocalIndex.open(tmp_path / "openlibrary.index") as index:
+        assert "9780571194292" in index
+        assert "9780060930318" not in index